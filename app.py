@@ -1,11 +1,20 @@
-from textclassification.pipeline.train_pipeline import TrainPipeline
-from fastapi import FastAPI
+from fastapi import FastAPI, Body, Request
+from typing import List
 import uvicorn
 import sys
-from fastapi.templating import Jinja2Templates
+import time
+import asyncio
 from starlette.responses import RedirectResponse
-from fastapi.responses import Response
+from starlette.routing import Match
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from textclassification.pipeline.prediction_pipeline import PredictionPipeline
+from textclassification.ml.text_cleaner import DEFAULT_TEXT_CLEANER
+from textclassification.serving.model_holder import ModelHolder
+from textclassification.serving.batcher import MicroBatcher
+from textclassification.serving.streaming import iter_texts, iter_predictions, json_array, ndjson_lines
+from textclassification.pipeline.training_job import TrainingJobRunner, TrainingJobRunning
+from textclassification.serving.metrics import REGISTRY, REQUEST_LATENCY, ServingStateCollector, render_metrics
+from textclassification.entity.config_entity import PredictionPipelineConfig
 from textclassification.exception import CustomException
 from textclassification.constants import *
 
@@ -14,6 +23,46 @@ text:str = "You are stupid?"
 
 app = FastAPI()
 
+# Loaded once per process and hot-swapped in the background when gcloud has a newer model
+model_holder = ModelHolder(PredictionPipelineConfig())
+prediction_pipeline = PredictionPipeline(model_holder=model_holder)
+batcher = MicroBatcher(prediction_pipeline.score_pinned,
+                       max_batch_size=prediction_pipeline.prediction_pipeline_config.MAX_BATCH_SIZE,
+                       max_wait_ms=prediction_pipeline.prediction_pipeline_config.MAX_BATCH_WAIT_MS)
+training_jobs = TrainingJobRunner()
+REGISTRY.register(ServingStateCollector(prediction_pipeline, batcher, model_holder, DEFAULT_TEXT_CLEANER.stem_cache))
+
+
+@app.on_event("startup")
+async def start_serving():
+    await asyncio.get_running_loop().run_in_executor(None, model_holder.start)
+    await batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_serving():
+    await batcher.stop()
+    model_holder.stop()
+    training_jobs.shutdown()
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # For streaming endpoints this measures the time until the response starts
+    start = time.perf_counter()
+    response = await call_next(request)
+    path = next((route.path for route in request.app.router.routes
+                 if route.matches(request.scope)[0] == Match.FULL), "unmatched")
+    REQUEST_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
 @app.get("/", tags=["authentication"])
 async def index():
     return RedirectResponse(url="/docs")
@@ -23,15 +72,31 @@ async def index():
 
 @app.get("/train")
 async def training():
+    """
+    Starts the training pipeline in a separate process and returns its job id right away.
+    """
     try:
-        train_pipeline = TrainPipeline()
+        job = training_jobs.submit()
+        return JSONResponse(job.to_dict(), status_code=202)
 
-        train_pipeline.run_pipeline()
+    except TrainingJobRunning as e:
+        return JSONResponse({"error": str(e), "job_id": e.job_id}, status_code=409)
 
-        return Response("Training successful !!")
 
-    except Exception as e:
-        return Response(f"Error Occurred! {e}")
+@app.get("/train/{job_id}")
+async def training_status(job_id: str):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown training job {job_id}"}, status_code=404)
+    return job.to_dict()
+
+
+@app.delete("/train/{job_id}")
+async def cancel_training(job_id: str):
+    job = await asyncio.get_running_loop().run_in_executor(None, training_jobs.cancel, job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown training job {job_id}"}, status_code=404)
+    return job.to_dict()
     
 
 
@@ -39,9 +104,49 @@ async def training():
 async def predict_route(text):
     try:
 
-        obj = PredictionPipeline()
-        text = obj.run_pipeline(text)
-        return text
+        loop = asyncio.get_running_loop()
+        # Cleaning and the first model load block, so they stay off the event loop
+        cleaned = (await loop.run_in_executor(None, prediction_pipeline.clean_texts, [text]))[0]
+        bundle = model_holder.current or await loop.run_in_executor(None, model_holder.get_model)
+        # Identical texts arriving together are scored once and then served from the cache. The score is
+        # computed with the bundle its key names, even when a reload swaps the model in between
+        score = await prediction_pipeline.prediction_cache.get_or_compute(
+            prediction_pipeline.cache_key(cleaned, bundle), lambda: batcher.submit((bundle, cleaned)))
+        return prediction_pipeline.get_label(score)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+@app.get("/predict/cache")
+async def prediction_cache_stats():
+    return prediction_pipeline.prediction_cache.stats()
+
+
+@app.get("/predict/stem-cache")
+async def stem_cache_stats():
+    return DEFAULT_TEXT_CLEANER.stem_cache.stats()
+
+
+@app.post("/predict/batch")
+async def predict_batch_route(texts: List[str] = Body(...)):
+    try:
+        predictions = iter_predictions(texts, prediction_pipeline.predict_batch, prediction_pipeline.get_label,
+                                       prediction_pipeline.prediction_pipeline_config.PREDICTION_CHUNK_SIZE)
+        return StreamingResponse(json_array(predictions), media_type="application/json")
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+@app.post("/predict/stream")
+async def predict_stream_route(request: Request):
+    """
+    Accepts an NDJSON or CSV (Content-Type: text/csv) upload and streams back one NDJSON score line per row.
+    """
+    try:
+        texts = iter_texts(request.stream(), request.headers.get("content-type", ""))
+        predictions = iter_predictions(texts, prediction_pipeline.predict_batch, prediction_pipeline.get_label,
+                                       prediction_pipeline.prediction_pipeline_config.PREDICTION_CHUNK_SIZE)
+        return StreamingResponse(ndjson_lines(predictions), media_type="application/x-ndjson")
     except Exception as e:
         raise CustomException(e, sys) from e
     
@@ -0,0 +1,76 @@
+"""
+Measures tweet cleaning throughput of TextCleaner against the original per-row function.
+
+    python benchmarks/cleaning_benchmark.py --data artifacts/<run>/DataValidationArtifacts/validated/raw_data.csv
+
+Without --data a synthetic set of tweets is used. The legacy function is reproduced here as it was
+in DataTransformation.concat_data_cleaning, except for its stopword bug, so both produce the same
+output and only their speed differs.
+"""
+import re
+import time
+import random
+import string
+import argparse
+import pandas as pd
+from textclassification.logger import logging
+from textclassification.constants import *
+from textclassification.constants.stopwords import ENGLISH_STOPWORDS
+from textclassification.ml.text_cleaner import TextCleaner, get_stemmer
+
+
+def legacy_clean(words):
+    logging.info("Entered into the concat_data_cleaning function")
+    stemmer = get_stemmer.__wrapped__("english")
+    stopword = set(ENGLISH_STOPWORDS)
+    words = str(words).lower()
+    words = re.sub(r'\[.*?\]', '', words)
+    words = re.sub(r'https?://\S+|www\.\S+', '', words)
+    words = re.sub(r'<.*?>+', '', words)
+    words = re.sub(r'[%s]' % re.escape(string.punctuation), '', words)
+    words = re.sub('\n', '', words)
+    words = re.sub(r'\w*\d\w*', '', words)
+    words = [word for word in words.split(' ') if word not in stopword]
+    words = " ".join(words)
+    words = [stemmer.stem(word) for word in words.split(' ')]
+    words = " ".join(words)
+    logging.info("Exited the concat_data_cleaning function")
+    return words
+
+
+def synthetic_tweets(rows, seed=42):
+    rng = random.Random(seed)
+    vocabulary = ["you", "are", "so", "stupid", "lol", "the", "game", "tonight", "running", "happily",
+                  "RT", "@user:", "#trash", "http://t.co/x1y2", "<b>", "[pic]", "2day", "&amp;", "!!!", "loving"]
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 30))) for _ in range(rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="CSV with a tweet column")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.data:
+        tweets = pd.read_csv(args.data)[TWEET].head(args.rows)
+    else:
+        tweets = pd.Series(synthetic_tweets(args.rows))
+
+    start = time.perf_counter()
+    legacy = tweets.map(legacy_clean)
+    legacy_seconds = time.perf_counter() - start
+
+    cleaner = TextCleaner()
+    start = time.perf_counter()
+    cleaned = cleaner.clean_batch(tweets)
+    cleaner_seconds = time.perf_counter() - start
+
+    print(f"rows: {len(tweets)}")
+    print(f"legacy concat_data_cleaning: {len(tweets) / legacy_seconds:,.0f} rows/s")
+    print(f"TextCleaner.clean_batch: {len(tweets) / cleaner_seconds:,.0f} rows/s")
+    print(f"speedup: {legacy_seconds / cleaner_seconds:.2f}x")
+    print(f"identical output: {legacy.equals(cleaned)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares fixed MAX_LEN padding against length-bucketed padding for inference.
+
+    python benchmarks/padding_benchmark.py --model artifacts/<run>/ModelTrainerArtifacts/model.h5 \
+        --encoded-test artifacts/<run>/ModelTrainerArtifacts/encoded_test
+
+Reports the time of each path, the speedup and the largest score difference between them.
+"""
+import time
+import argparse
+import numpy as np
+import keras
+from keras.utils import pad_sequences
+from textclassification.constants import *
+from textclassification.ml.bucketing import LengthBucketedModel
+from textclassification.ml.encoded_dataset import EncodedDataset
+
+
+def time_it(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="path of the trained model.h5")
+    parser.add_argument("--encoded-test", required=True, help="encoded test set directory written by the model trainer")
+    parser.add_argument("--batch-size", type=int, default=PREDICTION_CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sequences = EncodedDataset.load(args.encoded_test).sequences
+    batches = [sequences[i:i + args.batch_size] for i in range(0, len(sequences), args.batch_size)]
+
+    model = keras.models.load_model(args.model)
+    bucketed = LengthBucketedModel(model)
+
+    def fixed_padding():
+        return np.concatenate([np.asarray(model.predict_on_batch(pad_sequences(batch, maxlen=MAX_LEN))).ravel()
+                               for batch in batches])
+
+    def bucketed_padding():
+        return np.concatenate([bucketed.predict_sequences(batch) for batch in batches])
+
+    # Warm up both paths so graph tracing is not part of the measurement
+    fixed_padding()
+    bucketed_padding()
+    fixed_seconds, fixed_scores = time_it(fixed_padding, args.repeat)
+    bucketed_seconds, bucketed_scores = time_it(bucketed_padding, args.repeat)
+
+    lengths = sequences.lengths
+    print(f"texts: {len(sequences)}  mean length: {lengths.mean():.1f}  max length: {lengths.max()}")
+    print(f"fixed padding to {MAX_LEN}: {fixed_seconds:.3f}s ({len(sequences) / fixed_seconds:.0f} texts/s)")
+    print(f"bucketed padding {bucketed.buckets}: {bucketed_seconds:.3f}s ({len(sequences) / bucketed_seconds:.0f} texts/s)")
+    print(f"speedup: {fixed_seconds / bucketed_seconds:.2f}x")
+    print(f"max abs score difference: {np.abs(fixed_scores - bucketed_scores).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Guards the import time of the serving app against regressions.
+
+    python benchmarks/startup_benchmark.py --budget 1.5
+
+Imports app.py in fresh interpreters, reports the median wall time and exits with status 1
+when it exceeds the budget or when a training-only dependency was imported on the way.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only training needs; importing any of them while serving is a regression
+TRAINING_ONLY_MODULES = ["tensorflow", "keras", "sklearn", "scipy", "pandas", "matplotlib", "seaborn", "torch"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(m for m in sys.modules if "." not in m)}))
+"""
+
+
+def measure():
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=1.5, help="largest accepted median import time in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    median = statistics.median(run["seconds"] for run in runs)
+    heavy = [module for module in TRAINING_ONLY_MODULES if module in runs[0]["modules"]]
+
+    print(f"import app: median {median:.3f}s over {args.repeat} runs (budget {args.budget:.3f}s)")
+    if heavy:
+        print(f"training-only modules imported while serving: {', '.join(heavy)}")
+
+    failed = median > args.budget or bool(heavy)
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares the pickled keras Tokenizer with the vocab.bin Vocabulary: fit time, file size, load time and
+encode throughput.
+
+    python benchmarks/tokenizer_benchmark.py --data artifacts/<run>/DataTransformationArtifacts/final.csv
+
+Without --data a synthetic set of tweets with a Zipf-distributed vocabulary is used. The tokenizer is
+fitted on the texts, saved in both formats into a temporary directory and both are loaded back, so
+the comparison also checks that the two produce identical sequences.
+"""
+import os
+import time
+import pickle
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from keras.preprocessing.text import Tokenizer
+from textclassification.constants import *
+from textclassification.ml.vocabulary import Vocabulary
+
+
+def synthetic_tweets(rows, vocabulary_size=200000, seed=42):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{index}" for index in range(vocabulary_size)])
+    probabilities = 1 / np.arange(1, vocabulary_size + 1)
+    lengths = rng.integers(5, 31, size=rows)
+    tokens = words[rng.choice(vocabulary_size, size=lengths.sum(), p=probabilities / probabilities.sum())]
+    return [" ".join(tweet) for tweet in np.split(tokens, np.cumsum(lengths)[:-1])]
+
+
+def time_it(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="CSV with a tweet column, e.g. the transformed final.csv")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--num-words", type=int, default=MAX_WORDS)
+    parser.add_argument("--n-jobs", type=int, default=TOKENIZER_N_JOBS, help="processes used by Vocabulary.fit")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.data:
+        texts = pd.read_csv(args.data)[TWEET].fillna('').astype(str).head(args.rows).tolist()
+    else:
+        texts = synthetic_tweets(args.rows)
+
+    tokenizer = Tokenizer(num_words=args.num_words)
+    start = time.perf_counter()
+    tokenizer.fit_on_texts(texts)
+    keras_fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    fitted = Vocabulary.fit(texts, num_words=args.num_words, n_jobs=args.n_jobs, chunk_size=TOKENIZER_CHUNK_SIZE)
+    vocabulary_fit_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, TOKENIZER_FILE_NAME)
+        vocabulary_path = os.path.join(directory, VOCABULARY_FILE_NAME)
+        with open(pickle_path, 'wb') as handle:
+            pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        Vocabulary.from_tokenizer(tokenizer).save(vocabulary_path)
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as handle:
+                return pickle.load(handle)
+
+        pickle_load_seconds, loaded_tokenizer = time_it(load_pickle, args.repeat)
+        vocabulary_load_seconds, vocabulary = time_it(lambda: Vocabulary.load(vocabulary_path), args.repeat)
+        pickle_bytes = os.path.getsize(pickle_path)
+        vocabulary_bytes = os.path.getsize(vocabulary_path)
+
+    keras_seconds, keras_sequences = time_it(lambda: loaded_tokenizer.texts_to_sequences(texts), args.repeat)
+    vocabulary_seconds, sequences = time_it(lambda: vocabulary.texts_to_sequences(texts), args.repeat)
+
+    print(f"texts: {len(texts)}  words seen: {len(tokenizer.word_index)}  kept: {len(vocabulary)}")
+    print(f"fit: keras {keras_fit_seconds:.2f}s, Vocabulary.fit on {args.n_jobs} processes {vocabulary_fit_seconds:.2f}s "
+          f"(same word index: {fitted.words == vocabulary.words})")
+    print(f"file size: pickle {pickle_bytes / 1e6:.2f} MB, vocab.bin {vocabulary_bytes / 1e6:.2f} MB")
+    print(f"load: pickle {pickle_load_seconds * 1000:.1f} ms, vocab.bin {vocabulary_load_seconds * 1000:.1f} ms")
+    print(f"encode: keras {len(texts) / keras_seconds:,.0f} texts/s, "
+          f"Vocabulary {len(texts) / vocabulary_seconds:,.0f} texts/s "
+          f"({keras_seconds / vocabulary_seconds:.2f}x)")
+    print(f"identical sequences: {keras_sequences == sequences}")
+
+
+if __name__ == "__main__":
+    main()
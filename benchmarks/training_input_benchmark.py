@@ -0,0 +1,92 @@
+"""
+Trains the same network with the dense MAX_LEN input and with the bucketed tf.data input and
+compares the wall-clock training time needed to reach the same test accuracy.
+
+    python benchmarks/training_input_benchmark.py \
+        --encoded-train artifacts/<run>/ModelTrainerArtifacts/encoded_train \
+        --encoded-test artifacts/<run>/ModelTrainerArtifacts/encoded_test
+
+The dense model trains for --epochs. The bucketed model then trains one epoch at a time, up to
+--max-epochs, until its test accuracy is within --tolerance of the dense model's, and the speedup
+compares the training time (accuracy checks excluded) of both. Both use the same batch size and
+validation rows. Accuracy is measured on the encoded test set with the bucketed inference path,
+which gives the same scores as full MAX_LEN padding.
+"""
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from textclassification.constants import *
+from textclassification.ml.model import ModelArchitecture
+from textclassification.ml.bucketing import LengthBucketedModel
+from textclassification.ml.encoded_dataset import EncodedDataset
+from textclassification.ml.training_data import train_validation_datasets
+
+
+def test_accuracy(model, test_dataset):
+    scores = LengthBucketedModel(model).predict_sequences(test_dataset.sequences)
+    return float(np.mean((scores > 0.5) == test_dataset.labels))
+
+
+def train_dense(train_dataset, args):
+    model = ModelArchitecture().get_model()
+    start = time.perf_counter()
+    model.fit(train_dataset.sequences.padded(MAX_LEN), np.asarray(train_dataset.labels),
+              batch_size=args.batch_size, epochs=args.epochs, validation_split=VALIDATION_SPLIT, verbose=2)
+    return model, time.perf_counter() - start
+
+
+def train_bucketed(train_dataset, test_dataset, target_accuracy, args):
+    """
+    :return: (model, training seconds, epochs trained, test accuracy)
+    """
+    model = ModelArchitecture().get_model(mask_zero=True)
+    seconds = 0.0
+    start = time.perf_counter()
+    train, validation = train_validation_datasets(train_dataset.sequences, train_dataset.labels,
+                                                  validation_split=VALIDATION_SPLIT, batch_size=args.batch_size,
+                                                  buckets=PADDING_BUCKETS, max_len=MAX_LEN,
+                                                  shuffle_buffer=TRAINING_SHUFFLE_BUFFER, seed=RANDOM_STATE)
+    for epoch in range(1, args.max_epochs + 1):
+        model.fit(train, epochs=1, validation_data=validation, verbose=2)
+        seconds += time.perf_counter() - start
+        accuracy = test_accuracy(model, test_dataset)
+        if accuracy >= target_accuracy - args.tolerance:
+            break
+        start = time.perf_counter()
+    return model, seconds, epoch, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoded-train", required=True, help="encoded train set directory written by the model trainer")
+    parser.add_argument("--encoded-test", required=True, help="encoded test set directory written by the model trainer")
+    parser.add_argument("--epochs", type=int, default=EPOCH)
+    parser.add_argument("--max-epochs", type=int, help="epoch limit of the bucketed run, 4 x --epochs by default")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="accuracy gap counted as equal")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    args.max_epochs = args.max_epochs or 4 * args.epochs
+
+    tf.keras.utils.set_random_seed(RANDOM_STATE)
+    train_dataset = EncodedDataset.load(args.encoded_train)
+    test_dataset = EncodedDataset.load(args.encoded_test)
+
+    dense_model, dense_seconds = train_dense(train_dataset, args)
+    dense_accuracy = test_accuracy(dense_model, test_dataset)
+    _, bucketed_seconds, bucketed_epochs, bucketed_accuracy = train_bucketed(train_dataset, test_dataset,
+                                                                             dense_accuracy, args)
+
+    lengths = train_dataset.sequences.lengths
+    print(f"train rows: {len(train_dataset)}  mean length: {lengths.mean():.1f}")
+    print(f"dense {MAX_LEN} steps: {args.epochs} epochs, {dense_seconds:.1f}s, test accuracy {dense_accuracy:.4f}")
+    print(f"bucketed {PADDING_BUCKETS}: {bucketed_epochs} epochs, {bucketed_seconds:.1f}s, "
+          f"test accuracy {bucketed_accuracy:.4f}")
+    if bucketed_accuracy >= dense_accuracy - args.tolerance:
+        print(f"training speedup at equal accuracy: {dense_seconds / bucketed_seconds:.2f}x")
+    else:
+        print(f"bucketed input did not reach the dense accuracy within {args.max_epochs} epochs")
+
+
+if __name__ == "__main__":
+    main()
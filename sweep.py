@@ -0,0 +1,27 @@
+"""
+Hyperparameter sweep over the transformed data of the latest training run.
+
+    python sweep.py --spec sweep.yaml [--data artifacts/<run>/DataTransformationArtifacts/final.csv]
+
+The leaderboard is written to artifacts/<timestamp>/SweepArtifacts/leaderboard.csv.
+"""
+import argparse
+from textclassification.entity.config_entity import SweepConfig
+from textclassification.pipeline.sweep_pipeline import SweepPipeline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec", help="sweep spec, sweep.yaml by default")
+    parser.add_argument("--data", help="transformed final.csv, the latest run's by default")
+    parser.add_argument("--n-parallel", type=int, help="trials trained at once")
+    args = parser.parse_args()
+
+    sweep_config = SweepConfig()
+    if args.spec:
+        sweep_config.SPEC_PATH = args.spec
+    if args.n_parallel:
+        sweep_config.N_PARALLEL = args.n_parallel
+    artifacts = SweepPipeline(sweep_config, data_path=args.data).run_pipeline()
+    print(f"Leaderboard: {artifacts.leaderboard_path}")
+    print(f"Best parameters: {artifacts.best_parameters}")
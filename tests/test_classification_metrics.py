@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from textclassification.components.data_transformation import DataTransformation
+from textclassification.entity.config_entity import DataTransformationConfig
+from textclassification.ml.classification_metrics import classification_metrics
+
+
+def test_confusion_matrix_and_rates():
+    metrics = classification_metrics([0, 0, 1, 1, 1], [0.1, 0.7, 0.8, 0.9, 0.2])
+
+    assert metrics["confusion_matrix"] == [[1, 1], [1, 2]]
+    assert metrics["accuracy"] == pytest.approx(3 / 5)
+    assert metrics["precision"] == pytest.approx(2 / 3)
+    assert metrics["recall"] == pytest.approx(2 / 3)
+    assert metrics["roc_auc"] == pytest.approx(5 / 6)
+
+
+def test_label_outside_zero_one_is_rejected():
+    with pytest.raises(ValueError, match=r"found \[2\]"):
+        classification_metrics([0, 1, 2], [0.1, 0.9, 0.4])
+
+
+def test_raw_classes_are_mapped_to_binary_labels():
+    config = DataTransformationConfig()
+    raw_data = pd.DataFrame({column: [0, 0, 0] for column in config.DROP_COLUMNS})
+    raw_data[config.CLASS] = [0, 1, 2]
+    raw_data[config.TWEET] = ["a", "b", "c"]
+
+    transformed = DataTransformation(config, None).transform_raw_data(raw_data)
+
+    assert transformed[config.LABEL].tolist() == [1, 1, 0]
+    classification_metrics(transformed[config.LABEL], np.array([0.9, 0.8, 0.1]))
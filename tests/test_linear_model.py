@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from textclassification.components.data_transformation import DataTransformation
+from textclassification.entity.config_entity import DataTransformationConfig
+from textclassification.ml.linear_model import LinearTextClassifier
+
+
+def raw_data_frame(config: DataTransformationConfig) -> pd.DataFrame:
+    tweets = ["you are a hateful idiot", "what a stupid bitch", "lovely weather today", "see you at lunch"] * 5
+    raw_data = pd.DataFrame({column: 0 for column in config.DROP_COLUMNS}, index=range(len(tweets)))
+    raw_data[config.CLASS] = [0, 1, 2, 2] * 5
+    raw_data[config.TWEET] = tweets
+    return raw_data
+
+
+def test_trains_on_transformed_raw_data():
+    config = DataTransformationConfig()
+    data = DataTransformation(config, None).transform_raw_data(raw_data_frame(config))
+
+    model = LinearTextClassifier(n_features=2 ** 10, random_state=0)
+    for _ in range(5):
+        model.partial_fit(data[config.TWEET].values, data[config.LABEL].values)
+
+    scores = model.predict_texts(np.array(["stupid idiot", "lovely lunch"]))
+    assert scores[0] > 0.5 > scores[1]
+
+
+def test_label_outside_zero_one_is_rejected():
+    model = LinearTextClassifier(n_features=2 ** 10)
+    with pytest.raises(ValueError, match=r"found \[2\]"):
+        model.partial_fit(np.array(["a tweet", "another tweet"]), np.array([1, 2]))
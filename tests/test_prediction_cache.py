@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from textclassification.serving.cache import PredictionCache
+
+
+def test_coalesced_callers_share_one_computation():
+    async def scenario():
+        cache = PredictionCache(max_size=10, ttl_seconds=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 0.9
+
+        values = await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(3)))
+        return values, calls, cache
+
+    values, calls, cache = asyncio.run(scenario())
+    assert values == [0.9, 0.9, 0.9]
+    assert len(calls) == 1
+    assert cache.coalesced == 2
+
+
+def test_waiter_computes_when_leader_is_cancelled():
+    async def scenario():
+        cache = PredictionCache(max_size=10, ttl_seconds=60)
+        started = asyncio.Event()
+
+        async def slow_compute():
+            started.set()
+            await asyncio.sleep(10)
+            return 0.1
+
+        async def fast_compute():
+            return 0.7
+
+        leader = asyncio.create_task(cache.get_or_compute("key", slow_compute))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute("key", fast_compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(waiter, timeout=1), cache
+
+    value, cache = asyncio.run(scenario())
+    assert value == 0.7
+    assert cache.coalesced == 1
+    assert cache.get("key") == 0.7
+
+
+def test_waiters_get_the_leader_exception():
+    async def scenario():
+        cache = PredictionCache(max_size=10, ttl_seconds=60)
+
+        async def failing_compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model unavailable")
+
+        return await asyncio.gather(*(cache.get_or_compute("key", failing_compute) for _ in range(2)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(error) for error in errors] == ["model unavailable"] * 2
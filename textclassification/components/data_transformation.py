@@ -1,32 +1,58 @@
 import os
-import re
 import sys
-import string
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-nltk.download('stopwords')
-from sklearn.model_selection import train_test_split
 from textclassification.logger import logging 
 from textclassification.exception import CustomException
 from textclassification.entity.config_entity import DataTransformationConfig
 from textclassification.entity.artifact_entity import DataValidationArtifacts, DataTransformationArtifacts
+from textclassification.ml.text_cleaner import TextCleaner
+from textclassification.ml.cleaned_text_cache import CleanedTextCache
 
 
 class DataTransformation:
     def __init__(self,data_transformation_config: DataTransformationConfig,data_validation_artifacts:DataValidationArtifacts):
         self.data_transformation_config = data_transformation_config
         self.data_validation_artifacts = data_validation_artifacts
+        self.text_cleaner = TextCleaner()
+        self.cleaned_text_cache = None
 
     
 
+    def transform_imbalance_data(self, imbalance_data):
+        """
+        :param imbalance_data: the imbalanced data, or one chunk of it
+        :return: the frame without the id column
+        """
+        imbalance_data.drop(self.data_transformation_config.ID,axis=self.data_transformation_config.AXIS , 
+        inplace = self.data_transformation_config.INPLACE)
+        return imbalance_data
+
+
+    def transform_raw_data(self, raw_data):
+        """
+        :param raw_data: the raw data, or one chunk of it
+        :return: the frame with only the label and tweet columns
+        """
+        raw_data.drop(self.data_transformation_config.DROP_COLUMNS,axis = self.data_transformation_config.AXIS,
+        inplace = self.data_transformation_config.INPLACE)
+
+        # replace the value of 0 to 1 & 2 to 0 
+        raw_data[self.data_transformation_config.CLASS] = raw_data[self.data_transformation_config.CLASS].map(
+            self.data_transformation_config.CLASS_TO_LABEL)
+
+
+        # Let's change the name of the 'class' to label
+        raw_data.rename(columns={self.data_transformation_config.CLASS:self.data_transformation_config.LABEL},inplace =self.data_transformation_config.INPLACE)
+        return raw_data
+
+
+
     def imbalance_data_cleaning(self):
 
         try:
             logging.info("Entered into the imbalance_data_cleaning function")
             imbalance_data=pd.read_csv(self.data_validation_artifacts.valid_imbalance_data_file_path)
-            imbalance_data.drop(self.data_transformation_config.ID,axis=self.data_transformation_config.AXIS , 
-            inplace = self.data_transformation_config.INPLACE)
+            imbalance_data = self.transform_imbalance_data(imbalance_data)
             logging.info(f"Exited the imbalance data_cleaning function and returned imbalance data {imbalance_data.shape}")
             return imbalance_data 
         except Exception as e:
@@ -39,17 +65,7 @@ class DataTransformation:
         try:
             logging.info("Entered into the raw_data_cleaning function")
             raw_data = pd.read_csv(self.data_validation_artifacts.valid_raw_data_file_path)
-            raw_data.drop(self.data_transformation_config.DROP_COLUMNS,axis = self.data_transformation_config.AXIS,
-            inplace = self.data_transformation_config.INPLACE)
-
-            raw_data[raw_data[self.data_transformation_config.CLASS]==0][self.data_transformation_config.CLASS]=1
-            
-            # replace the value of 0 to 1 & 2 to 0 
-            raw_data[self.data_transformation_config.CLASS].replace({0:1},inplace=self.data_transformation_config.INPLACE)
-
-
-            # Let's change the name of the 'class' to label
-            raw_data.rename(columns={self.data_transformation_config.CLASS:self.data_transformation_config.LABEL},inplace =self.data_transformation_config.INPLACE)
+            raw_data = self.transform_raw_data(raw_data)
             logging.info(f"Exited the raw_data_cleaning function and returned the raw_data {raw_data}")
             return raw_data
 
@@ -77,23 +93,8 @@ class DataTransformation:
     def concat_data_cleaning(self, words):
 
         try:
-            logging.info("Entered into the concat_data_cleaning function")
             # Let's apply stemming and stopwords on the data
-            stemmer = nltk.SnowballStemmer("english")
-            stopword = set(stopwords.words('english'))
-            words = str(words).lower()
-            words = re.sub('\[.*?\]', '', words)
-            words = re.sub('https?://\S+|www\.\S+', '', words)
-            words = re.sub('<.*?>+', '', words)
-            words = re.sub('[%s]' % re.escape(string.punctuation), '', words)
-            words = re.sub('\n', '', words)
-            words = re.sub('\w*\d\w*', '', words)
-            words = [word for word in words.split(' ') if words not in stopword]
-            words=" ".join(words)
-            words = [stemmer.stem(word) for word in words.split(' ')]
-            words=" ".join(words)
-            logging.info("Exited the concat_data_cleaning function")
-            return words 
+            return self.text_cleaner.clean(words)
 
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -101,19 +102,157 @@ class DataTransformation:
 
     
 
+    def iter_transformed_chunks(self):
+        """
+        Method Name :   iter_transformed_chunks
+        Description :   Reads the validated raw data and then the imbalanced data in chunks of CHUNK_SIZE rows
+                        and applies the same column drops and label remap as the in-memory transformation
+        Output      :   generator of label, tweet data frames in the order of concat_dataframe
+        """
+        config = self.data_transformation_config
+        sources = [(self.data_validation_artifacts.valid_raw_data_file_path, self.transform_raw_data),
+                   (self.data_validation_artifacts.valid_imbalance_data_file_path, self.transform_imbalance_data)]
+        for file_path, transform in sources:
+            with pd.read_csv(file_path, chunksize=config.CHUNK_SIZE) as reader:
+                for chunk in reader:
+                    yield transform(chunk)[[config.LABEL, config.TWEET]]
+
+
+
+    def clean_tweets(self, texts):
+        """
+        :param texts: raw tweets
+        :return: list of cleaned tweets, taken from the cleaned text cache where possible
+        """
+        config = self.data_transformation_config
+        texts = list(texts)
+        cache = self.cleaned_text_cache
+        if cache is None:
+            return self.text_cleaner.clean_parallel(texts, n_jobs=config.CLEANING_N_JOBS,
+                                                    chunk_size=config.CLEANING_CHUNK_SIZE,
+                                                    min_rows=config.CLEANING_PARALLEL_MIN_ROWS)
+
+        keys = cache.keys(texts)
+        cleaned = cache.get_many(keys)
+        misses = [position for position, text in enumerate(cleaned) if text is None]
+        logging.info(f"{len(texts) - len(misses)} tweets found in the cleaned text cache, cleaning {len(misses)}")
+        fresh = self.text_cleaner.clean_parallel([texts[position] for position in misses],
+                                                 n_jobs=config.CLEANING_N_JOBS,
+                                                 chunk_size=config.CLEANING_CHUNK_SIZE,
+                                                 min_rows=config.CLEANING_PARALLEL_MIN_ROWS)
+        for position, text in zip(misses, fresh):
+            cleaned[position] = text
+        cache.put_many([(keys[position], cleaned[position]) for position in misses])
+        return cleaned
+
+
+
+    def clean_chunks(self, chunks):
+        """
+        :param chunks: label, tweet data frames
+        :return: generator of (chunk, list of cleaned tweets); only tweets missing from the
+                 cleaned text cache are sent to the cleaner
+        """
+        config = self.data_transformation_config
+        cache = self.cleaned_text_cache
+        if cache is None:
+            yield from self.text_cleaner.clean_chunks(chunks, n_jobs=config.CLEANING_N_JOBS,
+                                                      texts_of=lambda chunk: list(chunk[config.TWEET]))
+            return
+
+        def lookups():
+            for chunk in chunks:
+                texts = list(chunk[config.TWEET])
+                keys = cache.keys(texts)
+                cleaned = cache.get_many(keys)
+                misses = [position for position, text in enumerate(cleaned) if text is None]
+                yield chunk, texts, keys, cleaned, misses
+
+        def texts_to_clean(item):
+            _, texts, _, _, misses = item
+            return [texts[position] for position in misses]
+
+        for (chunk, _, keys, cleaned, misses), fresh in self.text_cleaner.clean_chunks(
+                lookups(), n_jobs=config.CLEANING_N_JOBS, texts_of=texts_to_clean):
+            for position, text in zip(misses, fresh):
+                cleaned[position] = text
+            cache.put_many([(keys[position], cleaned[position]) for position in misses])
+            yield chunk, cleaned
+
+
+
+    def open_cleaned_text_cache(self):
+        """
+        :return: the cleaned text cache of the current cleaner version, or None when it is disabled
+        """
+        if not self.data_transformation_config.CLEANED_TEXT_CACHE:
+            return None
+        cache = CleanedTextCache(self.data_transformation_config.CLEANED_TEXT_CACHE_PATH, self.text_cleaner.version,
+                                 max_rows=self.data_transformation_config.CLEANED_TEXT_CACHE_MAX_ROWS)
+        # Rows served from the cache are never stemmed, so the stems learned with them are restored
+        self.text_cleaner.stem_cache.update(cache.load_stems())
+        return cache
+
+
+
+    def stream_transformation(self):
+        """
+        Method Name :   stream_transformation
+        Description :   Cleans the tweets chunk by chunk and appends every chunk to the transformed file,
+                        so peak memory depends on the chunk size and not on the dataset size
+        Output      :   number of rows written
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the stream_transformation method of Data transformation class")
+        try:
+            config = self.data_transformation_config
+            # Write next to the final file and rename at the end, so a failed run never leaves half a final.csv
+            partial_path = config.TRANSFORMED_FILE_PATH + ".partial"
+            rows = 0
+            with open(partial_path, 'w', newline='', encoding='utf-8') as handle:
+                for chunk, cleaned in self.clean_chunks(self.iter_transformed_chunks()):
+                    chunk[config.TWEET] = cleaned
+                    chunk.to_csv(handle, index=False, header=handle.tell() == 0)
+                    rows += len(chunk)
+                    logging.info(f"Transformed {rows} rows")
+            os.replace(partial_path, config.TRANSFORMED_FILE_PATH)
+            logging.info("Exited the stream_transformation method of Data transformation class")
+            return rows
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
     def initiate_data_transformation(self) -> DataTransformationArtifacts:
         try:
             logging.info("Entered the initiate_data_transformation method of Data transformation class")
-            self.imbalance_data_cleaning()
-            self.raw_data_cleaning()
-            df = self.concat_dataframe()
-            df[self.data_transformation_config.TWEET]=df[self.data_transformation_config.TWEET].map(self.concat_data_cleaning)
-
             os.makedirs(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR, exist_ok=True)
-            df.to_csv(self.data_transformation_config.TRANSFORMED_FILE_PATH,index=False,header=True)
+            self.cleaned_text_cache = self.open_cleaned_text_cache()
+            try:
+                if self.data_transformation_config.STREAMING:
+                    self.stream_transformation()
+                else:
+                    df = self.concat_dataframe()
+                    logging.info("Cleaning the tweets")
+                    df[self.data_transformation_config.TWEET]=self.clean_tweets(df[self.data_transformation_config.TWEET])
+                    df.to_csv(self.data_transformation_config.TRANSFORMED_FILE_PATH,index=False,header=True)
+
+                if self.cleaned_text_cache is not None:
+                    logging.info(f"Cleaned text cache: {self.cleaned_text_cache.stats()}")
+                    self.cleaned_text_cache.save_stems(self.text_cleaner.stem_cache.table.items())
+                    pruned = self.cleaned_text_cache.prune()
+                    logging.info(f"Pruned {pruned} least recently used tweets from the cleaned text cache")
+            finally:
+                if self.cleaned_text_cache is not None:
+                    self.cleaned_text_cache.close()
+                    self.cleaned_text_cache = None
+            logging.info(f"Stem cache after cleaning: {self.text_cleaner.stem_cache.stats()}")
+            self.text_cleaner.stem_cache.save(self.data_transformation_config.STEM_CACHE_PATH)
 
             data_transformation_artifact = DataTransformationArtifacts(
-                transformed_data_path = self.data_transformation_config.TRANSFORMED_FILE_PATH
+                transformed_data_path = self.data_transformation_config.TRANSFORMED_FILE_PATH,
+                stem_cache_path = self.data_transformation_config.STEM_CACHE_PATH
             )
             logging.info("returning the DataTransformationArtifacts")
             return data_transformation_artifact
@@ -0,0 +1,103 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from textclassification.logger import logging
+from textclassification.exception import CustomException
+from textclassification.constants import *
+from textclassification.ml.cascade import Cascade, calibrate_band
+from textclassification.ml.linear_model import LinearTextClassifier
+from textclassification.ml.numpy_model import NumpyLSTMClassifier
+from textclassification.ml.quantization import QuantizedLSTMClassifier
+from textclassification.ml.encoded_dataset import EncodedDataset
+from textclassification.entity.config_entity import ModelCascadeConfig
+from textclassification.entity.artifact_entity import ModelCascadeArtifacts, ModelTrainerArtifacts, ModelQuantizationArtifacts
+
+
+class ModelCascade:
+    def __init__(self, model_cascade_config: ModelCascadeConfig,
+                 model_trainer_artifacts: ModelTrainerArtifacts,
+                 model_quantization_artifacts: ModelQuantizationArtifacts = None):
+        """
+        :param model_cascade_config: Configuration for the cascade calibration
+        :param model_trainer_artifacts: Output reference of model trainer artifact stage
+        :param model_quantization_artifacts: Output reference of model quantization artifact stage
+        """
+        self.model_cascade_config = model_cascade_config
+        self.model_trainer_artifacts = model_trainer_artifacts
+        self.model_quantization_artifacts = model_quantization_artifacts
+
+
+    def get_second_stage_model(self):
+        """
+        :return: (name, model) of the LSTM that serving will load: the int8 model when it is accepted and
+                 SERVING_MODEL_FORMAT prefers it, the float model otherwise
+        """
+        if (self.model_cascade_config.SERVING_MODEL_FORMAT == 'int8' and self.model_quantization_artifacts is not None
+                and self.model_quantization_artifacts.is_quantized_model_accepted):
+            return QUANTIZED_MODEL_NAME, QuantizedLSTMClassifier.load(self.model_quantization_artifacts.quantized_model_path)
+        return NUMPY_MODEL_NAME, NumpyLSTMClassifier.load(self.model_trainer_artifacts.numpy_model_path)
+
+
+    def get_scores(self):
+        """
+        :return: (linear first-stage scores, scores of the served LSTM, labels, name of the served LSTM) of
+                 x_test, in the order of the encoded test set
+        """
+        try:
+            test_dataset = EncodedDataset.load(self.model_trainer_artifacts.encoded_test_dir)
+            # x_test.csv and the encoded test set are both written in spliting_data's order
+            x_test = pd.read_csv(self.model_trainer_artifacts.x_test_path, index_col=0)[TWEET].fillna('')
+            first_scores = LinearTextClassifier.load(self.model_trainer_artifacts.linear_model_path).predict_texts(x_test.values)
+            second_stage_model, model = self.get_second_stage_model()
+            second_scores = model.predict_sequences(test_dataset.sequences)
+            return first_scores, second_scores, np.asarray(test_dataset.labels), second_stage_model
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def initiate_model_cascade(self) -> ModelCascadeArtifacts:
+        """
+            Method Name :   initiate_model_cascade
+            Description :   Calibrates on x_test the band of linear first-stage scores that is escalated to
+                            the LSTM that will be served, int8 or float, the narrowest one for which the cascade
+                            gives the LSTM-only label on the target share of x_test, and writes it with the
+                            accuracies of both stages and the name of that LSTM
+
+            Output      :   Returns model cascade artifact
+            On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_model_cascade method of ModelCascade class")
+        try:
+            os.makedirs(self.model_cascade_config.MODEL_CASCADE_ARTIFACTS_DIR, exist_ok=True)
+            first_scores, second_scores, y_test, second_stage_model = self.get_scores()
+            threshold = self.model_cascade_config.THRESHOLD
+            band = calibrate_band(first_scores, second_scores, self.model_cascade_config.TARGET_AGREEMENT,
+                                  threshold=threshold)
+
+            escalated = Cascade(None, band["low"], band["high"]).escalate(first_scores)
+            cascade_scores = np.where(escalated, second_scores, first_scores)
+            report = {
+                **band,
+                "target_agreement": self.model_cascade_config.TARGET_AGREEMENT,
+                # The band only holds for the LSTM it was calibrated against
+                "second_stage_model": second_stage_model,
+                "first_stage_accuracy": float(np.mean((first_scores > threshold) == y_test)),
+                "lstm_accuracy": float(np.mean((second_scores > threshold) == y_test)),
+                "cascade_accuracy": float(np.mean((cascade_scores > threshold) == y_test)),
+            }
+            Cascade.save_band(self.model_cascade_config.CASCADE_FILE_PATH, report)
+            logging.info(f"Cascade band {band['low']:.4f}-{band['high']:.4f} for {second_stage_model} escalates "
+                         f"{band['escalation_rate']:.1%} of x_test with {band['agreement']:.2%} agreement: {report}")
+
+            model_cascade_artifacts = ModelCascadeArtifacts(cascade_file_path=self.model_cascade_config.CASCADE_FILE_PATH,
+                                                            low=band["low"], high=band["high"],
+                                                            agreement=band["agreement"],
+                                                            escalation_rate=band["escalation_rate"],
+                                                            second_stage_model=second_stage_model)
+            logging.info("Exited the initiate_model_cascade method of ModelCascade class")
+            return model_cascade_artifacts
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
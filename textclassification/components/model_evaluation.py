@@ -1,39 +1,47 @@
 import os
 import sys
-import keras
+import time
 import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+import keras
 import numpy as np
 import pandas as pd
 from textclassification.logger import logging
 from textclassification.exception import CustomException
-from keras.utils import pad_sequences
 from textclassification.constants import *
-# from textclassification.ml.model import ModelArchitecture
 from textclassification.configuration.gcloud_syncer import GCloudSync
-# from keras.preprocessing.text import Tokenizer
-from sklearn.metrics import confusion_matrix
+from textclassification.ml.bucketing import LengthBucketedModel
+from textclassification.ml.encoded_dataset import EncodedDataset
+from textclassification.ml.linear_model import LinearTextClassifier
+from textclassification.ml.vocabulary import Vocabulary
+from textclassification.ml.classification_metrics import classification_metrics
 from textclassification.entity.config_entity import ModelEvaluationConfig
-from textclassification.entity.artifact_entity import ModelEvaluationArtifacts, ModelTrainerArtifacts, DataTransformationArtifacts
+from textclassification.entity.artifact_entity import ModelEvaluationArtifacts, ModelTrainerArtifacts
 
 
 class ModelEvaluation:
     def __init__(self, model_evaluation_config: ModelEvaluationConfig,
                  model_trainer_artifacts: ModelTrainerArtifacts):
         """
-        :param model_evaluation_config: Configuration for model eva            model = model_architecture.get_model()
- data transformation artifact stage
+        :param model_evaluation_config: Configuration for model evaluation
         :param model_trainer_artifacts: Output reference of model trainer artifact stage
         """
 
         self.model_evaluation_config = model_evaluation_config
         self.model_trainer_artifacts = model_trainer_artifacts
         self.gcloud = GCloudSync()
+        self.test_dataset = None
+        self.x_test = None
+        # Models are loaded one at a time, keras model loading is not thread safe; the forward passes run concurrently
+        self._load_lock = threading.Lock()
+
 
 
-    
     def get_best_model_from_gcloud(self) -> str:
         """
-        :return: Fetch best model from gcloud storage and store inside best model directory path
+        :return: Fetch best model, with its vocabulary, from gcloud storage and store inside best model directory path
         """
         try:
             logging.info("Entered the get_best_model_from_gcloud method of Model Evaluation class")
@@ -43,103 +51,182 @@ class ModelEvaluation:
             self.gcloud.sync_folder_from_gcloud(self.model_evaluation_config.BUCKET_NAME,
                                                 self.model_evaluation_config.MODEL_NAME,
                                                 self.model_evaluation_config.BEST_MODEL_DIR_PATH)
+            if self.model_trainer_artifacts.model_family == 'lstm':
+                self.gcloud.sync_folder_from_gcloud(self.model_evaluation_config.BUCKET_NAME,
+                                                    self.model_evaluation_config.VOCABULARY_NAME,
+                                                    self.model_evaluation_config.BEST_MODEL_DIR_PATH)
 
             best_model_path = os.path.join(self.model_evaluation_config.BEST_MODEL_DIR_PATH,
                                            self.model_evaluation_config.MODEL_NAME)
             logging.info("Exited the get_best_model_from_gcloud method of Model Evaluation class")
             return best_model_path
         except Exception as e:
-            raise CustomException(e, sys) from e 
-        
+            raise CustomException(e, sys) from e
+
+
+
+    @staticmethod
+    def loss_and_accuracy(y_true, y_pred):
+        """
+        :return: [binary crossentropy, binary accuracy], matching what keras model.evaluate reports
+        """
+        metrics = classification_metrics(y_true, y_pred)
+        return [metrics["loss"], metrics["accuracy"]]
+
+
+    def get_test_data(self) -> EncodedDataset:
+        """
+        :return: the test set encoded by the model trainer, memory-mapped once and shared by every evaluated model
+        """
+        if self.test_dataset is None:
+            self.test_dataset = EncodedDataset.load(self.model_trainer_artifacts.encoded_test_dir)
+        return self.test_dataset
+
+
+    def get_x_test(self):
+        """
+        :return: x_test texts, read once from the CSV the trainer wrote, in the order of the encoded test set
+        """
+        if self.x_test is None:
+            self.x_test = pd.read_csv(self.model_trainer_artifacts.x_test_path, index_col=0)[TWEET].fillna('')
+        return self.x_test
+
 
-    
-    def evaluate(self,model_path:str):
+    def get_labels(self):
+        if self.model_trainer_artifacts.model_family == 'linear':
+            return pd.read_csv(self.model_trainer_artifacts.y_test_path, index_col=0)[LABEL].values
+        return np.asarray(self.get_test_data().labels)
+
+
+    def get_test_sequences(self, vocabulary_path: str = None):
+        """
+        :param vocabulary_path: vocabulary of the evaluated model, None for the trained model
+        :return: x_test encoded for that model. The test set encoded by the trainer is reused when the
+                 vocabulary fingerprints match, e.g. for a best model that was fine-tuned incrementally;
+                 otherwise x_test is encoded again with the model's own vocabulary.
+        """
+        test_dataset = self.get_test_data()
+        if vocabulary_path is None:
+            return test_dataset.sequences
+        if os.path.isfile(vocabulary_path):
+            vocabulary = Vocabulary.load(vocabulary_path)
+        elif os.path.isfile(self.model_evaluation_config.TOKENIZER_PATH):
+            # Models pushed before vocab.bin existed were trained with the tokenizer pickled in cwd
+            logging.info(f"{vocabulary_path} not found, falling back to {self.model_evaluation_config.TOKENIZER_PATH}")
+            with open(self.model_evaluation_config.TOKENIZER_PATH, 'rb') as handle:
+                vocabulary = Vocabulary.from_tokenizer(pickle.load(handle))
+        else:
+            # Another model's word index would make its accuracy meaningless, so there is nothing to compare
+            raise FileNotFoundError(f"Neither {vocabulary_path} nor {self.model_evaluation_config.TOKENIZER_PATH} "
+                                    f"found, the best model cannot be evaluated")
+
+        if vocabulary.fingerprint == test_dataset.vocabulary_fingerprint:
+            return test_dataset.sequences
+        logging.info(f"Encoding x_test again with vocabulary {vocabulary.fingerprint} of {vocabulary_path}")
+        return EncodedDataset.encode(vocabulary, self.get_x_test(), test_dataset.labels,
+                                     n_jobs=self.model_evaluation_config.TOKENIZER_N_JOBS,
+                                     chunk_size=self.model_evaluation_config.TOKENIZER_CHUNK_SIZE).sequences
+
+
+    def predict(self, model_path: str, vocabulary_path: str = None):
+        """
+        :return: scores of the model on x_test, from a single batched forward pass
         """
+        if self.model_trainer_artifacts.model_family == 'linear':
+            return LinearTextClassifier.load(model_path).predict_texts(self.get_x_test().values)
 
-        :param model: Currently trained model or best model from gcloud storage
-        :param data_loader: Data loader for validation dataset
-        :return: loss
+        sequences = self.get_test_sequences(vocabulary_path)
+        with self._load_lock:
+            model = LengthBucketedModel(keras.models.load_model(model_path))
+        # Each length bucket is padded only to its own length instead of MAX_LEN
+        return model.predict_sequences(sequences)
+
+
+
+    def evaluate(self, model_path: str, vocabulary_path: str = None) -> dict:
+        """
+        :param model_path: Currently trained model or best model from gcloud storage
+        :param vocabulary_path: vocabulary of the model when it is not the trained model's
+        :return: loss, accuracy, precision, recall, f1, roc_auc and confusion matrix on x_test
         """
         try:
-            logging.info("Entering into to the evaluate function of Model Evaluation class")
-            print(self.model_trainer_artifacts.x_test_path)
-
-            x_test = pd.read_csv(self.model_trainer_artifacts.x_test_path,index_col=0)
-            print(x_test)
-            y_test = pd.read_csv(self.model_trainer_artifacts.y_test_path,index_col=0)
-
-            with open('tokenizer.pickle', 'rb') as handle:
-                tokenizer = pickle.load(handle)
-
-            load_model=keras.models.load_model(model_path)
-
-            x_test = x_test['tweet'].astype(str)
-
-            x_test = x_test.squeeze()
-            y_test = y_test.squeeze()
-
-            test_sequences = tokenizer.texts_to_sequences(x_test)
-            test_sequences_matrix = pad_sequences(test_sequences,maxlen=MAX_LEN)
-            print(f"----------{test_sequences_matrix}------------------")
-
-            print(f"-----------------{x_test.shape}--------------")
-            print(f"-----------------{y_test.shape}--------------")
-            accuracy = load_model.evaluate(test_sequences_matrix,y_test)
-            logging.info(f"the test accuracy is {accuracy}")
-
-            lstm_prediction = load_model.predict(test_sequences_matrix)
-            res = []
-            for prediction in lstm_prediction:
-                if prediction[0] < 0.5:
-                    res.append(0)
-                else:
-                    res.append(1)
-            print(confusion_matrix(y_test,res))
-            logging.info(f"the confusion_matrix is {confusion_matrix(y_test,res)} ")
-            return accuracy
+            logging.info(f"Entering into to the evaluate function of Model Evaluation class for {model_path}")
+            start = time.perf_counter()
+            scores = self.predict(model_path, vocabulary_path)
+            metrics = classification_metrics(self.get_labels(), scores, threshold=self.model_evaluation_config.THRESHOLD)
+            metrics["seconds"] = round(time.perf_counter() - start, 3)
+            logging.info(f"the test metrics of {model_path} are {metrics}")
+            return metrics
         except Exception as e:
             raise CustomException(e, sys) from e
-        
 
-    
+
+
     def initiate_model_evaluation(self) -> ModelEvaluationArtifacts:
         """
             Method Name :   initiate_model_evaluation
-            Description :   This function is used to initiate all steps of the model evaluation
+            Description :   Scores the trained model and the best model from gcloud storage on x_test, one
+                            forward pass each and both at once, accepts the trained model unless the best
+                            model is more accurate, and writes both models' metrics to the evaluation report
 
             Output      :   Returns model evaluation artifact
             On Failure  :   Write an exception log and then raise an exception
         """
         logging.info("Initiate Model Evaluation")
         try:
-
-            trained_model_accuracy = self.evaluate(self.model_trainer_artifacts.trained_model_path)
+            os.makedirs(self.model_evaluation_config.MODEL_EVALUATION_MODEL_DIR, exist_ok=True)
+            # Read the shared test data before the threads do
+            self.get_labels()
+            if self.model_trainer_artifacts.model_family == 'linear':
+                self.get_x_test()
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # The trained model is scored while the best model downloads
+                trained_model_future = executor.submit(self.evaluate, self.model_trainer_artifacts.trained_model_path)
+
+                logging.info("Fetch best model from gcloud storage")
+                best_model_path = self.get_best_model_from_gcloud()
+                best_model_future = None
+                logging.info("Check is best model present in the gcloud storage or not ?")
+                if os.path.isfile(best_model_path):
+                    vocabulary_path = None
+                    if self.model_trainer_artifacts.model_family == 'lstm':
+                        vocabulary_path = os.path.join(self.model_evaluation_config.BEST_MODEL_DIR_PATH,
+                                                       self.model_evaluation_config.VOCABULARY_NAME)
+                    best_model_future = executor.submit(self.evaluate, best_model_path, vocabulary_path)
+
+                trained_model_metrics = trained_model_future.result()
+                best_model_metrics = best_model_future.result() if best_model_future is not None else None
+
+            trained_model_accuracy = trained_model_metrics["accuracy"]
             logging.info(f"Trained model accuracy is {trained_model_accuracy}")
-
-            logging.info("Fetch best model from gcloud storage")
-            best_model_path = self.get_best_model_from_gcloud()
-
-            logging.info("Check is best model present in the gcloud storage or not ?")
-            if os.path.isfile(best_model_path) is False:
+            if best_model_metrics is None:
+                best_model_accuracy = None
                 is_model_accepted = True
                 logging.info("glcoud storage model is false and currently trained model accepted is true")
-
             else:
-                logging.info("Load best model fetched from gcloud storage")
-                best_model_accuracy= self.evaluate(best_model_path)
+                best_model_accuracy = best_model_metrics["accuracy"]
                 logging.info(f"Best model accuracy is {best_model_accuracy}")
-
-                logging.info("Comparing loss between best_model_loss and trained_model_loss ? ")
-                if best_model_accuracy > trained_model_accuracy:
-                    is_model_accepted = False
-                    logging.info("Trained model not accepted")
-                else:
-                    is_model_accepted = True
-                    logging.info("Trained model accepted")
-
-            model_evaluation_artifacts = ModelEvaluationArtifacts(is_model_accepted=is_model_accepted)
+                is_model_accepted = trained_model_accuracy >= best_model_accuracy
+                logging.info("Trained model accepted" if is_model_accepted else "Trained model not accepted")
+
+            report = {
+                "model_family": self.model_trainer_artifacts.model_family,
+                "compared_metric": "accuracy",
+                "is_model_accepted": is_model_accepted,
+                "trained_model": trained_model_metrics,
+                "best_model": best_model_metrics,
+            }
+            with open(self.model_evaluation_config.EVALUATION_REPORT_PATH, 'w') as file:
+                yaml.dump(report, file)
+
+            model_evaluation_artifacts = ModelEvaluationArtifacts(
+                is_model_accepted=is_model_accepted,
+                evaluation_report_path=self.model_evaluation_config.EVALUATION_REPORT_PATH,
+                trained_model_accuracy=trained_model_accuracy,
+                best_model_accuracy=best_model_accuracy)
             logging.info("Returning the ModelEvaluationArtifacts")
             return model_evaluation_artifacts
 
         except Exception as e:
-            raise CustomException(e, sys) from e
\ No newline at end of file
+            raise CustomException(e, sys) from e
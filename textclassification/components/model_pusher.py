@@ -3,14 +3,20 @@ from textclassification.logger import logging
 from textclassification.exception import CustomException
 from textclassification.configuration.gcloud_syncer import GCloudSync
 from textclassification.entity.config_entity import ModelPusherConfig
-from textclassification.entity.artifact_entity import ModelPusherArtifacts
+from textclassification.entity.artifact_entity import ModelPusherArtifacts, ModelQuantizationArtifacts, ModelCascadeArtifacts
 
 class ModelPusher:
-    def __init__(self, model_pusher_config: ModelPusherConfig):
+    def __init__(self, model_pusher_config: ModelPusherConfig,
+                 model_quantization_artifacts: ModelQuantizationArtifacts = None,
+                 model_cascade_artifacts: ModelCascadeArtifacts = None):
         """
         :param model_pusher_config: Configuration for model pusher
+        :param model_quantization_artifacts: Output reference of model quantization artifact stage
+        :param model_cascade_artifacts: Output reference of model cascade artifact stage, None without a cascade
         """
         self.model_pusher_config = model_pusher_config
+        self.model_quantization_artifacts = model_quantization_artifacts
+        self.model_cascade_artifacts = model_cascade_artifacts
         self.gcloud = GCloudSync()
 
     
@@ -24,14 +30,64 @@ class ModelPusher:
         """
         logging.info("Entered initiate_model_pusher method of ModelTrainer class")
         try:
-            # Uploading the model to gcloud storage
+            if self.model_pusher_config.MODEL_FAMILY == 'linear':
+                # The linear model needs no vocabulary, only the stems to warm the serving text cleaner
+                self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                  self.model_pusher_config.TRAINED_MODEL_PATH,
+                                                  self.model_pusher_config.STEM_CACHE_NAME)
+                self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                  self.model_pusher_config.TRAINED_MODEL_PATH,
+                                                  self.model_pusher_config.LINEAR_MODEL_NAME)
+                logging.info("Uploaded the linear model to gcloud storage")
+                # Nothing was quantized, and an int8 LSTM left in the bucket must not outlive this push
+                self.gcloud.remove_file_from_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                    self.model_pusher_config.QUANTIZED_MODEL_NAME)
+                return ModelPusherArtifacts(bucket_name=self.model_pusher_config.BUCKET_NAME)
+
+            # Uploading the model to gcloud storage. The vocabulary, stem cache and row manifest go first, so a
+            # server or incremental run that notices the new model always downloads the files belonging to it
+            self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                              self.model_pusher_config.TRAINED_MODEL_PATH,
+                                              self.model_pusher_config.VOCABULARY_NAME)
+            self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                              self.model_pusher_config.TRAINED_MODEL_PATH,
+                                              self.model_pusher_config.STEM_CACHE_NAME)
+            self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                              self.model_pusher_config.TRAINED_MODEL_PATH,
+                                              self.model_pusher_config.ROW_MANIFEST_NAME)
+            if self.model_cascade_artifacts is not None:
+                self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                  self.model_pusher_config.TRAINED_MODEL_PATH,
+                                                  self.model_pusher_config.CASCADE_LINEAR_MODEL_NAME)
+                self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                  self.model_pusher_config.MODEL_CASCADE_DIR,
+                                                  self.model_pusher_config.CASCADE_FILE_NAME)
+                logging.info("Uploaded the cascade first stage and band to gcloud storage")
+            else:
+                # A band calibrated against an earlier LSTM must not be served with the new one
+                self.gcloud.remove_file_from_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                    self.model_pusher_config.CASCADE_FILE_NAME)
 
             self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
                                               self.model_pusher_config.TRAINED_MODEL_PATH,
                                               self.model_pusher_config.MODEL_NAME)
+            self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                              self.model_pusher_config.TRAINED_MODEL_PATH,
+                                              self.model_pusher_config.NUMPY_MODEL_NAME)
 
             logging.info("Uploaded best model to gcloud storage")
 
+            if self.model_quantization_artifacts is not None and self.model_quantization_artifacts.is_quantized_model_accepted:
+                self.gcloud.sync_folder_to_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                  self.model_pusher_config.QUANTIZED_MODEL_DIR,
+                                                  self.model_pusher_config.QUANTIZED_MODEL_NAME)
+                logging.info("Uploaded quantized model to gcloud storage")
+            else:
+                # An int8 model left over from an earlier run must not be served next to the new model
+                self.gcloud.remove_file_from_gcloud(self.model_pusher_config.BUCKET_NAME,
+                                                    self.model_pusher_config.QUANTIZED_MODEL_NAME)
+                logging.info("Quantized model not accepted, serving falls back to the float model")
+
             # Saving the model pusher artifacts
             model_pusher_artifact = ModelPusherArtifacts(
                 bucket_name=self.model_pusher_config.BUCKET_NAME
@@ -0,0 +1,95 @@
+import os
+import sys
+import yaml
+import numpy as np
+from textclassification.logger import logging
+from textclassification.exception import CustomException
+from textclassification.ml.numpy_model import NumpyLSTMClassifier
+from textclassification.ml.quantization import QuantizedLSTMClassifier
+from textclassification.ml.encoded_dataset import EncodedDataset
+from textclassification.entity.config_entity import ModelQuantizationConfig
+from textclassification.entity.artifact_entity import ModelQuantizationArtifacts, ModelTrainerArtifacts
+
+
+class ModelQuantization:
+    def __init__(self, model_quantization_config: ModelQuantizationConfig,
+                 model_trainer_artifacts: ModelTrainerArtifacts):
+        """
+        :param model_quantization_config: Configuration for model quantization
+        :param model_trainer_artifacts: Output reference of model trainer artifact stage
+        """
+        self.model_quantization_config = model_quantization_config
+        self.model_trainer_artifacts = model_trainer_artifacts
+
+
+    def get_test_data(self):
+        """
+        :return: x_test token sequences and y_test labels, memory-mapped from the trainer's encoded test set
+        """
+        try:
+            test_dataset = EncodedDataset.load(self.model_trainer_artifacts.encoded_test_dir)
+            return test_dataset.sequences, test_dataset.labels
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    @staticmethod
+    def accuracy(model, sequences, y_test) -> float:
+        return float(np.mean(y_test == (model.predict_sequences(sequences) > 0.5)))
+
+
+    def initiate_model_quantization(self) -> ModelQuantizationArtifacts:
+        """
+            Method Name :   initiate_model_quantization
+            Description :   Writes an int8 version of the trained model and compares its x_test accuracy
+                            with the float model. The quantized model is only accepted when the drop stays
+                            within the configured tolerance.
+
+            Output      :   Returns model quantization artifact
+            On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_model_quantization method of ModelQuantization class")
+        try:
+            if self.model_trainer_artifacts.model_family != 'lstm':
+                logging.info(f"Nothing to quantize for the {self.model_trainer_artifacts.model_family} model family")
+                return ModelQuantizationArtifacts(quantized_model_path=None, float_accuracy=None,
+                                                  quantized_accuracy=None, is_quantized_model_accepted=False)
+
+            os.makedirs(self.model_quantization_config.MODEL_QUANTIZATION_ARTIFACTS_DIR, exist_ok=True)
+
+            float_model = NumpyLSTMClassifier.load(self.model_trainer_artifacts.numpy_model_path)
+            quantized_model = QuantizedLSTMClassifier.from_float(float_model)
+            quantized_model.save(self.model_quantization_config.QUANTIZED_MODEL_PATH)
+            logging.info(f"Quantized model saved to {self.model_quantization_config.QUANTIZED_MODEL_PATH}")
+
+            sequences, y_test = self.get_test_data()
+            float_accuracy = self.accuracy(float_model, sequences, y_test)
+            quantized_accuracy = self.accuracy(quantized_model, sequences, y_test)
+            accuracy_drop = float_accuracy - quantized_accuracy
+            is_quantized_model_accepted = accuracy_drop <= self.model_quantization_config.ACCURACY_TOLERANCE
+            logging.info(f"float accuracy {float_accuracy}, int8 accuracy {quantized_accuracy}, "
+                         f"accepted: {is_quantized_model_accepted}")
+
+            report = {
+                'float_accuracy': float_accuracy,
+                'quantized_accuracy': quantized_accuracy,
+                'accuracy_drop': accuracy_drop,
+                'accuracy_tolerance': self.model_quantization_config.ACCURACY_TOLERANCE,
+                'float_model_bytes': os.path.getsize(self.model_trainer_artifacts.numpy_model_path),
+                'quantized_model_bytes': os.path.getsize(self.model_quantization_config.QUANTIZED_MODEL_PATH),
+                'is_quantized_model_accepted': is_quantized_model_accepted,
+            }
+            with open(self.model_quantization_config.QUANTIZATION_REPORT_PATH, 'w') as file:
+                yaml.dump(report, file)
+
+            model_quantization_artifacts = ModelQuantizationArtifacts(
+                quantized_model_path=self.model_quantization_config.QUANTIZED_MODEL_PATH,
+                float_accuracy=float_accuracy,
+                quantized_accuracy=quantized_accuracy,
+                is_quantized_model_accepted=is_quantized_model_accepted)
+            logging.info("Exited the initiate_model_quantization method of ModelQuantization class")
+            return model_quantization_artifacts
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -1,16 +1,25 @@
 import os 
 import sys
-import pickle
+import time
+import shutil
+import hashlib
+import keras
+import numpy as np
 import pandas as pd
 from textclassification.logger import logging
 from textclassification.constants import *
 from textclassification.exception import CustomException
+from textclassification.configuration.gcloud_syncer import GCloudSync
 from sklearn.model_selection import train_test_split
-from keras.preprocessing.text import Tokenizer
-from keras.utils import pad_sequences
 from textclassification.entity.config_entity import ModelTrainerConfig
 from textclassification.entity.artifact_entity import ModelTrainerArtifacts,DataTransformationArtifacts
 from textclassification.ml.model import ModelArchitecture
+from textclassification.ml.numpy_model import NumpyLSTMClassifier
+from textclassification.ml.vocabulary import Vocabulary
+from textclassification.ml.encoded_dataset import EncodedDataset
+from textclassification.ml.training_data import train_validation_datasets
+from textclassification.ml.checkpointing import TrainingCheckpoints, training_fingerprint
+from textclassification.ml.row_manifest import RowManifest, row_hashes, hash_split
 
 
 
@@ -20,6 +29,9 @@ class ModelTrainer:
 
         self.data_transformation_artifacts = data_transformation_artifacts
         self.model_trainer_config = model_trainer_config
+        self.gcloud = GCloudSync()
+        # md5 of the best model an incremental run fine-tunes, None when training from scratch
+        self.base_model_version = None
 
     
     def spliting_data(self,csv_path):
@@ -28,11 +40,13 @@ class ModelTrainer:
             logging.info("Reading the data")
             df = pd.read_csv(csv_path, index_col=False)
             logging.info("Splitting the data into x and y")
-            x = df[TWEET]
+            # Tweets made only of stopwords are empty after cleaning and read back as NaN
+            x = df[TWEET].fillna('')
             y = df[LABEL]
 
             logging.info("Applying train_test_split on the data")
-            x_train,x_test,y_train,y_test = train_test_split(x,y, test_size=0.3,random_state = 42)
+            x_train,x_test,y_train,y_test = train_test_split(x,y, test_size=self.model_trainer_config.TEST_SIZE,
+                                                             random_state = self.model_trainer_config.RANDOM_STATE)
             print(len(x_train),len(y_train))
             print(len(x_test),len(y_test))
             print(type(x_train),type(y_train))
@@ -44,22 +58,258 @@ class ModelTrainer:
         
 
     
-    def tokenizing(self,x_train):
+    def encode(self, vocabulary, x, y) -> EncodedDataset:
+        return EncodedDataset.encode(vocabulary, x, y, n_jobs=self.model_trainer_config.TOKENIZER_N_JOBS,
+                                     chunk_size=self.model_trainer_config.TOKENIZER_CHUNK_SIZE)
+
+
+
+    def tokenizing(self,x_train,y_train):
         try:
             logging.info("Applying tokenization on the data")
-            tokenizer = Tokenizer(num_words=self.model_trainer_config.MAX_WORDS)
-            tokenizer.fit_on_texts(x_train)
-            sequences = tokenizer.texts_to_sequences(x_train)
-            logging.info(f"converting text to sequences: {sequences}")
-            sequences_matrix = pad_sequences(sequences,maxlen=self.model_trainer_config.MAX_LEN)
-            logging.info(f" The sequence matrix is: {sequences_matrix}")
-            return sequences_matrix,tokenizer
+            # Same word index and sequences as keras Tokenizer(num_words=MAX_WORDS), counted and encoded in parallel
+            vocabulary = Vocabulary.fit(x_train, num_words=self.model_trainer_config.MAX_WORDS,
+                                        n_jobs=self.model_trainer_config.TOKENIZER_N_JOBS,
+                                        chunk_size=self.model_trainer_config.TOKENIZER_CHUNK_SIZE)
+            logging.info(f"Fitted a vocabulary of {len(vocabulary)} words")
+            train_dataset = self.encode(vocabulary, x_train, y_train)
+            logging.info(f"Encoded {len(train_dataset)} texts, {len(train_dataset.sequences.tokens)} tokens")
+            return train_dataset,vocabulary
         except Exception as e:
             raise CustomException(e, sys) from e
         
 
     
 
+    def training_settings(self) -> dict:
+        """
+        Settings the trained weights depend on. The epoch count and the early stopping settings are left
+        out, so a run with more epochs or another patience still resumes the same checkpoints.
+        """
+        config = self.model_trainer_config
+        settings = {"max_words": config.MAX_WORDS, "max_len": config.MAX_LEN, "embedding_dim": config.EMBEDDING_DIM,
+                "lstm_units": config.LSTM_UNITS, "dropout": config.DROPOUT, "learning_rate": config.LEARNING_RATE,
+                "loss": config.LOSS,
+                "metrics": config.METRICS, "activation": config.ACTIVATION, "input": config.TRAINING_INPUT,
+                "batch_size": config.BATCH_SIZE, "validation_split": config.VALIDATION_SPLIT,
+                "buckets": config.TRAINING_BUCKETS, "shuffle_buffer": config.TRAINING_SHUFFLE_BUFFER,
+                "random_state": config.RANDOM_STATE}
+        if self.base_model_version is not None:
+            # Fine-tuning other weights or at another rate must not resume these checkpoints
+            settings.update(base_model=self.base_model_version, learning_rate=config.INCREMENTAL_LEARNING_RATE)
+        return settings
+
+
+
+    def resume_checkpoints(self, model, train_dataset: EncodedDataset):
+        """
+        Method Name :   resume_checkpoints
+        Description :   Looks for the checkpoints of an earlier run on the same data and settings, copies them
+                        into this run's checkpoint directory and loads the model of the latest epoch
+
+        Output      :   Returns (model to train, checkpoints of this run)
+        """
+        try:
+            logging.info("Entered the resume_checkpoints method of ModelTrainer class")
+            fingerprint = training_fingerprint(train_dataset, self.training_settings())
+            checkpoints = TrainingCheckpoints(self.model_trainer_config.CHECKPOINT_DIR, fingerprint)
+            previous = None
+            if self.model_trainer_config.RESUME:
+                previous = TrainingCheckpoints.find_latest(self.model_trainer_config.CHECKPOINT_SEARCH_PATTERN,
+                                                           fingerprint, exclude=checkpoints.directory)
+            if previous is None:
+                logging.info(f"No checkpoints to resume, training {fingerprint} from scratch")
+            else:
+                checkpoints.resume_from(previous)
+                model = keras.models.load_model(checkpoints.latest_path)
+                logging.info(f"Resuming {fingerprint} after epoch {checkpoints.epochs_done} from {previous.directory}")
+            logging.info("Exited the resume_checkpoints method of ModelTrainer class")
+            return model, checkpoints
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
+    def fit_bucketed(self, model, train_dataset: EncodedDataset, initial_epoch: int = 0, callbacks=None, epochs: int = None):
+        """
+        Trains on a tf.data pipeline where every batch is padded only to its own length bucket,
+        holding out the same last VALIDATION_SPLIT of the rows as model.fit(validation_split=...).
+        """
+        try:
+            train, validation = train_validation_datasets(train_dataset.sequences, train_dataset.labels,
+                                                          validation_split=self.model_trainer_config.VALIDATION_SPLIT,
+                                                          batch_size=self.model_trainer_config.BATCH_SIZE,
+                                                          buckets=self.model_trainer_config.TRAINING_BUCKETS,
+                                                          max_len=self.model_trainer_config.MAX_LEN,
+                                                          shuffle_buffer=self.model_trainer_config.TRAINING_SHUFFLE_BUFFER,
+                                                          seed=self.model_trainer_config.RANDOM_STATE)
+            return model.fit(train, epochs=epochs or self.model_trainer_config.EPOCH, validation_data=validation,
+                             initial_epoch=initial_epoch, callbacks=callbacks)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
+    def test_rows(self, csv_path):
+        """
+        :return: boolean array marking the rows of csv_path that spliting_data puts in the test set;
+                 train_test_split shuffles by row position only, so the label column is enough
+        """
+        rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[LABEL],
+                                                       chunksize=self.model_trainer_config.LINEAR_CHUNK_SIZE))
+        _, test_positions = train_test_split(np.arange(rows), test_size=self.model_trainer_config.TEST_SIZE,
+                                             random_state=self.model_trainer_config.RANDOM_STATE)
+        is_test = np.zeros(rows, dtype=bool)
+        is_test[test_positions] = True
+        return is_test
+
+
+
+    def fit_linear_model(self, model_path: str, write_split: bool = True, test_positions=None) -> None:
+        """
+        Method Name :   fit_linear_model
+        Description :   Trains the linear model family with partial_fit over chunks of final.csv, never
+                        holding more than one chunk in memory, and saves it to model_path. The test
+                        rows are the same as spliting_data's; with write_split they are written to x_test.csv
+                        and y_test.csv, and the train rows to x_train.csv, while the first pass reads them.
+                        test_positions, row positions in final.csv, override the test rows, e.g. with the
+                        test set of an incremental run.
+        """
+        try:
+            logging.info("Entered the fit_linear_model method of ModelTrainer class")
+            csv_path = self.data_transformation_artifacts.transformed_data_path
+            is_test = self.test_rows(csv_path)
+            if test_positions is not None:
+                is_test[:] = False
+                is_test[test_positions] = True
+            os.makedirs(self.model_trainer_config.TRAINED_MODEL_DIR,exist_ok=True)
+            model = ModelArchitecture().get_linear_model(n_features=self.model_trainer_config.LINEAR_N_FEATURES,
+                                                         ngram_range=self.model_trainer_config.LINEAR_NGRAM_RANGE,
+                                                         alpha=self.model_trainer_config.LINEAR_ALPHA,
+                                                         random_state=self.model_trainer_config.RANDOM_STATE)
+            rng = np.random.default_rng(self.model_trainer_config.RANDOM_STATE)
+
+            start = time.perf_counter()
+            for epoch in range(self.model_trainer_config.LINEAR_EPOCHS):
+                for chunk in pd.read_csv(csv_path, index_col=False, chunksize=self.model_trainer_config.LINEAR_CHUNK_SIZE):
+                    chunk[TWEET] = chunk[TWEET].fillna('')
+                    chunk_is_test = is_test[chunk.index]
+                    train = chunk[~chunk_is_test]
+                    if epoch == 0 and write_split:
+                        first = chunk.index[0] == 0
+                        mode = 'w' if first else 'a'
+                        test = chunk[chunk_is_test]
+                        test[TWEET].to_csv(self.model_trainer_config.X_TEST_DATA_PATH, mode=mode, header=first)
+                        test[LABEL].to_csv(self.model_trainer_config.Y_TEST_DATA_PATH, mode=mode, header=first)
+                        train[TWEET].to_csv(self.model_trainer_config.X_TRAIN_DATA_PATH, mode=mode, header=first)
+                    # final.csv holds the raw rows before the imbalance rows, SGD needs them mixed
+                    order = rng.permutation(len(train))
+                    model.partial_fit(train[TWEET].values[order], train[LABEL].values[order])
+                logging.info(f"Linear model epoch {epoch + 1}/{self.model_trainer_config.LINEAR_EPOCHS} done")
+            logging.info(f"Linear model training finished in {time.perf_counter() - start:.1f}s")
+
+            model.save(model_path)
+            logging.info("Exited the fit_linear_model method of ModelTrainer class")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
+    def train_linear_model(self) -> ModelTrainerArtifacts:
+        """
+        Method Name :   train_linear_model
+        Description :   Trains the linear model family in place of the LSTM
+
+        Output      :   Returns model trainer artifact of the linear model
+        """
+        try:
+            logging.info("Entered the train_linear_model method of ModelTrainer class")
+            self.fit_linear_model(self.model_trainer_config.LINEAR_MODEL_PATH)
+            shutil.copyfile(self.data_transformation_artifacts.stem_cache_path,
+                            self.model_trainer_config.STEM_CACHE_PATH)
+
+            model_trainer_artifacts = ModelTrainerArtifacts(
+                trained_model_path = self.model_trainer_config.LINEAR_MODEL_PATH,
+                numpy_model_path = None,
+                vocabulary_path = None,
+                stem_cache_path = self.model_trainer_config.STEM_CACHE_PATH,
+                x_test_path = self.model_trainer_config.X_TEST_DATA_PATH,
+                y_test_path = self.model_trainer_config.Y_TEST_DATA_PATH,
+                encoded_train_dir = None,
+                encoded_test_dir = None,
+                model_family = 'linear',
+                linear_model_path = self.model_trainer_config.LINEAR_MODEL_PATH)
+            logging.info("Exited the train_linear_model method of ModelTrainer class")
+            return model_trainer_artifacts
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
+    def get_base_model_from_gcloud(self):
+        """
+        :return: (model path, vocabulary path, row manifest path) of the best model in gcloud storage, None when
+                 any of them is missing, e.g. before the first push or for a model pushed without a row manifest
+        """
+        try:
+            logging.info("Entered the get_base_model_from_gcloud method of ModelTrainer class")
+            os.makedirs(self.model_trainer_config.BASE_MODEL_DIR, exist_ok=True)
+            paths = []
+            for file_name in (self.model_trainer_config.BASE_MODEL_NAME,
+                              self.model_trainer_config.VOCABULARY_NAME,
+                              self.model_trainer_config.ROW_MANIFEST_NAME):
+                self.gcloud.sync_folder_from_gcloud(self.model_trainer_config.BUCKET_NAME,
+                                                    file_name,
+                                                    self.model_trainer_config.BASE_MODEL_DIR)
+                paths.append(os.path.join(self.model_trainer_config.BASE_MODEL_DIR, file_name))
+            logging.info("Exited the get_base_model_from_gcloud method of ModelTrainer class")
+            return tuple(paths) if all(os.path.isfile(path) for path in paths) else None
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
+    def incremental_split(self, csv_path, manifest: RowManifest):
+        """
+        Method Name :   incremental_split
+        Description :   Finds the rows of final.csv missing from the row manifest of the best model. Each new
+                        row goes to the test set by its hash, the others are trained on together with a replay
+                        sample of INCREMENTAL_REPLAY_RATIO earlier training rows per new one. The test set keeps
+                        the earlier test rows, so the evaluation gate also catches forgetting.
+
+        Output      :   Returns (x_train, x_test, y_train, y_test, manifest with the new rows added)
+        """
+        try:
+            logging.info("Entered the incremental_split method of ModelTrainer class")
+            df = pd.read_csv(csv_path, index_col=False)
+            x = df[TWEET].fillna('')
+            y = df[LABEL]
+            hashes = row_hashes(x.values, y.values)
+            known, known_test = manifest.lookup(hashes)
+            new_test = ~known & hash_split(hashes, self.model_trainer_config.TEST_SIZE)
+            new_train = np.flatnonzero(~known & ~new_test)
+            if not len(new_train):
+                raise Exception("No new training rows since the best model was trained, nothing to fine-tune")
+
+            rng = np.random.default_rng(self.model_trainer_config.RANDOM_STATE)
+            old_train = np.flatnonzero(known & ~known_test)
+            replay_size = min(len(old_train), int(round(self.model_trainer_config.INCREMENTAL_REPLAY_RATIO * len(new_train))))
+            replay = rng.choice(old_train, replay_size, replace=False)
+            # Mixed, so the validation split at the end is not only replayed rows
+            train_positions = rng.permutation(np.concatenate([new_train, replay]))
+            test_positions = np.flatnonzero(known_test | new_test)
+            logging.info(f"{(~known).sum()} of {len(df)} rows are new: training on {len(new_train)} of them "
+                         f"and {replay_size} replayed rows, testing on {len(test_positions)} rows")
+
+            manifest = manifest.extend(hashes[~known], new_test[~known])
+            logging.info("Exited the incremental_split method of ModelTrainer class")
+            return (x.iloc[train_positions], x.iloc[test_positions], y.iloc[train_positions], y.iloc[test_positions],
+                    manifest)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+
     def initiate_model_trainer(self,) -> ModelTrainerArtifacts:
         logging.info("Entered initiate_model_trainer method of ModelTrainer class")
 
@@ -73,10 +323,55 @@ class ModelTrainer:
 
         try:
             logging.info("Entered the initiate_model_trainer function ")
-            x_train,x_test,y_train,y_test = self.spliting_data(csv_path=self.data_transformation_artifacts.transformed_data_path)
+            if self.model_trainer_config.MODEL_FAMILY == 'linear':
+                # The linear family trains in seconds, so it always trains from scratch
+                return self.train_linear_model()
+
+            csv_path = self.data_transformation_artifacts.transformed_data_path
+            base_model = None
+            if self.model_trainer_config.TRAINING_MODE == 'incremental':
+                base_model = self.get_base_model_from_gcloud()
+                if base_model is None:
+                    logging.info("No best model with a row manifest in gcloud storage, training from scratch")
+
             model_architecture = ModelArchitecture()   
 
-            model = model_architecture.get_model()
+            bucketed_input = self.model_trainer_config.TRAINING_INPUT == 'bucketed'
+            if base_model is not None:
+                base_model_path, base_vocabulary_path, base_manifest_path = base_model
+                x_train,x_test,y_train,y_test,manifest = self.incremental_split(csv_path, RowManifest.load(base_manifest_path))
+                with open(base_model_path, 'rb') as handle:
+                    self.base_model_version = hashlib.md5(handle.read()).hexdigest()
+                logging.info(f"Fine-tuning the best model {self.base_model_version}")
+                model = model_architecture.get_fine_tuning_model(base_model_path,
+                                                                 learning_rate=self.model_trainer_config.INCREMENTAL_LEARNING_RATE)
+                # Bucketed batches are padded at the end, which only a masked Embedding ignores; a best model
+                # trained on dense input is fine-tuned on dense input as well
+                embedding = next(layer for layer in model.layers if isinstance(layer, keras.layers.Embedding))
+                if embedding.get_config()['mask_zero'] != bucketed_input:
+                    bucketed_input = embedding.get_config()['mask_zero']
+                    logging.info(f"The best model was trained on {'bucketed' if bucketed_input else 'dense'} input, "
+                                 f"fine-tuning it on the same instead of {self.model_trainer_config.TRAINING_INPUT}")
+                # The embedding rows belong to the word index of the best model, so its vocabulary is kept;
+                # words first seen in the new rows are only learned by the next full training
+                vocabulary = Vocabulary.load(base_vocabulary_path)
+                train_dataset = self.encode(vocabulary, x_train, y_train)
+                epochs = self.model_trainer_config.INCREMENTAL_EPOCHS
+            else:
+                x_train,x_test,y_train,y_test = self.spliting_data(csv_path=csv_path)
+                model = model_architecture.get_model(mask_zero=bucketed_input,
+                                                     max_words=self.model_trainer_config.MAX_WORDS,
+                                                     max_len=self.model_trainer_config.MAX_LEN,
+                                                     embedding_dim=self.model_trainer_config.EMBEDDING_DIM,
+                                                     lstm_units=self.model_trainer_config.LSTM_UNITS,
+                                                     dropout=self.model_trainer_config.DROPOUT,
+                                                     learning_rate=self.model_trainer_config.LEARNING_RATE)
+                train_dataset,vocabulary =self.tokenizing(x_train,y_train)
+                manifest = RowManifest(np.concatenate([row_hashes(x_train.values, y_train.values),
+                                                       row_hashes(x_test.values, y_test.values)]),
+                                       np.concatenate([np.zeros(len(x_train), dtype=bool),
+                                                       np.ones(len(x_test), dtype=bool)]))
+                epochs = self.model_trainer_config.EPOCH
 
 
 
@@ -84,35 +379,71 @@ class ModelTrainer:
 
             logging.info(f"Xtest size is : {x_test.shape}")
 
-            sequences_matrix,tokenizer =self.tokenizing(x_train)
 
+            model,checkpoints = self.resume_checkpoints(model, train_dataset)
+            callbacks,early_stopping = model_architecture.get_callbacks(self.model_trainer_config, checkpoints)
 
             logging.info("Entered into model training")
-            model.fit(sequences_matrix, y_train, 
-                        batch_size=self.model_trainer_config.BATCH_SIZE, 
-                        epochs = self.model_trainer_config.EPOCH, 
-                        validation_split=self.model_trainer_config.VALIDATION_SPLIT, 
-                        )
-            logging.info("Model training finished")
+            start = time.perf_counter()
+            if early_stopping is not None and early_stopping.replay():
+                logging.info(f"The resumed run had already stopped early after epoch {checkpoints.epochs_done}")
+                if early_stopping.best_weights is not None:
+                    model.set_weights(early_stopping.best_weights)
+            elif bucketed_input:
+                self.fit_bucketed(model, train_dataset, initial_epoch=checkpoints.epochs_done, callbacks=callbacks,
+                                  epochs=epochs)
+            else:
+                sequences_matrix = train_dataset.sequences.padded(self.model_trainer_config.MAX_LEN)
+                logging.info(f"The sequence matrix shape is: {sequences_matrix.shape}")
+                model.fit(sequences_matrix, y_train, 
+                            batch_size=self.model_trainer_config.BATCH_SIZE, 
+                            epochs = epochs, 
+                            validation_split=self.model_trainer_config.VALIDATION_SPLIT, 
+                            initial_epoch=checkpoints.epochs_done,
+                            callbacks=callbacks,
+                            )
+            logging.info(f"Model training finished in {time.perf_counter() - start:.1f}s")
 
             
-            with open('tokenizer.pickle', 'wb') as handle:
-                pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
             os.makedirs(self.model_trainer_config.TRAINED_MODEL_DIR,exist_ok=True)
+            # Only the top MAX_WORDS words are kept, in the same directory as the model they belong to
+            vocabulary.save(self.model_trainer_config.VOCABULARY_PATH)
+            # Lets the next incremental run tell the new rows of final.csv from the ones this model has seen
+            manifest.save(self.model_trainer_config.ROW_MANIFEST_PATH)
+            # The stems learned while cleaning travel with the vocabulary so serving starts warm
+            shutil.copyfile(self.data_transformation_artifacts.stem_cache_path,
+                            self.model_trainer_config.STEM_CACHE_PATH)
 
 
 
             logging.info("saving the model")
             model.save(self.model_trainer_config.TRAINED_MODEL_PATH)
+            logging.info("exporting the model weights for TensorFlow-free serving")
+            NumpyLSTMClassifier.from_keras(model).save(self.model_trainer_config.NUMPY_MODEL_PATH)
             x_test.to_csv(self.model_trainer_config.X_TEST_DATA_PATH)
             y_test.to_csv(self.model_trainer_config.Y_TEST_DATA_PATH)
 
             x_train.to_csv(self.model_trainer_config.X_TRAIN_DATA_PATH)
+            # Evaluation, quantization and benchmarks memory-map these instead of tokenizing again
+            train_dataset.save(self.model_trainer_config.ENCODED_TRAIN_DIR)
+            self.encode(vocabulary, x_test, y_test).save(self.model_trainer_config.ENCODED_TEST_DIR)
+            if self.model_trainer_config.CASCADE:
+                logging.info("Training the linear first stage of the cascade")
+                # final.csv is read without an index column, so the row labels of x_test are its row positions
+                self.fit_linear_model(self.model_trainer_config.CASCADE_LINEAR_MODEL_PATH, write_split=False,
+                                      test_positions=x_test.index.values)
 
             model_trainer_artifacts = ModelTrainerArtifacts(
                 trained_model_path = self.model_trainer_config.TRAINED_MODEL_PATH,
+                numpy_model_path = self.model_trainer_config.NUMPY_MODEL_PATH,
+                vocabulary_path = self.model_trainer_config.VOCABULARY_PATH,
+                stem_cache_path = self.model_trainer_config.STEM_CACHE_PATH,
                 x_test_path = self.model_trainer_config.X_TEST_DATA_PATH,
-                y_test_path = self.model_trainer_config.Y_TEST_DATA_PATH)
+                y_test_path = self.model_trainer_config.Y_TEST_DATA_PATH,
+                encoded_train_dir = self.model_trainer_config.ENCODED_TRAIN_DIR,
+                encoded_test_dir = self.model_trainer_config.ENCODED_TEST_DIR,
+                model_family = 'lstm',
+                linear_model_path = self.model_trainer_config.CASCADE_LINEAR_MODEL_PATH if self.model_trainer_config.CASCADE else None)
             logging.info("Returning the ModelTrainerArtifacts")
             return model_trainer_artifacts
 
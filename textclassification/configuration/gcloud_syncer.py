@@ -1,4 +1,6 @@
 import os
+import base64
+import subprocess
 
 
 class GCloudSync:
@@ -13,4 +15,27 @@ class GCloudSync:
 
         command = f"gsutil cp gs://{gcp_bucket_url}/{filename} {destination}/{filename}"
         # command = f"gcloud storage cp gs://{gcp_bucket_url}/{filename} {destination}/{filename}"
-        os.system(command)
\ No newline at end of file
+        os.system(command)
+
+    def remove_file_from_gcloud(self, gcp_bucket_url, filename):
+
+        command = f"gsutil -q rm -f gs://{gcp_bucket_url}/{filename}"
+        os.system(command)
+
+    def get_file_version(self, gcp_bucket_url, filename):
+        """
+        :return: hex md5 of the object stored in the bucket, or None when it cannot be determined
+        """
+        command = ["gsutil", "stat", f"gs://{gcp_bucket_url}/{filename}"]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+
+        for line in result.stdout.splitlines():
+            key, _, value = line.strip().partition(":")
+            if key == "Hash (md5)":
+                return base64.b64decode(value.strip()).hex()
+        return None
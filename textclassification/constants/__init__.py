@@ -31,35 +31,124 @@ AXIS = 1
 INPLACE = True
 DROP_COLUMNS = ['Unnamed: 0','count','hate_speech','offensive_language','neither']
 CLASS = 'class'
+CLASS_TO_LABEL = {0: 1, 1: 1, 2: 0}  # hate speech and offensive are abusive (1), neither is not (0)
+CLEANING_N_JOBS = os.cpu_count() or 1
+CLEANING_CHUNK_SIZE = 20000
+CLEANING_PARALLEL_MIN_ROWS = 50000  # below this the process pool costs more than it saves
+DATA_TRANSFORMATION_STREAMING = False  # clean the validated CSVs chunk by chunk instead of loading them whole
+DATA_TRANSFORMATION_CHUNK_SIZE = 50000  # rows read per chunk in streaming mode
+CLEANED_TEXT_CACHE = True  # reuse tweets cleaned by earlier runs with the same cleaner version
+CLEANED_TEXT_CACHE_DIR = 'cache'  # under artifacts/ and outside the per-run timestamp directory
+CLEANED_TEXT_CACHE_FILE_NAME = 'cleaned_text.sqlite3'
+CLEANED_TEXT_CACHE_MAX_ROWS = 5000000  # least recently used tweets beyond this are pruned after each run, None keeps all
+STEM_CACHE_SIZE = 200000  # words whose stem is memoized; tweets rarely use more than a few ten thousand
+STEM_CACHE_FILE_NAME = 'stem_cache.json'
 
 #Model Trainer Constants
 MODEL_TRAINER_ARTIFACTS_DIR = 'ModelTrainerArtifacts'
 TRAINED_MODEL_DIR = 'trained_model'
 TRAINED_MODEL_NAME = 'model.h5'
+NUMPY_MODEL_NAME = 'model.npz'
 X_TEST_FILE_NAME = 'x_test.csv'
 Y_TEST_FILE_NAME = 'y_test.csv'
 
 X_TRAIN_FILE_NAME = 'x_train.csv'
+ENCODED_TRAIN_DIR = 'encoded_train'  # token ids, offsets and labels as .npy, memory-mapped by later stages
+ENCODED_TEST_DIR = 'encoded_test'
 
 RANDOM_STATE = 42
+TEST_SIZE = 0.3
+MODEL_FAMILY = 'lstm'  # 'lstm' or 'linear'; picks the model trained, evaluated, pushed and served
+TOKENIZER_N_JOBS = os.cpu_count() or 1
+TOKENIZER_CHUNK_SIZE = 20000  # texts per shard when counting words and encoding in parallel
 EPOCH = 1
 BATCH_SIZE = 128
 VALIDATION_SPLIT = 0.2
+TRAINING_INPUT = 'bucketed'  # 'bucketed': tf.data batches padded to their length bucket, masked; 'dense': one N x MAX_LEN matrix
+TRAINING_SHUFFLE_BUFFER = 100000
+TRAINING_CHECKPOINT_DIR = 'checkpoints'  # one model file per epoch, under the model trainer artifacts
+TRAINING_CHECKPOINTS_KEPT = 2  # latest epoch files kept; the best epoch by EARLY_STOPPING_MONITOR is kept too
+TRAINING_RESUME = True  # continue from the latest checkpoint of an earlier run on the same data and settings
+EARLY_STOPPING = True
+EARLY_STOPPING_MONITOR = 'val_loss'
+EARLY_STOPPING_PATIENCE = 2  # epochs without improvement before training stops
+EARLY_STOPPING_MIN_DELTA = 0.0
+EARLY_STOPPING_RESTORE_BEST_WEIGHTS = True
+ROW_MANIFEST_FILE_NAME = 'row_manifest.npz'  # hashes of the rows a model was trained and tested on, pushed with it
+TRAINING_MODE = 'full'  # 'full': train from scratch on final.csv; 'incremental': fine-tune the best model on the new rows
+INCREMENTAL_BASE_MODEL_DIR = 'base_model'  # best model, vocabulary and row manifest fetched for incremental training
+INCREMENTAL_REPLAY_RATIO = 1.0  # earlier training rows replayed per new training row, against forgetting
+INCREMENTAL_EPOCHS = 2
+INCREMENTAL_LEARNING_RATE = 0.0002  # below LEARNING_RATE so fine-tuning does not wipe out what was learned
 
 
 # Model Architecture constants
 MAX_WORDS = 50000
 MAX_LEN = 300
+PADDING_BUCKETS = [16, 32, 64, 128, MAX_LEN]  # inference pads each group only up to its bucket length
+EMBEDDING_DIM = 100
+LSTM_UNITS = 100
+DROPOUT = 0.2
+LEARNING_RATE = 0.001  # RMSprop
 LOSS = 'binary_crossentropy'
 METRICS = ['accuracy']
 ACTIVATION = 'sigmoid'
 
+# Linear model family constants
+LINEAR_MODEL_NAME = 'model_linear.npz'
+LINEAR_N_FEATURES = 2 ** 20  # hashed n-gram columns, the model file holds one float32 weight per column
+LINEAR_NGRAM_RANGE = (1, 2)
+LINEAR_ALPHA = 1e-5  # l2 regularization; smaller values overfit into overconfident scores
+LINEAR_EPOCHS = 5  # passes of partial_fit over final.csv
+LINEAR_CHUNK_SIZE = 50000  # rows of final.csv read and fitted at a time
+
+# Cascade constants
+CASCADE = False  # also train the linear model and serve it first, escalating only its uncertain scores to the LSTM
+CASCADE_TARGET_AGREEMENT = 0.99  # share of x_test on which the cascade must give the LSTM-only label
+MODEL_CASCADE_ARTIFACTS_DIR = 'ModelCascadeArtifacts'
+CASCADE_FILE_NAME = 'cascade.yaml'
+CASCADE_LINEAR_MODEL_NAME = 'cascade_linear.npz'  # first stage, kept apart from the linear family's model_linear.npz
+
+# Model Quantization constants
+MODEL_QUANTIZATION_ARTIFACTS_DIR = 'ModelQuantizationArtifacts'
+QUANTIZED_MODEL_NAME = 'model_int8.npz'
+QUANTIZATION_REPORT_FILE_NAME = 'quantization_report.yaml'
+QUANTIZATION_ACCURACY_TOLERANCE = 0.005  # largest accepted drop in x_test accuracy
+
 # Model  Evaluation constants
 MODEL_EVALUATION_ARTIFACTS_DIR = 'ModelEvaluationArtifacts'
 BEST_MODEL_DIR = "best_Model"
 MODEL_EVALUATION_FILE_NAME = 'loss.csv'
+MODEL_EVALUATION_REPORT_FILE_NAME = 'evaluation_report.yaml'
 
 
 MODEL_NAME = 'model.h5'
+TOKENIZER_FILE_NAME = 'tokenizer.pickle'  # pickled keras Tokenizer in cwd, only read for models pushed before vocab.bin
+VOCABULARY_FILE_NAME = 'vocab.bin'
+
+# Prediction pipeline constants
+PREDICTION_MODEL_DIR = "PredictModel"
+SERVING_MODEL_FORMAT = 'int8'  # 'int8', 'numpy' or 'keras'; falls back along that order when a file is missing
+MODEL_RELOAD_INTERVAL = 300  # seconds between checks for a newer model in gcloud
+MAX_BATCH_SIZE = 64
+MAX_BATCH_WAIT_MS = 10
+PREDICTION_THRESHOLD = 0.5
+PREDICTION_CHUNK_SIZE = 512  # texts scored per model call by the bulk and streaming endpoints
+PREDICTION_CACHE_SIZE = 100000
+PREDICTION_CACHE_TTL = 3600  # seconds
+
+# Hyperparameter sweep constants
+SWEEP_ARTIFACTS_DIR = 'SweepArtifacts'
+SWEEP_SPEC_FILE_NAME = 'sweep.yaml'
+SWEEP_LEADERBOARD_FILE_NAME = 'leaderboard.csv'
+SWEEP_THREADS_PER_TRIAL = 4  # small LSTM batches gain little from more CPU threads than this
+SWEEP_N_PARALLEL = max(1, (os.cpu_count() or 1) // SWEEP_THREADS_PER_TRIAL)  # trials trained at once
+SWEEP_LATENCY_REPEAT = 20  # timed predictions of a MAX_BATCH_SIZE batch per trial
+
+# Training job constants
+TRAINING_JOB_NICENESS = 10  # training runs at lower CPU priority than serving
+TRAINING_JOB_HISTORY = 20
+TRAINING_JOB_CANCEL_TIMEOUT = 30  # seconds a cancelled job gets to stop before its process group is killed
+
 APP_HOST = "0.0.0.0"
 APP_PORT = 8080
\ No newline at end of file
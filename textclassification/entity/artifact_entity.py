@@ -17,17 +17,48 @@ class DataValidationArtifacts:
 @dataclass
 class DataTransformationArtifacts:
      transformed_data_path: str
+     stem_cache_path: str
 
 @dataclass
 class ModelTrainerArtifacts: 
     trained_model_path:str
+    numpy_model_path: str
+    vocabulary_path: str
+    stem_cache_path: str
     x_test_path: list
     y_test_path: list
+    encoded_train_dir: str
+    encoded_test_dir: str
+    model_family: str
+    linear_model_path: str
+
+@dataclass
+class ModelQuantizationArtifacts:
+    quantized_model_path: str
+    float_accuracy: float
+    quantized_accuracy: float
+    is_quantized_model_accepted: bool
+
+@dataclass
+class ModelCascadeArtifacts:
+    cascade_file_path: str
+    low: float
+    high: float
+    agreement: float
+    escalation_rate: float
+    second_stage_model: str
 
 @dataclass
 class ModelEvaluationArtifacts:
     is_model_accepted: bool 
+    evaluation_report_path: str
+    trained_model_accuracy: float
+    best_model_accuracy: float
 
 @dataclass
 class ModelPusherArtifacts:
-    bucket_name: str
\ No newline at end of file
+    bucket_name: str
+@dataclass
+class SweepArtifacts:
+    leaderboard_path: str
+    best_parameters: dict
@@ -29,43 +29,174 @@ class DataTransformationConfig:
     def __init__(self):
         self.DATA_TRANSFORMATION_ARTIFACTS_DIR: str = os.path.join(os.getcwd(),ARTIFACTS_DIR,DATA_TRANSFORMATION_ARTIFACTS_DIR)
         self.TRANSFORMED_FILE_PATH = os.path.join(self.DATA_TRANSFORMATION_ARTIFACTS_DIR,TRANSFORMED_FILE_NAME)
+        self.STEM_CACHE_PATH = os.path.join(self.DATA_TRANSFORMATION_ARTIFACTS_DIR,STEM_CACHE_FILE_NAME)
         self.ID = ID
         self.AXIS = AXIS
         self.INPLACE = INPLACE 
         self.DROP_COLUMNS = DROP_COLUMNS
         self.CLASS = CLASS 
+        self.CLASS_TO_LABEL = CLASS_TO_LABEL
         self.LABEL = LABEL
         self.TWEET = TWEET
+        self.CLEANING_N_JOBS = CLEANING_N_JOBS
+        self.CLEANING_CHUNK_SIZE = CLEANING_CHUNK_SIZE
+        self.CLEANING_PARALLEL_MIN_ROWS = CLEANING_PARALLEL_MIN_ROWS
+        self.STREAMING = DATA_TRANSFORMATION_STREAMING
+        self.CLEANED_TEXT_CACHE = CLEANED_TEXT_CACHE
+        self.CLEANED_TEXT_CACHE_PATH: str = os.path.join(os.getcwd(), "artifacts", CLEANED_TEXT_CACHE_DIR,
+                                                          CLEANED_TEXT_CACHE_FILE_NAME)
+        self.CLEANED_TEXT_CACHE_MAX_ROWS = CLEANED_TEXT_CACHE_MAX_ROWS
+        self.CHUNK_SIZE = DATA_TRANSFORMATION_CHUNK_SIZE
 
 class ModelTrainerConfig: 
     def __init__(self):
         self.TRAINED_MODEL_DIR: str = os.path.join(os.getcwd(),ARTIFACTS_DIR,MODEL_TRAINER_ARTIFACTS_DIR) 
         self.TRAINED_MODEL_PATH = os.path.join(self.TRAINED_MODEL_DIR,TRAINED_MODEL_NAME)
+        self.NUMPY_MODEL_PATH = os.path.join(self.TRAINED_MODEL_DIR,NUMPY_MODEL_NAME)
         self.X_TEST_DATA_PATH = os.path.join(self.TRAINED_MODEL_DIR, X_TEST_FILE_NAME)
         self.Y_TEST_DATA_PATH = os.path.join(self.TRAINED_MODEL_DIR, Y_TEST_FILE_NAME)
         self.X_TRAIN_DATA_PATH = os.path.join(self.TRAINED_MODEL_DIR, X_TRAIN_FILE_NAME)
+        self.ENCODED_TRAIN_DIR = os.path.join(self.TRAINED_MODEL_DIR, ENCODED_TRAIN_DIR)
+        self.ENCODED_TEST_DIR = os.path.join(self.TRAINED_MODEL_DIR, ENCODED_TEST_DIR)
+        self.VOCABULARY_PATH = os.path.join(self.TRAINED_MODEL_DIR, VOCABULARY_FILE_NAME)
+        self.STEM_CACHE_PATH = os.path.join(self.TRAINED_MODEL_DIR, STEM_CACHE_FILE_NAME)
         self.MAX_WORDS = MAX_WORDS
         self.MAX_LEN = MAX_LEN
+        self.EMBEDDING_DIM = EMBEDDING_DIM
+        self.LSTM_UNITS = LSTM_UNITS
+        self.DROPOUT = DROPOUT
+        self.LEARNING_RATE = LEARNING_RATE
         self.LOSS = LOSS
         self.METRICS = METRICS
         self.ACTIVATION = ACTIVATION
         self.LABEL = LABEL
         self.TWEET = TWEET
         self.RANDOM_STATE = RANDOM_STATE
+        self.TEST_SIZE = TEST_SIZE
+        self.MODEL_FAMILY = MODEL_FAMILY
+        self.LINEAR_MODEL_PATH = os.path.join(self.TRAINED_MODEL_DIR, LINEAR_MODEL_NAME)
+        self.LINEAR_N_FEATURES = LINEAR_N_FEATURES
+        self.LINEAR_NGRAM_RANGE = LINEAR_NGRAM_RANGE
+        self.LINEAR_ALPHA = LINEAR_ALPHA
+        self.LINEAR_EPOCHS = LINEAR_EPOCHS
+        self.LINEAR_CHUNK_SIZE = LINEAR_CHUNK_SIZE
+        self.CASCADE = CASCADE
+        self.CASCADE_LINEAR_MODEL_PATH = os.path.join(self.TRAINED_MODEL_DIR, CASCADE_LINEAR_MODEL_NAME)
+        self.TOKENIZER_N_JOBS = TOKENIZER_N_JOBS
+        self.TOKENIZER_CHUNK_SIZE = TOKENIZER_CHUNK_SIZE
         self.EPOCH = EPOCH
         self.BATCH_SIZE = BATCH_SIZE
         self.VALIDATION_SPLIT = VALIDATION_SPLIT
+        self.TRAINING_INPUT = TRAINING_INPUT
+        self.TRAINING_BUCKETS = PADDING_BUCKETS
+        self.TRAINING_SHUFFLE_BUFFER = TRAINING_SHUFFLE_BUFFER
+        self.CHECKPOINT_DIR = os.path.join(self.TRAINED_MODEL_DIR, TRAINING_CHECKPOINT_DIR)
+        # Every run has its own timestamped directory, so a resumed run looks in all of them
+        self.CHECKPOINT_SEARCH_PATTERN = os.path.join(os.getcwd(), os.path.dirname(ARTIFACTS_DIR), '*',
+                                                      MODEL_TRAINER_ARTIFACTS_DIR, TRAINING_CHECKPOINT_DIR)
+        self.CHECKPOINTS_KEPT = TRAINING_CHECKPOINTS_KEPT
+        self.RESUME = TRAINING_RESUME
+        self.EARLY_STOPPING = EARLY_STOPPING
+        self.EARLY_STOPPING_MONITOR = EARLY_STOPPING_MONITOR
+        self.EARLY_STOPPING_PATIENCE = EARLY_STOPPING_PATIENCE
+        self.EARLY_STOPPING_MIN_DELTA = EARLY_STOPPING_MIN_DELTA
+        self.EARLY_STOPPING_RESTORE_BEST_WEIGHTS = EARLY_STOPPING_RESTORE_BEST_WEIGHTS
+        self.ROW_MANIFEST_PATH = os.path.join(self.TRAINED_MODEL_DIR, ROW_MANIFEST_FILE_NAME)
+        self.TRAINING_MODE = TRAINING_MODE
+        self.BUCKET_NAME = BUCKET_NAME
+        self.BASE_MODEL_DIR = os.path.join(self.TRAINED_MODEL_DIR, INCREMENTAL_BASE_MODEL_DIR)
+        self.BASE_MODEL_NAME = MODEL_NAME
+        self.VOCABULARY_NAME = VOCABULARY_FILE_NAME
+        self.ROW_MANIFEST_NAME = ROW_MANIFEST_FILE_NAME
+        self.INCREMENTAL_REPLAY_RATIO = INCREMENTAL_REPLAY_RATIO
+        self.INCREMENTAL_EPOCHS = INCREMENTAL_EPOCHS
+        self.INCREMENTAL_LEARNING_RATE = INCREMENTAL_LEARNING_RATE
+
+class ModelQuantizationConfig:
+    def __init__(self):
+        self.MODEL_QUANTIZATION_ARTIFACTS_DIR: str = os.path.join(os.getcwd(),ARTIFACTS_DIR,MODEL_QUANTIZATION_ARTIFACTS_DIR)
+        self.QUANTIZED_MODEL_PATH = os.path.join(self.MODEL_QUANTIZATION_ARTIFACTS_DIR,QUANTIZED_MODEL_NAME)
+        self.QUANTIZATION_REPORT_PATH = os.path.join(self.MODEL_QUANTIZATION_ARTIFACTS_DIR,QUANTIZATION_REPORT_FILE_NAME)
+        self.ACCURACY_TOLERANCE = QUANTIZATION_ACCURACY_TOLERANCE
+
+class ModelCascadeConfig:
+    def __init__(self):
+        self.MODEL_CASCADE_ARTIFACTS_DIR: str = os.path.join(os.getcwd(), ARTIFACTS_DIR, MODEL_CASCADE_ARTIFACTS_DIR)
+        self.CASCADE_FILE_PATH: str = os.path.join(self.MODEL_CASCADE_ARTIFACTS_DIR, CASCADE_FILE_NAME)
+        self.TARGET_AGREEMENT = CASCADE_TARGET_AGREEMENT
+        self.THRESHOLD = PREDICTION_THRESHOLD
+        self.SERVING_MODEL_FORMAT = SERVING_MODEL_FORMAT
 
 class ModelEvaluationConfig: 
     def __init__(self):
         self.MODEL_EVALUATION_MODEL_DIR: str = os.path.join(os.getcwd(),ARTIFACTS_DIR, MODEL_EVALUATION_ARTIFACTS_DIR)
         self.BEST_MODEL_DIR_PATH: str = os.path.join(self.MODEL_EVALUATION_MODEL_DIR,BEST_MODEL_DIR)
         self.BUCKET_NAME = BUCKET_NAME 
-        self.MODEL_NAME = MODEL_NAME 
+        self.MODEL_FAMILY = MODEL_FAMILY
+        # The best model in gcloud storage is the one of the family being trained
+        self.MODEL_NAME = LINEAR_MODEL_NAME if MODEL_FAMILY == 'linear' else MODEL_NAME
+        self.VOCABULARY_NAME = VOCABULARY_FILE_NAME
+        self.TOKENIZER_PATH: str = os.path.join(os.getcwd(), TOKENIZER_FILE_NAME)
+        self.EVALUATION_REPORT_PATH: str = os.path.join(self.MODEL_EVALUATION_MODEL_DIR, MODEL_EVALUATION_REPORT_FILE_NAME)
+        self.THRESHOLD = PREDICTION_THRESHOLD
+        self.TOKENIZER_N_JOBS = TOKENIZER_N_JOBS
+        self.TOKENIZER_CHUNK_SIZE = TOKENIZER_CHUNK_SIZE
 
 class ModelPusherConfig:
 
     def __init__(self):
         self.TRAINED_MODEL_PATH = os.path.join(os.getcwd(),ARTIFACTS_DIR, MODEL_TRAINER_ARTIFACTS_DIR)
         self.BUCKET_NAME = BUCKET_NAME
-        self.MODEL_NAME = MODEL_NAME
\ No newline at end of file
+        self.MODEL_NAME = MODEL_NAME
+        self.NUMPY_MODEL_NAME = NUMPY_MODEL_NAME
+        self.QUANTIZED_MODEL_DIR = os.path.join(os.getcwd(),ARTIFACTS_DIR, MODEL_QUANTIZATION_ARTIFACTS_DIR)
+        self.QUANTIZED_MODEL_NAME = QUANTIZED_MODEL_NAME
+        self.VOCABULARY_NAME = VOCABULARY_FILE_NAME
+        self.STEM_CACHE_NAME = STEM_CACHE_FILE_NAME
+        self.MODEL_FAMILY = MODEL_FAMILY
+        self.LINEAR_MODEL_NAME = LINEAR_MODEL_NAME
+        self.CASCADE_LINEAR_MODEL_NAME = CASCADE_LINEAR_MODEL_NAME
+        self.MODEL_CASCADE_DIR = os.path.join(os.getcwd(),ARTIFACTS_DIR, MODEL_CASCADE_ARTIFACTS_DIR)
+        self.CASCADE_FILE_NAME = CASCADE_FILE_NAME
+        self.ROW_MANIFEST_NAME = ROW_MANIFEST_FILE_NAME
+
+class PredictionPipelineConfig:
+
+    def __init__(self):
+        self.MODEL_DIR: str = os.path.join(os.getcwd(), "artifacts", PREDICTION_MODEL_DIR)
+        self.BUCKET_NAME = BUCKET_NAME
+        # Model files to try in order of preference, e.g. int8 -> float numpy -> keras
+        model_names = [QUANTIZED_MODEL_NAME, NUMPY_MODEL_NAME, MODEL_NAME]
+        serving_format_index = {'int8': 0, 'numpy': 1, 'keras': 2}[SERVING_MODEL_FORMAT]
+        self.MODEL_NAMES = model_names[serving_format_index:]
+        if MODEL_FAMILY == 'linear':
+            self.MODEL_NAMES = [LINEAR_MODEL_NAME]
+        self.VOCABULARY_NAME = VOCABULARY_FILE_NAME
+        self.STEM_CACHE_NAME = STEM_CACHE_FILE_NAME
+        self.CASCADE = CASCADE and MODEL_FAMILY == 'lstm'
+        self.CASCADE_LINEAR_MODEL_NAME = CASCADE_LINEAR_MODEL_NAME
+        self.CASCADE_FILE_NAME = CASCADE_FILE_NAME
+        self.TOKENIZER_PATH: str = os.path.join(os.getcwd(), TOKENIZER_FILE_NAME)
+        self.MODEL_RELOAD_INTERVAL = MODEL_RELOAD_INTERVAL
+        self.MAX_BATCH_SIZE = MAX_BATCH_SIZE
+        self.MAX_BATCH_WAIT_MS = MAX_BATCH_WAIT_MS
+        self.PREDICTION_THRESHOLD = PREDICTION_THRESHOLD
+        self.PREDICTION_CHUNK_SIZE = PREDICTION_CHUNK_SIZE
+        self.PREDICTION_CACHE_SIZE = PREDICTION_CACHE_SIZE
+        self.PREDICTION_CACHE_TTL = PREDICTION_CACHE_TTL
+
+class SweepConfig:
+
+    def __init__(self):
+        self.SWEEP_ARTIFACTS_DIR: str = os.path.join(os.getcwd(), ARTIFACTS_DIR, SWEEP_ARTIFACTS_DIR)
+        self.SPEC_PATH: str = os.path.join(os.getcwd(), SWEEP_SPEC_FILE_NAME)
+        # Transformed data of the earlier training runs, the latest one is used by default
+        self.DATA_SEARCH_PATTERN: str = os.path.join(os.getcwd(), os.path.dirname(ARTIFACTS_DIR), '*',
+                                                     DATA_TRANSFORMATION_ARTIFACTS_DIR, TRANSFORMED_FILE_NAME)
+        self.ENCODED_TRAIN_DIR: str = os.path.join(self.SWEEP_ARTIFACTS_DIR, ENCODED_TRAIN_DIR)
+        self.ENCODED_TEST_DIR: str = os.path.join(self.SWEEP_ARTIFACTS_DIR, ENCODED_TEST_DIR)
+        self.LEADERBOARD_PATH: str = os.path.join(self.SWEEP_ARTIFACTS_DIR, SWEEP_LEADERBOARD_FILE_NAME)
+        self.N_PARALLEL = SWEEP_N_PARALLEL
+        self.CPU_THREADS = os.cpu_count() or 1
+        self.LATENCY_BATCH_SIZE = MAX_BATCH_SIZE
+        self.LATENCY_REPEAT = SWEEP_LATENCY_REPEAT
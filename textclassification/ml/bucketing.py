@@ -0,0 +1,162 @@
+# Length-bucketed inference for the Embedding -> LSTM -> Dense network.
+#
+# The network is trained on sequences pre-padded with zeros to MAX_LEN and has no masking,
+# so the LSTM state after the padding prefix depends only on how many padding steps ran.
+# Those states are computed once per model. A batch padded to L timesteps then starts the
+# LSTM from the state after MAX_LEN - L padding steps, which gives the same scores as
+# running all MAX_LEN steps while doing only L of them.
+import numpy as np
+from textclassification.constants import *
+
+
+def sigmoid(x):
+    return np.exp(-np.logaddexp(0, -x))
+
+
+def hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0, 1)
+
+
+ACTIVATIONS = {
+    'sigmoid': sigmoid,
+    'hard_sigmoid': hard_sigmoid,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0),
+    'linear': lambda x: x,
+}
+
+
+def lstm_step(x, h, c, kernel, recurrent_kernel, bias, activation, recurrent_activation):
+    """
+    One LSTM timestep for a batch, with Keras' gate order (input, forget, cell, output).
+    """
+    z = x @ kernel + h @ recurrent_kernel + bias
+    i, f, g, o = np.split(z, 4, axis=-1)
+    c = recurrent_activation(f) * c + recurrent_activation(i) * activation(g)
+    h = recurrent_activation(o) * activation(c)
+    return h, c
+
+
+def lstm_pad_states(pad_embedding, kernel, recurrent_kernel, bias, steps,
+                    activation=np.tanh, recurrent_activation=sigmoid, mask_zero=False):
+    """
+    :return: (h, c) arrays of shape (steps + 1, units); row k is the state after k padding steps
+    """
+    units = recurrent_kernel.shape[0]
+    h_states = np.zeros((steps + 1, units), dtype=np.float32)
+    c_states = np.zeros((steps + 1, units), dtype=np.float32)
+    if mask_zero:
+        # Masked padding steps leave the initial zero state untouched
+        return h_states, c_states
+
+    h = np.zeros((1, units), dtype=np.float32)
+    c = np.zeros((1, units), dtype=np.float32)
+    x = pad_embedding.reshape(1, -1)
+    for step in range(1, steps + 1):
+        h, c = lstm_step(x, h, c, kernel, recurrent_kernel, bias, activation, recurrent_activation)
+        h_states[step], c_states[step] = h[0], c[0]
+    return h_states, c_states
+
+
+def bucket_length(length, buckets):
+    for bucket in buckets:
+        if length <= bucket:
+            return bucket
+    return buckets[-1]
+
+
+def pad_to_length(sequences, length):
+    """
+    Pre-pads with zeros and pre-truncates like keras pad_sequences(maxlen=length).
+    """
+    padded = np.zeros((len(sequences), length), dtype=np.int32)
+    for row, sequence in enumerate(sequences):
+        sequence = sequence[-length:]
+        if len(sequence):
+            padded[row, length - len(sequence):] = sequence
+    return padded
+
+
+def iter_buckets(sequences, max_len, buckets):
+    """
+    Groups sequence indices by the bucket length their (truncated) length falls into.
+
+    :return: iterator over (bucket length, indices into sequences)
+    """
+    lengths = getattr(sequences, 'lengths', None)
+    if lengths is None:
+        lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    lengths = np.minimum(lengths, max_len)
+    bucket_of = np.array([bucket_length(length, buckets) for length in lengths], dtype=np.int64)
+    for bucket in np.unique(bucket_of):
+        yield int(bucket), np.flatnonzero(bucket_of == bucket)
+
+
+class LengthBucketedModel:
+    """
+    Wraps a trained ModelArchitecture network so each batch is only padded to its bucket length.
+    """
+
+    def __init__(self, model, max_len=MAX_LEN, buckets=PADDING_BUCKETS):
+        """
+        :param model: trained keras model from ModelArchitecture.get_model
+        :param max_len: sequence length the model was trained with
+        :param buckets: increasing bucket lengths, the last one should be max_len
+        """
+        import keras
+
+        self.max_len = max_len
+        self.buckets = sorted(min(bucket, max_len) for bucket in buckets)
+        embedding, lstm, dense = self.find_layers(model)
+
+        embedding_config = embedding.get_config()
+        embedding_config['input_length'] = None
+        self.embedding = keras.layers.Embedding.from_config(embedding_config)
+        self.lstm = keras.layers.LSTM.from_config(lstm.get_config())
+        self.dense = keras.layers.Dense.from_config(dense.get_config())
+
+        tokens = keras.Input(shape=(None,), dtype='int32')
+        state_h = keras.Input(shape=(lstm.units,))
+        state_c = keras.Input(shape=(lstm.units,))
+        output = self.dense(self.lstm(self.embedding(tokens), initial_state=[state_h, state_c]))
+        self.inference_model = keras.Model([tokens, state_h, state_c], output)
+
+        self.embedding.set_weights(embedding.get_weights())
+        self.lstm.set_weights(lstm.get_weights())
+        self.dense.set_weights(dense.get_weights())
+
+        lstm_config = lstm.get_config()
+        embedding_weights = embedding.get_weights()[0]
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        self.pad_h, self.pad_c = lstm_pad_states(embedding_weights[0], kernel, recurrent_kernel, bias, max_len,
+                                                 activation=ACTIVATIONS[lstm_config['activation']],
+                                                 recurrent_activation=ACTIVATIONS[lstm_config['recurrent_activation']],
+                                                 mask_zero=embedding_config.get('mask_zero', False))
+
+
+    @staticmethod
+    def find_layers(model):
+        layers = {type(layer).__name__: layer for layer in model.layers}
+        return layers['Embedding'], layers['LSTM'], layers['Dense']
+
+
+    def predict_padded(self, padded):
+        """
+        :param padded: int matrix pre-padded to any length up to max_len
+        """
+        skipped = self.max_len - padded.shape[1]
+        state_h = np.repeat(self.pad_h[skipped][None, :], len(padded), axis=0)
+        state_c = np.repeat(self.pad_c[skipped][None, :], len(padded), axis=0)
+        return np.asarray(self.inference_model.predict_on_batch([padded, state_h, state_c])).ravel()
+
+
+    def predict_sequences(self, sequences):
+        """
+        :param sequences: token id lists, as returned by Tokenizer.texts_to_sequences
+        :return: array with one score per sequence, in input order
+        """
+        scores = np.zeros(len(sequences), dtype=np.float32)
+        for bucket, indices in iter_buckets(sequences, self.max_len, self.buckets):
+            padded = pad_to_length([sequences[index] for index in indices], bucket)
+            scores[indices] = self.predict_padded(padded)
+        return scores
@@ -0,0 +1,86 @@
+# Two-stage cascade: a cheap first-stage model decides the clear cases, the LSTM only the uncertain ones.
+import numpy as np
+import yaml
+
+
+def calibrate_band(first_scores, second_scores, target_agreement: float, threshold: float = 0.5) -> dict:
+    """
+    Picks the band [low, high] of first-stage scores that escalates the fewest inputs while the cascade
+    still gives the second-stage label on at least target_agreement of them. Inputs scored below low
+    are decided negative and above high positive by the first stage, the rest go to the second stage.
+    The band always contains the threshold, so a decided input keeps the label of its first-stage score.
+
+    :param first_scores: first-stage scores of a calibration set
+    :param second_scores: second-stage scores of the same inputs
+    :return: dict with low, high, and the agreement and escalation_rate they give on the calibration set
+    """
+    scores = np.asarray(first_scores, dtype=np.float64)
+    order = np.argsort(scores, kind='stable')
+    scores = scores[order]
+    positive = (np.asarray(second_scores) > threshold)[order]
+    size = len(scores)
+    counts = np.arange(size + 1)
+    padded = np.concatenate([[-np.inf], scores, [np.inf]])
+
+    # Deciding the i lowest scores negative disagrees on the positives among them, the j highest on the negatives
+    wrong_low = np.concatenate([[0], np.cumsum(positive)])
+    wrong_high = np.concatenate([[0], np.cumsum(~positive[::-1])])
+    # A cut must not split equal scores, and the decided scores must lie on the side of their label
+    low_valid = (padded[counts] < padded[counts + 1]) & (padded[counts] <= threshold)
+    high_valid = (padded[size - counts] < padded[size - counts + 1]) & (padded[size - counts + 1] > threshold)
+    low_valid[0] = high_valid[0] = True
+
+    budget = np.floor((1 - target_agreement) * size + 1e-9)
+    high_cuts = np.flatnonzero(high_valid)
+    # wrong_high grows with the cut, so the widest affordable high cut for every low cut is a binary search
+    low_cuts = np.flatnonzero(low_valid & (wrong_low <= budget))
+    widest = np.searchsorted(wrong_high[high_cuts], budget - wrong_low[low_cuts], side='right') - 1
+    decided = low_cuts + high_cuts[widest]
+    i = int(low_cuts[np.argmax(decided)])
+    j = int(high_cuts[widest[np.argmax(decided)]])
+
+    low = min(padded[i + 1], np.nextafter(threshold, np.inf))
+    high = max(padded[size - j], threshold)
+    return {
+        "low": float(low),
+        "high": float(high),
+        "agreement": float(1 - (wrong_low[i] + wrong_high[j]) / size) if size else 1.0,
+        "escalation_rate": float((size - i - j) / size) if size else 0.0,
+    }
+
+
+class Cascade:
+    """
+    First-stage model and the band of its scores that is escalated to the second stage.
+    """
+
+    def __init__(self, first_stage, low: float, high: float, second_stage_model: str = None):
+        """
+        :param first_stage: model with predict_texts(cleaned_texts), e.g. LinearTextClassifier
+        :param low, high: first-stage scores from low to high, both included, are escalated
+        :param second_stage_model: file name of the LSTM the band was calibrated against, None if unknown
+        """
+        self.first_stage = first_stage
+        self.low = low
+        self.high = high
+        self.second_stage_model = second_stage_model
+
+
+    def escalate(self, scores):
+        """
+        :return: boolean mask of the scores the second stage has to decide
+        """
+        return (scores >= self.low) & (scores <= self.high)
+
+
+    @staticmethod
+    def save_band(file_path: str, band: dict) -> None:
+        with open(file_path, 'w') as handle:
+            yaml.dump(band, handle)
+
+
+    @classmethod
+    def load(cls, first_stage, file_path: str) -> "Cascade":
+        with open(file_path) as handle:
+            band = yaml.safe_load(handle)
+        return cls(first_stage, low=band["low"], high=band["high"], second_stage_model=band.get("second_stage_model"))
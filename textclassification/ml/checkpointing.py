@@ -0,0 +1,306 @@
+# Per-epoch training checkpoints, resumed by a later run on the same data and settings.
+import os
+import glob
+import json
+import shutil
+import hashlib
+import numpy as np
+import keras
+from keras.callbacks import Callback
+
+
+def training_fingerprint(dataset, settings: dict) -> str:
+    """
+    Hash of the encoded training set and of the settings the weights depend on. A checkpoint is
+    only resumed by a run with the same fingerprint.
+
+    :param dataset: EncodedDataset the model is trained on
+    :param settings: JSON serializable training settings; leave out the epoch count so a run with
+                     more epochs continues an earlier one
+    """
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    digest.update(str(dataset.vocabulary_fingerprint).encode('utf-8'))
+    for array in (dataset.sequences.tokens, dataset.sequences.offsets, dataset.labels):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def monitor_improves(monitor: str):
+    """
+    :return: np.greater for accuracy-like metrics and np.less otherwise, the same choice as mode='auto'
+             of the keras callbacks
+    """
+    if monitor.endswith(("acc", "accuracy", "auc")):
+        return np.greater
+    return np.less
+
+
+class TrainingCheckpoints:
+    """
+    A directory with one model file per completed epoch and a state file::
+
+        epoch_0001.h5  epoch_0002.h5  ...  checkpoint.json
+
+    The model files are written by keras ModelCheckpoint. checkpoint.json lists the epochs whose
+    model file is complete, with their logs, and is only rewritten after the model file, so a run
+    killed while saving resumes from the previous epoch.
+    """
+
+    STATE_FILE_NAME = "checkpoint.json"
+    FILE_PATTERN = "epoch_{epoch:04d}.h5"
+
+    def __init__(self, directory: str, fingerprint: str):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.history = []
+        self.files = {}
+
+
+    @classmethod
+    def load(cls, directory: str) -> "TrainingCheckpoints":
+        with open(os.path.join(directory, cls.STATE_FILE_NAME)) as handle:
+            state = json.load(handle)
+        checkpoints = cls(directory, state["fingerprint"])
+        checkpoints.history = state["history"]
+        checkpoints.files = {int(epoch): file_name for epoch, file_name in state["files"].items()}
+        return checkpoints
+
+
+    @classmethod
+    def find_latest(cls, pattern: str, fingerprint: str, exclude: str = None):
+        """
+        :param pattern: glob of checkpoint directories, e.g. the checkpoint directory of every earlier run
+        :return: the checkpoints with the given fingerprint and the most completed epochs, None when there are none
+        """
+        found = []
+        for state_path in glob.glob(os.path.join(pattern, cls.STATE_FILE_NAME)):
+            directory = os.path.dirname(state_path)
+            if exclude and os.path.abspath(directory) == os.path.abspath(exclude):
+                continue
+            try:
+                checkpoints = cls.load(directory)
+            except (OSError, ValueError, KeyError):
+                continue
+            if checkpoints.fingerprint == fingerprint and checkpoints.latest_path:
+                found.append((checkpoints.epochs_done, os.path.getmtime(state_path), checkpoints))
+        if not found:
+            return None
+        return max(found, key=lambda item: item[:2])[2]
+
+
+    @property
+    def epochs_done(self) -> int:
+        return len(self.history)
+
+
+    @property
+    def file_path_pattern(self) -> str:
+        return os.path.join(self.directory, self.FILE_PATTERN)
+
+
+    def path(self, epoch: int):
+        """
+        :param epoch: 1-based epoch number
+        :return: path of the model saved after that epoch, None when it was pruned
+        """
+        file_name = self.files.get(epoch)
+        return os.path.join(self.directory, file_name) if file_name else None
+
+
+    @property
+    def latest_path(self):
+        return self.path(self.epochs_done)
+
+
+    def best_epoch(self, monitor: str):
+        """
+        :return: 1-based epoch with the best value of monitor, None when no epoch logged it
+        """
+        improves = monitor_improves(monitor)
+        best = None
+        for epoch, logs in enumerate(self.history, start=1):
+            value = logs.get(monitor)
+            if value is not None and (best is None or improves(value, best[1])):
+                best = (epoch, value)
+        return best[0] if best else None
+
+
+    def resume_from(self, other: "TrainingCheckpoints") -> None:
+        """
+        Copies the state and the kept model files of an earlier run into this directory.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for epoch in other.files:
+            shutil.copyfile(other.path(epoch), os.path.join(self.directory, other.files[epoch]))
+        self.history = list(other.history)
+        self.files = dict(other.files)
+        self.save_state()
+
+
+    def record(self, epoch: int, logs: dict) -> None:
+        """
+        Adds a completed epoch whose model file ModelCheckpoint has just written.
+        """
+        self.history = self.history[:epoch - 1]
+        self.history.append({name: float(value) for name, value in (logs or {}).items()})
+        self.files[epoch] = self.FILE_PATTERN.format(epoch=epoch)
+        self.save_state()
+
+
+    def prune(self, keep: int, monitor: str = None) -> None:
+        """
+        Deletes the model files of all but the latest keep epochs and the best epoch by monitor.
+        """
+        kept = set(sorted(self.files)[-keep:]) if keep > 0 else {self.epochs_done}
+        if monitor is not None:
+            kept.add(self.best_epoch(monitor))
+        removed = [epoch for epoch in self.files if epoch not in kept]
+        paths = [self.path(epoch) for epoch in removed]
+        for epoch in removed:
+            del self.files[epoch]
+        # The state stops referring to a file before the file goes away
+        self.save_state()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+    def save_state(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        state_path = os.path.join(self.directory, self.STATE_FILE_NAME)
+        state = {"fingerprint": self.fingerprint, "history": self.history,
+                 "files": {str(epoch): file_name for epoch, file_name in sorted(self.files.items())}}
+        with open(state_path + ".partial", 'w') as handle:
+            json.dump(state, handle, indent=1)
+        os.replace(state_path + ".partial", state_path)
+
+
+class CheckpointRecorder(Callback):
+    """
+    Records the epoch in TrainingCheckpoints after ModelCheckpoint has saved it, and prunes old files.
+    Must follow the ModelCheckpoint callback and precede EarlyStopping, which may replace the weights.
+    """
+
+    def __init__(self, checkpoints: TrainingCheckpoints, keep: int, monitor: str = None):
+        super().__init__()
+        self.checkpoints = checkpoints
+        self.keep = keep
+        self.monitor = monitor
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.checkpoints.record(epoch + 1, logs)
+        self.checkpoints.prune(self.keep, self.monitor)
+
+
+class ResumableEarlyStopping(Callback):
+    """
+    Early stopping as keras EarlyStopping does it in mode 'auto', starting from the epochs recorded in
+    TrainingCheckpoints instead of from scratch, so the patience and the best weights carry over when
+    training resumes. The best value and epoch are kept here; the private state of EarlyStopping
+    differs between keras versions.
+    """
+
+    def __init__(self, checkpoints: TrainingCheckpoints, monitor: str = "val_loss", min_delta: float = 0,
+                 patience: int = 0, verbose: int = 0, baseline: float = None, restore_best_weights: bool = False,
+                 start_from_epoch: int = 0):
+        """
+        :param checkpoints: the epochs replayed before training continues
+        :param monitor, ..., start_from_epoch: as for keras EarlyStopping
+        """
+        super().__init__()
+        self.checkpoints = checkpoints
+        self.monitor = monitor
+        self.patience = patience
+        self.verbose = verbose
+        self.baseline = baseline
+        self.restore_best_weights = restore_best_weights
+        self.start_from_epoch = start_from_epoch
+        self.monitor_op = monitor_improves(monitor)
+        # An improvement has to beat the reference by min_delta in the direction of monitor_op
+        self.min_delta = abs(min_delta) if self.monitor_op == np.greater else -abs(min_delta)
+        self.replayed = False
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.wait = 0
+        self.stopped_epoch = None
+        self.best = -np.inf if self.monitor_op == np.greater else np.inf
+        self.best_epoch = None
+        self.best_weights = None
+
+
+    def is_improvement(self, value: float, reference: float) -> bool:
+        return bool(self.monitor_op(value - self.min_delta, reference))
+
+
+    def update(self, epoch: int, current: float):
+        """
+        Applies the monitor value of a completed 0-based epoch.
+
+        :return: (whether the epoch is the best so far, whether training has to stop after it)
+        """
+        self.wait += 1
+        if self.is_improvement(current, self.best):
+            self.best = current
+            self.best_epoch = epoch
+            # Patience only starts over when the baseline is beaten too
+            if self.baseline is None or self.is_improvement(current, self.baseline):
+                self.wait = 0
+            return True, False
+        return False, self.wait >= self.patience and epoch > 0
+
+
+    def replay(self) -> bool:
+        """
+        Applies the recorded epochs as on_epoch_end would have.
+
+        :return: True when the recorded epochs already triggered early stopping
+        """
+        self.reset()
+        self.replayed = True
+        stopped = False
+        for epoch, logs in enumerate(self.checkpoints.history):
+            current = logs.get(self.monitor)
+            if current is None or epoch < self.start_from_epoch:
+                continue
+            _, stopped = self.update(epoch, current)
+            if stopped:
+                break
+
+        best_path = self.checkpoints.path(self.best_epoch + 1) if self.best_epoch is not None else None
+        if self.restore_best_weights and best_path:
+            self.best_weights = keras.models.load_model(best_path).get_weights()
+        return stopped
+
+
+    def on_train_begin(self, logs=None):
+        # The trainer replays before calling fit; doing it again would reload the best checkpoint from disk
+        if not self.replayed:
+            self.replay()
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None or epoch < self.start_from_epoch:
+            return
+        if self.restore_best_weights and self.best_weights is None:
+            # Restore the weights after the first epoch if no progress is ever made
+            self.best_weights = self.model.get_weights()
+
+        improved, stop = self.update(epoch, current)
+        if improved and self.restore_best_weights:
+            self.best_weights = self.model.get_weights()
+        if stop:
+            self.stopped_epoch = epoch
+            self.model.stop_training = True
+            if self.restore_best_weights and self.best_weights is not None:
+                if self.verbose > 0:
+                    print(f"Restoring model weights from the end of the best epoch: {self.best_epoch + 1}.")
+                self.model.set_weights(self.best_weights)
+
+
+    def on_train_end(self, logs=None):
+        if self.stopped_epoch is not None and self.verbose > 0:
+            print(f"Epoch {self.stopped_epoch + 1}: early stopping")
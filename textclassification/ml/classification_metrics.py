@@ -0,0 +1,65 @@
+# Binary classification metrics of a whole test set, computed on arrays without a Python loop over rows.
+import numpy as np
+
+
+def binary_labels(labels):
+    """
+    :return: labels as an int64 array, raises ValueError when any of them is not 0 or 1
+    """
+    labels = np.asarray(labels)
+    unexpected = np.setdiff1d(np.unique(labels), [0, 1])
+    if len(unexpected):
+        raise ValueError(f"Expected 0/1 labels, found {unexpected.tolist()}; "
+                         f"raw classes must be mapped with CLASS_TO_LABEL first")
+    return labels.astype(np.int64)
+
+
+def binary_crossentropy(y_true, y_pred, epsilon: float = 1e-7) -> float:
+    """
+    Same value as the keras binary_crossentropy loss reported by model.evaluate.
+    """
+    y_true = np.asarray(y_true, dtype=np.float32)
+    y_pred = np.clip(np.asarray(y_pred, dtype=np.float32), epsilon, 1 - epsilon)
+    return float(-np.mean(y_true * np.log(y_pred + epsilon) + (1 - y_true) * np.log(1 - y_pred + epsilon)))
+
+
+def roc_auc(y_true, scores) -> float:
+    """
+    :return: area under the ROC curve from the rank sum of the positives, tied scores sharing their
+             average rank; None when y_true holds a single class
+    """
+    positive = np.asarray(y_true) == 1
+    n_positive = int(positive.sum())
+    n_negative = len(positive) - n_positive
+    if n_positive == 0 or n_negative == 0:
+        return None
+    _, inverse, counts = np.unique(np.asarray(scores), return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2
+    rank_sum = average_ranks[inverse.ravel()][positive].sum()
+    return float((rank_sum - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative))
+
+
+def classification_metrics(y_true, scores, threshold: float = 0.5) -> dict:
+    """
+    :param y_true: 0/1 labels, any other label raises ValueError
+    :param scores: predicted probabilities of label 1
+    :param threshold: scores above it are predicted 1
+    :return: dict of plain floats and ints, ready to be written to a report
+    """
+    y_true = binary_labels(y_true)
+    predicted = (np.asarray(scores) > threshold).astype(np.int64)
+    # Cell 2 * label + prediction counts tn, fp, fn, tp
+    tn, fp, fn, tp = (int(count) for count in np.bincount(2 * y_true + predicted, minlength=4))
+    size = len(y_true)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "size": size,
+        "loss": binary_crossentropy(y_true, scores),
+        "accuracy": (tp + tn) / size if size else 0.0,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "roc_auc": roc_auc(y_true, scores),
+        "confusion_matrix": [[tn, fp], [fn, tp]],
+    }
@@ -0,0 +1,152 @@
+# Cleaned tweets kept between training runs, so only new or changed rows go through the cleaner.
+import os
+import sqlite3
+import hashlib
+
+
+class CleanedTextCache:
+    """
+    SQLite table of cleaned tweets keyed by a hash of the raw tweet and of the cleaner version.
+
+    Opening the cache with a different cleaner version drops every stored row, so a change to the
+    cleaning rules invalidates it without any manual step. The learned stems are stored next to
+    the cleaned text so a run that cleans few rows still ends with a complete stem cache.
+
+    Every open starts a new run, and each row records the last run that read or wrote it. prune
+    keeps the max_rows most recently used rows, so tweets that left the dataset age out instead of
+    growing the file forever. Deleted pages are reused by later inserts, the file is not shrunk.
+    """
+
+    # SQLite builds before 3.32 accept at most 999 bound parameters per statement
+    LOOKUP_BATCH_SIZE = 900
+
+    def __init__(self, file_path: str, cleaner_version: str, max_rows: int = None):
+        """
+        :param file_path: path of the SQLite file, created when missing
+        :param cleaner_version: TextCleaner.version of the cleaner producing the text
+        :param max_rows: cleaned tweets kept by prune, None keeps them all
+        """
+        self.file_path = file_path
+        self.cleaner_version = cleaner_version
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cleaned_text "
+                                    "(key BLOB PRIMARY KEY, cleaned TEXT, used INTEGER NOT NULL DEFAULT 0)")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(cleaned_text)")]
+            if "used" not in columns:
+                # Files written before pruning existed; their rows count as used before any run
+                self.connection.execute("ALTER TABLE cleaned_text ADD COLUMN used INTEGER NOT NULL DEFAULT 0")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS stems (word TEXT PRIMARY KEY, stem TEXT)")
+            self._purge_other_versions()
+            self.run = self._start_run()
+
+
+    def _purge_other_versions(self) -> None:
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'cleaner_version'").fetchone()
+        if row is not None and row[0] == self.cleaner_version:
+            return
+        self.connection.execute("DELETE FROM cleaned_text")
+        self.connection.execute("DELETE FROM stems")
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('cleaner_version', ?)", (self.cleaner_version,))
+
+
+    def _start_run(self) -> int:
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'run'").fetchone()
+        run = 1 if row is None else int(row[0]) + 1
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('run', ?)", (str(run),))
+        return run
+
+
+    def keys(self, texts):
+        """
+        :param texts: raw tweets, anything else is converted with str() like TextCleaner.clean does
+        :return: list with the cache key of every text
+        """
+        prefix = (self.cleaner_version + '\0').encode('utf-8')
+        return [hashlib.blake2b(prefix + str(text).encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+                for text in texts]
+
+
+    def get_many(self, keys):
+        """
+        :return: list with the cleaned text of every key, None where it is not cached
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.connection:
+            for start in range(0, len(unique_keys), self.LOOKUP_BATCH_SIZE):
+                batch = unique_keys[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                found.update(self.connection.execute(
+                    f"SELECT key, cleaned FROM cleaned_text WHERE key IN ({placeholders})", batch).fetchall())
+                # Rows read in this run are kept by prune ahead of those no run has read for longer
+                self.connection.execute(f"UPDATE cleaned_text SET used = ? WHERE key IN ({placeholders})",
+                                        [self.run, *batch])
+        cleaned = [found.get(key) for key in keys]
+        self.misses += cleaned.count(None)
+        self.hits += len(cleaned) - cleaned.count(None)
+        return cleaned
+
+
+    def put_many(self, items) -> None:
+        """
+        :param items: (key, cleaned text) pairs
+        """
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO cleaned_text VALUES (?, ?, ?)",
+                                        ((key, cleaned, self.run) for key, cleaned in items))
+
+
+    def prune(self) -> int:
+        """
+        Deletes the least recently used cleaned tweets beyond max_rows.
+
+        :return: number of rows deleted
+        """
+        if self.max_rows is None:
+            return 0
+        count = self.connection.execute("SELECT COUNT(*) FROM cleaned_text").fetchone()[0]
+        excess = count - self.max_rows
+        if excess <= 0:
+            return 0
+        with self.connection:
+            self.connection.execute("DELETE FROM cleaned_text WHERE rowid IN "
+                                    "(SELECT rowid FROM cleaned_text ORDER BY used, rowid LIMIT ?)", (excess,))
+        return excess
+
+
+    def load_stems(self):
+        """
+        :return: (word, stem) pairs saved by earlier runs of the same cleaner version
+        """
+        return self.connection.execute("SELECT word, stem FROM stems").fetchall()
+
+
+    def save_stems(self, entries) -> None:
+        """
+        :param entries: (word, stem) pairs of the stem cache, which already holds those loaded by load_stems;
+                        they replace the stored ones, so the table is as bounded as the stem cache
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM stems")
+            self.connection.executemany("INSERT OR IGNORE INTO stems VALUES (?, ?)", entries)
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,102 @@
+# Token sequences encoded once by the model trainer and memory-mapped by every later reader.
+import os
+import json
+from collections.abc import Sequence
+import numpy as np
+from textclassification.ml.vocabulary import pad_flat_sequences
+
+
+class EncodedSequences(Sequence):
+    """
+    Variable length token sequences stored flat: sequence i is tokens[offsets[i]:offsets[i + 1]].
+
+    Indexing returns a view into tokens, so the sequences of a memory-mapped file are never copied.
+    It can be passed wherever a list of token lists is accepted, e.g. to ``predict_sequences``.
+    """
+
+    def __init__(self, tokens, offsets):
+        self.tokens = tokens
+        self.offsets = offsets
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+
+    def limit_vocabulary(self, num_words: int) -> "EncodedSequences":
+        """
+        :return: the sequences without the indices from num_words up, as a Tokenizer(num_words) fitted
+                 on the same texts would have encoded them
+        """
+        keep = np.asarray(self.tokens) < num_words
+        kept_before = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept_before[1:])
+        return EncodedSequences(np.asarray(self.tokens)[keep], kept_before[self.offsets])
+
+
+    def padded(self, max_len: int):
+        """
+        :return: int32 matrix equal to keras pad_sequences(sequences, maxlen=max_len)
+        """
+        return pad_flat_sequences(self.tokens, self.offsets, max_len)
+
+
+class EncodedDataset:
+    """
+    Encoded sequences with their labels, saved as .npy files in one directory::
+
+        tokens.npy  offsets.npy  labels.npy  meta.json
+
+    meta.json records the fingerprint of the vocabulary used, so a reader can tell whether the
+    sequences fit the model it evaluates.
+    """
+
+    FILE_NAMES = ("tokens.npy", "offsets.npy", "labels.npy")
+    META_FILE_NAME = "meta.json"
+
+    def __init__(self, sequences: EncodedSequences, labels, vocabulary_fingerprint: str = None):
+        self.sequences = sequences
+        self.labels = labels
+        self.vocabulary_fingerprint = vocabulary_fingerprint
+
+
+    @classmethod
+    def encode(cls, vocabulary, texts, labels, n_jobs: int = 1, chunk_size: int = 20000) -> "EncodedDataset":
+        tokens, offsets = vocabulary.encode_parallel(texts, n_jobs=n_jobs, chunk_size=chunk_size)
+        return cls(EncodedSequences(tokens, offsets), np.asarray(labels), vocabulary.fingerprint)
+
+
+    def __len__(self):
+        return len(self.sequences)
+
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        arrays = (self.sequences.tokens, self.sequences.offsets, self.labels)
+        for file_name, array in zip(self.FILE_NAMES, arrays):
+            np.save(os.path.join(directory, file_name), array)
+        with open(os.path.join(directory, self.META_FILE_NAME), 'w') as handle:
+            json.dump({"size": len(self), "vocabulary_fingerprint": self.vocabulary_fingerprint}, handle)
+
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = 'r') -> "EncodedDataset":
+        """
+        :param mmap_mode: passed to np.load, the default maps the files read-only instead of reading them
+        """
+        tokens, offsets, labels = (np.load(os.path.join(directory, file_name), mmap_mode=mmap_mode)
+                                   for file_name in cls.FILE_NAMES)
+        with open(os.path.join(directory, cls.META_FILE_NAME)) as handle:
+            meta = json.load(handle)
+        return cls(EncodedSequences(tokens, offsets), labels, meta["vocabulary_fingerprint"])
@@ -0,0 +1,80 @@
+# Linear model family: hashed word n-grams and a logistic regression trained with SGD.
+# Needs no vocabulary and no TensorFlow, trains chunk by chunk and scores a tweet in microseconds.
+import numpy as np
+from textclassification.constants import *
+from textclassification.ml.bucketing import sigmoid
+from textclassification.ml.classification_metrics import binary_labels
+
+
+class LinearTextClassifier:
+    """
+    Logistic regression on the l2-normalised counts of the word n-grams of a cleaned tweet, hashed
+    into n_features columns. The hashing needs no fitted vocabulary, so the model can be trained
+    out-of-core with partial_fit and saved as one weight vector.
+    """
+
+    def __init__(self, n_features: int = LINEAR_N_FEATURES, ngram_range=LINEAR_NGRAM_RANGE,
+                 alpha: float = LINEAR_ALPHA, coef=None, intercept: float = 0.0, random_state: int = None):
+        """
+        :param n_features: hashed feature columns
+        :param ngram_range: (smallest, largest) n of the word n-grams
+        :param alpha: l2 regularization strength of the SGD classifier
+        :param coef, intercept: trained weights, e.g. read back by load
+        """
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.alpha = alpha
+        self.coef = np.zeros(n_features, dtype=np.float32) if coef is None else coef
+        self.intercept = intercept
+        self.random_state = random_state
+        self.vectorizer = None
+        self.classifier = None
+
+
+    def features(self, texts):
+        """
+        :return: sparse matrix of the hashed n-gram features of texts
+        """
+        if self.vectorizer is None:
+            # sklearn is only imported by processes that use a linear model, serving an LSTM never loads it
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self.vectorizer = HashingVectorizer(n_features=self.n_features, ngram_range=self.ngram_range,
+                                                alternate_sign=False, norm='l2', dtype=np.float32)
+        return self.vectorizer.transform(texts)
+
+
+    def partial_fit(self, texts, labels) -> None:
+        """
+        One SGD pass over a chunk of cleaned tweets and their 0/1 labels, any other label raises ValueError.
+        """
+        # Checked here, SGDClassifier would only complain that classes misses a label
+        labels = binary_labels(labels)
+        if self.classifier is None:
+            from sklearn.linear_model import SGDClassifier
+            self.classifier = SGDClassifier(loss='log_loss', alpha=self.alpha, random_state=self.random_state)
+        self.classifier.partial_fit(self.features(texts), labels, classes=np.array([0, 1]))
+        self.coef = self.classifier.coef_.ravel().astype(np.float32)
+        self.intercept = float(self.classifier.intercept_[0])
+
+
+    def predict_texts(self, texts):
+        """
+        :param texts: cleaned tweets
+        :return: array with the abusive probability of every text, in input order
+        """
+        logits = self.features(texts) @ self.coef + self.intercept
+        return sigmoid(np.asarray(logits, dtype=np.float32))
+
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'wb') as handle:
+            np.savez(handle, n_features=self.n_features, ngram_range=np.array(self.ngram_range), alpha=self.alpha,
+                     coef=self.coef, intercept=self.intercept)
+
+
+    @classmethod
+    def load(cls, file_path: str) -> "LinearTextClassifier":
+        with np.load(file_path) as data:
+            return cls(n_features=int(data['n_features']), ngram_range=tuple(int(n) for n in data['ngram_range']),
+                       alpha=float(data['alpha']), coef=data['coef'], intercept=float(data['intercept']))
+
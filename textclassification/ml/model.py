@@ -1,10 +1,12 @@
 # Creating model architecture.
 from textclassification.entity.config_entity import ModelTrainerConfig
-from keras.models import Sequential
+from keras.models import Sequential, load_model
 from keras.optimizers import RMSprop
-from keras.callbacks import EarlyStopping, ModelCheckpoint
+from keras.callbacks import ModelCheckpoint
 from keras.layers import LSTM,Activation,Dense,Dropout,Input,Embedding,SpatialDropout1D
 from textclassification.constants import *
+from textclassification.ml.linear_model import LinearTextClassifier
+from textclassification.ml.checkpointing import TrainingCheckpoints, CheckpointRecorder, ResumableEarlyStopping
 
 class ModelArchitecture:
 
@@ -12,13 +14,60 @@ class ModelArchitecture:
         pass
 
     
-    def get_model(self):
+    def get_model(self, mask_zero: bool = False, max_words: int = MAX_WORDS, max_len: int = MAX_LEN,
+                  embedding_dim: int = EMBEDDING_DIM, lstm_units: int = LSTM_UNITS, dropout: float = DROPOUT,
+                  learning_rate: float = LEARNING_RATE):
+        """
+        :param mask_zero: mask padding so batches can be padded to any length, needed for bucketed training input
+        :param max_words, ..., learning_rate: hyperparameters, the constants by default; a sweep varies them
+        """
         model = Sequential()
-        model.add(Embedding(MAX_WORDS, 100,input_length=MAX_LEN))
-        model.add(SpatialDropout1D(0.2))
-        model.add(LSTM(100,dropout=0.2,recurrent_dropout=0.2))
+        if mask_zero:
+            model.add(Input(shape=(None,), dtype='int32'))
+            model.add(Embedding(max_words, embedding_dim, mask_zero=True))
+        else:
+            model.add(Embedding(max_words, embedding_dim,input_length=max_len))
+        model.add(SpatialDropout1D(dropout))
+        model.add(LSTM(lstm_units,dropout=dropout,recurrent_dropout=dropout))
         model.add(Dense(1,activation=ACTIVATION))
         model.summary()
-        model.compile(loss=LOSS,optimizer=RMSprop(),metrics=METRICS)
+        model.compile(loss=LOSS,optimizer=RMSprop(learning_rate=learning_rate),metrics=METRICS)
 
-        return model
\ No newline at end of file
+        return model
+
+
+    def get_fine_tuning_model(self, model_path: str, learning_rate: float):
+        """
+        :return: a trained model loaded from model_path and compiled again with a fresh optimizer at learning_rate
+        """
+        model = load_model(model_path)
+        model.compile(loss=LOSS,optimizer=RMSprop(learning_rate=learning_rate),metrics=METRICS)
+        return model
+
+
+    def get_linear_model(self, n_features: int = LINEAR_N_FEATURES, ngram_range=LINEAR_NGRAM_RANGE,
+                         alpha: float = LINEAR_ALPHA, random_state: int = None) -> LinearTextClassifier:
+        """
+        :return: untrained model of the linear family, trained with partial_fit on cleaned tweets
+        """
+        return LinearTextClassifier(n_features=n_features, ngram_range=ngram_range, alpha=alpha,
+                                    random_state=random_state)
+
+
+    def get_callbacks(self, model_trainer_config: ModelTrainerConfig, checkpoints: TrainingCheckpoints):
+        """
+        :return: (callbacks for model.fit, the early stopping callback or None when it is disabled)
+        """
+        monitor = model_trainer_config.EARLY_STOPPING_MONITOR
+        # The recorder must see the epoch before early stopping can swap in the best weights
+        callbacks = [ModelCheckpoint(checkpoints.file_path_pattern, save_weights_only=False),
+                     CheckpointRecorder(checkpoints, keep=model_trainer_config.CHECKPOINTS_KEPT, monitor=monitor)]
+        early_stopping = None
+        if model_trainer_config.EARLY_STOPPING:
+            early_stopping = ResumableEarlyStopping(checkpoints, monitor=monitor,
+                                                    patience=model_trainer_config.EARLY_STOPPING_PATIENCE,
+                                                    min_delta=model_trainer_config.EARLY_STOPPING_MIN_DELTA,
+                                                    restore_best_weights=model_trainer_config.EARLY_STOPPING_RESTORE_BEST_WEIGHTS,
+                                                    verbose=1)
+            callbacks.append(early_stopping)
+        return callbacks, early_stopping
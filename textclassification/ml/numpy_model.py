@@ -0,0 +1,141 @@
+# NumPy-only forward pass of the ModelArchitecture network, so prediction workers
+# can score without importing TensorFlow.
+import numpy as np
+from textclassification.constants import *
+from textclassification.ml.bucketing import ACTIVATIONS, LengthBucketedModel, iter_buckets, lstm_pad_states, pad_to_length
+
+
+class NumpyLSTMClassifier:
+    """
+    Embedding -> LSTM -> Dense forward pass on weights exported from the trained keras model.
+
+    SpatialDropout1D and the LSTM dropouts are inactive at inference time and are left out.
+    Like LengthBucketedModel, batches are padded to their bucket length and the LSTM starts
+    from the precomputed state after the remaining padding steps.
+    """
+
+    def __init__(self, embedding, kernel, recurrent_kernel, bias, dense_kernel, dense_bias,
+                 activation='tanh', recurrent_activation='sigmoid', output_activation='sigmoid',
+                 mask_zero=False, max_len=MAX_LEN, buckets=PADDING_BUCKETS):
+        self.embedding = embedding
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.dense_kernel = dense_kernel
+        self.dense_bias = dense_bias
+        self.activation = activation
+        self.recurrent_activation = recurrent_activation
+        self.output_activation = output_activation
+        self.mask_zero = mask_zero
+        self.max_len = max_len
+        self.buckets = sorted(min(bucket, max_len) for bucket in buckets)
+        self.pad_h, self.pad_c = lstm_pad_states(self.embed(np.zeros(1, dtype=np.int32))[0], kernel,
+                                                 recurrent_kernel, bias, max_len,
+                                                 activation=ACTIVATIONS[activation],
+                                                 recurrent_activation=ACTIVATIONS[recurrent_activation],
+                                                 mask_zero=mask_zero)
+
+
+    @classmethod
+    def from_keras(cls, model, max_len=MAX_LEN):
+        """
+        :param model: trained keras model from ModelArchitecture.get_model
+        """
+        embedding, lstm, dense = LengthBucketedModel.find_layers(model)
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        dense_kernel, dense_bias = dense.get_weights()
+        return cls(embedding.get_weights()[0], kernel, recurrent_kernel, bias, dense_kernel, dense_bias,
+                   activation=lstm.get_config()['activation'],
+                   recurrent_activation=lstm.get_config()['recurrent_activation'],
+                   output_activation=dense.get_config()['activation'],
+                   mask_zero=embedding.get_config().get('mask_zero', False),
+                   max_len=max_len)
+
+
+    def weights(self) -> dict:
+        return {
+            'embedding': self.embedding,
+            'kernel': self.kernel,
+            'recurrent_kernel': self.recurrent_kernel,
+            'bias': self.bias,
+            'dense_kernel': self.dense_kernel,
+            'dense_bias': self.dense_bias,
+        }
+
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'wb') as handle:
+            np.savez(handle,
+                     activation=self.activation,
+                     recurrent_activation=self.recurrent_activation,
+                     output_activation=self.output_activation,
+                     mask_zero=self.mask_zero,
+                     max_len=self.max_len,
+                     **self.weights())
+
+
+    @classmethod
+    def load(cls, file_path: str, buckets=PADDING_BUCKETS):
+        with np.load(file_path) as data:
+            return cls(data['embedding'], data['kernel'], data['recurrent_kernel'], data['bias'],
+                       data['dense_kernel'], data['dense_bias'],
+                       activation=str(data['activation']),
+                       recurrent_activation=str(data['recurrent_activation']),
+                       output_activation=str(data['output_activation']),
+                       mask_zero=bool(data['mask_zero']),
+                       max_len=int(data['max_len']),
+                       buckets=buckets)
+
+
+    def embed(self, tokens):
+        return self.embedding[tokens]
+
+
+    def predict_padded(self, padded):
+        """
+        :param padded: int matrix pre-padded to any length up to max_len
+        :return: array with one score per row
+        """
+        activation = ACTIVATIONS[self.activation]
+        recurrent_activation = ACTIVATIONS[self.recurrent_activation]
+        skipped = self.max_len - padded.shape[1]
+        h = np.repeat(self.pad_h[skipped][None, :], len(padded), axis=0)
+        c = np.repeat(self.pad_c[skipped][None, :], len(padded), axis=0)
+
+        # Input projections of every timestep in one matmul; only the recurrence stays in the loop
+        projected = self.embed(padded) @ self.kernel + self.bias
+        for step in range(padded.shape[1]):
+            z = projected[:, step] + h @ self.recurrent_kernel
+            i, f, g, o = np.split(z, 4, axis=-1)
+            new_c = recurrent_activation(f) * c + recurrent_activation(i) * activation(g)
+            new_h = recurrent_activation(o) * activation(new_c)
+            if self.mask_zero:
+                keep = (padded[:, step] == 0)[:, None]
+                new_c = np.where(keep, c, new_c)
+                new_h = np.where(keep, h, new_h)
+            h, c = new_h, new_c
+
+        output = ACTIVATIONS[self.output_activation](h @ self.dense_kernel + self.dense_bias)
+        return output.ravel().astype(np.float32)
+
+
+    def predict_sequences(self, sequences):
+        """
+        :param sequences: token id lists, as returned by Tokenizer.texts_to_sequences
+        :return: array with one score per sequence, in input order
+        """
+        scores = np.zeros(len(sequences), dtype=np.float32)
+        for bucket, indices in iter_buckets(sequences, self.max_len, self.buckets):
+            padded = pad_to_length([sequences[index] for index in indices], bucket)
+            scores[indices] = self.predict_padded(padded)
+        return scores
+
+
+def export_numpy_model(model_path: str, export_path: str) -> str:
+    """
+    Writes the weights of a saved keras model into a compact .npz for NumpyLSTMClassifier.
+    """
+    import keras
+
+    NumpyLSTMClassifier.from_keras(keras.models.load_model(model_path)).save(export_path)
+    return export_path
@@ -0,0 +1,93 @@
+# Post-training int8 quantization of the NumpyLSTMClassifier weights.
+import numpy as np
+from textclassification.ml.numpy_model import NumpyLSTMClassifier
+
+
+def quantize_columns(matrix):
+    """
+    Symmetric int8 quantization with one scale per column.
+
+    :return: (int8 matrix, float32 scale per column) with matrix ~= quantized * scale
+    """
+    max_abs = np.abs(matrix).max(axis=0)
+    scale = np.where(max_abs > 0, max_abs / 127, 1).astype(np.float32)
+    quantized = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+    return quantized, scale
+
+
+def dequantize_columns(quantized, scale):
+    return quantized.astype(np.float32) * scale
+
+
+class QuantizedLSTMClassifier(NumpyLSTMClassifier):
+    """
+    NumpyLSTMClassifier with int8 weights.
+
+    The embedding table stays int8 in memory with one scale per row and is only dequantized
+    for the rows a batch looks up. The LSTM and dense kernels are small and are dequantized
+    once at load. Biases stay float32.
+    """
+
+    def __init__(self, embedding_q, embedding_scale, **kwargs):
+        self.embedding_q = embedding_q
+        self.embedding_scale = embedding_scale
+        super().__init__(embedding=None, **kwargs)
+
+
+    @classmethod
+    def from_float(cls, model: NumpyLSTMClassifier):
+        embedding_q, embedding_scale = quantize_columns(model.embedding.T)
+        kernel = dequantize_columns(*quantize_columns(model.kernel))
+        recurrent_kernel = dequantize_columns(*quantize_columns(model.recurrent_kernel))
+        dense_kernel = dequantize_columns(*quantize_columns(model.dense_kernel))
+        return cls(embedding_q.T.copy(), embedding_scale, kernel=kernel, recurrent_kernel=recurrent_kernel,
+                   bias=model.bias, dense_kernel=dense_kernel, dense_bias=model.dense_bias,
+                   activation=model.activation, recurrent_activation=model.recurrent_activation,
+                   output_activation=model.output_activation, mask_zero=model.mask_zero,
+                   max_len=model.max_len, buckets=model.buckets)
+
+
+    def embed(self, tokens):
+        return self.embedding_q[tokens].astype(np.float32) * self.embedding_scale[tokens][..., None]
+
+
+    def save(self, file_path: str) -> None:
+        # Re-quantizing the dequantized kernels reproduces the stored int8 values exactly
+        kernel_q, kernel_scale = quantize_columns(self.kernel)
+        recurrent_kernel_q, recurrent_kernel_scale = quantize_columns(self.recurrent_kernel)
+        dense_kernel_q, dense_kernel_scale = quantize_columns(self.dense_kernel)
+        with open(file_path, 'wb') as handle:
+            np.savez(handle,
+                     activation=self.activation,
+                     recurrent_activation=self.recurrent_activation,
+                     output_activation=self.output_activation,
+                     mask_zero=self.mask_zero,
+                     max_len=self.max_len,
+                     embedding_q=self.embedding_q,
+                     embedding_scale=self.embedding_scale,
+                     kernel_q=kernel_q,
+                     kernel_scale=kernel_scale,
+                     recurrent_kernel_q=recurrent_kernel_q,
+                     recurrent_kernel_scale=recurrent_kernel_scale,
+                     dense_kernel_q=dense_kernel_q,
+                     dense_kernel_scale=dense_kernel_scale,
+                     bias=self.bias,
+                     dense_bias=self.dense_bias)
+
+
+    @classmethod
+    def load(cls, file_path: str, buckets=None):
+        with np.load(file_path) as data:
+            kwargs = {} if buckets is None else {'buckets': buckets}
+            return cls(data['embedding_q'], data['embedding_scale'],
+                       kernel=dequantize_columns(data['kernel_q'], data['kernel_scale']),
+                       recurrent_kernel=dequantize_columns(data['recurrent_kernel_q'], data['recurrent_kernel_scale']),
+                       bias=data['bias'],
+                       dense_kernel=dequantize_columns(data['dense_kernel_q'], data['dense_kernel_scale']),
+                       dense_bias=data['dense_bias'],
+                       activation=str(data['activation']),
+                       recurrent_activation=str(data['recurrent_activation']),
+                       output_activation=str(data['output_activation']),
+                       mask_zero=bool(data['mask_zero']),
+                       max_len=int(data['max_len']),
+                       **kwargs)
@@ -0,0 +1,71 @@
+# Hashes of the training rows a model has seen, pushed with it so the next run can train on the new rows only.
+import numpy as np
+import pandas as pd
+
+# Share of hash space given to the test set, fine enough for any TEST_SIZE written with 4 decimals
+HASH_SPLIT_RESOLUTION = 10000
+
+
+def row_hashes(tweets, labels):
+    """
+    :param tweets: cleaned tweets, as in final.csv
+    :param labels: their labels
+    :return: uint64 hash of every (tweet, label) row; the same row hashes the same in every run
+    """
+    rows = pd.DataFrame({"tweet": np.asarray(tweets, dtype=object), "label": np.asarray(labels)})
+    return pd.util.hash_pandas_object(rows, index=False).values
+
+
+def hash_split(hashes, test_size: float):
+    """
+    :return: boolean mask of the rows put in the test set. It depends on the row alone, so a row keeps
+             its side of the split however many rows are added around it.
+    """
+    return (np.asarray(hashes) % HASH_SPLIT_RESOLUTION) < round(test_size * HASH_SPLIT_RESOLUTION)
+
+
+class RowManifest:
+    """
+    Sorted unique row hashes, each with the side of the train/test split it was put on.
+    """
+
+    def __init__(self, hashes=None, is_test=None):
+        hashes = np.zeros(0, dtype=np.uint64) if hashes is None else np.asarray(hashes, dtype=np.uint64)
+        is_test = np.zeros(len(hashes), dtype=bool) if is_test is None else np.asarray(is_test, dtype=bool)
+        self.hashes, first = np.unique(hashes, return_index=True)
+        self.is_test = is_test[first]
+
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+    def lookup(self, hashes):
+        """
+        :return: (mask of the hashes in the manifest, mask of those recorded as test rows)
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=bool), np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        known = self.hashes[positions] == hashes
+        return known, known & self.is_test[positions]
+
+
+    def extend(self, hashes, is_test) -> "RowManifest":
+        """
+        :return: a manifest with the given rows added; rows already present keep their side of the split
+        """
+        return RowManifest(np.concatenate([self.hashes, np.asarray(hashes, dtype=np.uint64)]),
+                           np.concatenate([self.is_test, np.asarray(is_test, dtype=bool)]))
+
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'wb') as handle:
+            np.savez(handle, hashes=self.hashes, is_test=self.is_test)
+
+
+    @classmethod
+    def load(cls, file_path: str) -> "RowManifest":
+        with np.load(file_path) as data:
+            return cls(data['hashes'], data['is_test'])
@@ -0,0 +1,306 @@
+# Tweet cleaning shared by the data transformation stage and the prediction pipeline.
+# Kept free of pandas, sklearn and TensorFlow so that serving can import it cheaply.
+import re
+import sys
+import json
+import string
+import hashlib
+from importlib import metadata
+from itertools import islice
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from textclassification.constants import STEM_CACHE_SIZE
+from textclassification.constants.stopwords import ENGLISH_STOPWORDS
+
+
+@lru_cache(maxsize=None)
+def get_stemmer(language: str = "english"):
+    # nltk is slow to import, so the stemmer is only built on first use
+    from nltk.stem.snowball import SnowballStemmer
+    return SnowballStemmer(language)
+
+
+class StemCache:
+    """
+    Bounded word -> stem memo table.
+
+    Tweets reuse a few thousand words millions of times, so almost every stem is a dictionary
+    lookup. Entries are only added while the table is below max_size and are never evicted,
+    which keeps lookups free of bookkeeping and lets the table be shipped between processes.
+    """
+
+    def __init__(self, max_size: int = STEM_CACHE_SIZE):
+        """
+        :param max_size: largest number of words memoized
+        """
+        self.max_size = max_size
+        self.table = {}
+        self.lookups = 0
+        self.misses = 0
+
+
+    def stem_words(self, words, stem):
+        """
+        :param words: list of words
+        :param stem: stemming function used for words missing from the table
+        :return: list with the stem of every word
+        """
+        self.lookups += len(words)
+        stems = [self.table.get(word) for word in words]
+        if None in stems:
+            for position, stemmed in enumerate(stems):
+                if stemmed is None:
+                    stems[position] = self._miss(words[position], stem)
+        return stems
+
+
+    def _miss(self, word, stem):
+        self.misses += 1
+        stemmed = stem(word)
+        if len(self.table) < self.max_size:
+            self.table[word] = stemmed
+        return stemmed
+
+
+    def update(self, entries) -> int:
+        """
+        :param entries: (word, stem) pairs, e.g. from a worker process or a saved table
+        :return: number of entries added
+        """
+        table = self.table
+        size = len(table)
+        for word, stemmed in entries:
+            if len(table) >= self.max_size:
+                break
+            table.setdefault(word, stemmed)
+        return len(table) - size
+
+
+    def entries_since(self, size: int):
+        """
+        :return: entries added after the table held ``size`` entries, relying on dict insertion order
+        """
+        return list(islice(self.table.items(), size, None))
+
+
+    def memory_bytes(self) -> int:
+        getsizeof = sys.getsizeof
+        # Copy the items first, serving threads may add words while the metrics are scraped
+        return getsizeof(self.table) + sum(getsizeof(word) + getsizeof(stemmed)
+                                          for word, stemmed in tuple(self.table.items()))
+
+
+    def stats(self) -> dict:
+        hits = self.lookups - self.misses
+        return {
+            "size": len(self.table),
+            "max_size": self.max_size,
+            "lookups": self.lookups,
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.table, handle, ensure_ascii=False, separators=(',', ':'))
+
+
+    def load(self, file_path: str) -> int:
+        """
+        :return: number of entries added to the table
+        """
+        with open(file_path, encoding='utf-8') as handle:
+            return self.update(json.load(handle).items())
+
+
+class TextCleaner:
+    """
+    Lower-cases a tweet, strips brackets, links, html, punctuation, newlines and words with
+    digits, drops stopwords and stems every remaining word.
+
+    Patterns, the stopword set and the stemmer are built once per cleaner, so it can be reused
+    across millions of rows. Training and serving share it so they always produce the same text.
+    Stems are memoized in a StemCache, which training saves so serving starts with it warm.
+    """
+
+    BRACKETS = re.compile(r'\[.*?\]')
+    LINKS = re.compile(r'https?://\S+|www\.\S+')
+    HTML = re.compile(r'<.*?>+')
+    WORDS_WITH_DIGITS = re.compile(r'\w*\d\w*')
+    # Punctuation and newlines are single characters to delete, which str.translate does in one pass
+    DELETE_CHARACTERS = str.maketrans('', '', string.punctuation + '\n')
+    VERSION = 1
+
+    def __init__(self, stopwords=ENGLISH_STOPWORDS, language: str = "english",
+                 stem_cache_size: int = STEM_CACHE_SIZE):
+        """
+        :param stopwords: words removed before stemming
+        :param language: language of the Snowball stemmer
+        :param stem_cache_size: largest number of words whose stem is memoized
+        """
+        self.stopwords = frozenset(stopwords)
+        self.language = language
+        self.stem_cache = StemCache(stem_cache_size)
+        self._stem = None
+
+
+    @property
+    def version(self) -> str:
+        """
+        Fingerprint of everything that decides the output of clean, used to invalidate cleaned text
+        stored by earlier runs. Bump VERSION when clean changes in a way the fields below miss.
+        """
+        try:
+            stemmer_version = metadata.version("nltk")
+        except metadata.PackageNotFoundError:
+            stemmer_version = "unknown"
+        fingerprint = json.dumps([self.VERSION,
+                                  [pattern.pattern for pattern in (self.BRACKETS, self.LINKS,
+                                                                   self.HTML, self.WORDS_WITH_DIGITS)],
+                                  sorted(self.DELETE_CHARACTERS),
+                                  sorted(self.stopwords),
+                                  self.language,
+                                  stemmer_version])
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+    @property
+    def stem(self):
+        if self._stem is None:
+            self._stem = get_stemmer(self.language).stem
+        return self._stem
+
+
+    def clean(self, text) -> str:
+        """
+        :param text: raw tweet, anything else is converted with str() first
+        :return: cleaned tweet
+        """
+        text = str(text).lower()
+        text = self.BRACKETS.sub('', text)
+        text = self.LINKS.sub('', text)
+        text = self.HTML.sub('', text)
+        text = text.translate(self.DELETE_CHARACTERS)
+        text = self.WORDS_WITH_DIGITS.sub('', text)
+        stopwords = self.stopwords
+        words = [word for word in text.split(' ') if word not in stopwords]
+        return " ".join(self.stem_cache.stem_words(words, self.stem))
+
+
+    def clean_batch(self, texts):
+        """
+        :param texts: pandas Series or any iterable of raw tweets
+        :return: a Series with the same index for a Series input, otherwise a list, in input order
+        """
+        clean = self.clean
+        cleaned = [clean(text) for text in texts]
+        return self._like(texts, cleaned)
+
+
+    @staticmethod
+    def _like(texts, cleaned):
+        if hasattr(texts, 'index') and hasattr(texts, 'str'):
+            return type(texts)(cleaned, index=texts.index, name=texts.name)
+        return cleaned
+
+
+    def clean_parallel(self, texts, n_jobs: int, chunk_size: int, min_rows: int = 0):
+        """
+        Cleans texts in chunks on a pool of n_jobs processes. Chunks are cleaned by the same
+        clean method and reassembled in input order, so the output is identical to clean_batch.
+
+        :param min_rows: inputs shorter than this, or n_jobs <= 1, are cleaned in this process
+        :return: same as clean_batch
+        """
+        texts_list = list(texts)
+        if n_jobs <= 1 or len(texts_list) < max(min_rows, 2 * chunk_size):
+            return self._like(texts, [self.clean(text) for text in texts_list])
+
+        chunks = [texts_list[start:start + chunk_size] for start in range(0, len(texts_list), chunk_size)]
+        # Every worker gets one copy of this cleaner, so its stem cache stays warm across chunks,
+        # and sends back the stems it learned so the parent's table ends up complete
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks)),
+                                 initializer=_init_worker, initargs=(self,)) as executor:
+            cleaned = []
+            for result in executor.map(_clean_worker_chunk, chunks):
+                cleaned.extend(self._merge_worker_result(result))
+        return self._like(texts, cleaned)
+
+
+    def clean_chunks(self, chunks, n_jobs: int, texts_of=list, max_pending: int = None):
+        """
+        Cleans a stream of chunks, e.g. from ``pd.read_csv(chunksize=...)``, without reading it all.
+        At most max_pending chunks are read ahead of the one being yielded, which bounds memory
+        by the chunk size instead of the stream length.
+
+        :param chunks: iterable of chunks
+        :param texts_of: function returning the list of texts to clean in a chunk
+        :param max_pending: chunks in flight on the pool, 2 * n_jobs by default
+        :return: generator of (chunk, list of cleaned texts) in input order
+        """
+        if n_jobs <= 1:
+            for chunk in chunks:
+                yield chunk, self.clean_chunk(texts_of(chunk))
+            return
+
+        max_pending = max_pending or 2 * n_jobs
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as executor:
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_clean_worker_chunk, texts_of(chunk))))
+                if len(pending) >= max_pending:
+                    chunk, future = pending.popleft()
+                    yield chunk, self._merge_worker_result(future.result())
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, self._merge_worker_result(future.result())
+
+
+    def _merge_worker_result(self, result):
+        cleaned, entries, lookups, misses = result
+        self.stem_cache.update(entries)
+        self.stem_cache.lookups += lookups
+        self.stem_cache.misses += misses
+        return cleaned
+
+
+    def clean_chunk(self, texts):
+        return [self.clean(text) for text in texts]
+
+
+    def __getstate__(self):
+        # The stemmer is rebuilt in worker processes instead of being pickled with every chunk
+        state = self.__dict__.copy()
+        state['_stem'] = None
+        return state
+
+
+_WORKER_CLEANER = None
+_WORKER_REPORTED_SIZE = 0
+
+
+def _init_worker(cleaner: TextCleaner) -> None:
+    global _WORKER_CLEANER, _WORKER_REPORTED_SIZE
+    _WORKER_CLEANER = cleaner
+    _WORKER_REPORTED_SIZE = len(cleaner.stem_cache.table)
+
+
+def _clean_worker_chunk(texts):
+    global _WORKER_REPORTED_SIZE
+    stem_cache = _WORKER_CLEANER.stem_cache
+    lookups, misses = stem_cache.lookups, stem_cache.misses
+    cleaned = _WORKER_CLEANER.clean_chunk(texts)
+    entries = stem_cache.entries_since(_WORKER_REPORTED_SIZE)
+    _WORKER_REPORTED_SIZE = len(stem_cache.table)
+    return cleaned, entries, stem_cache.lookups - lookups, stem_cache.misses - misses
+
+
+DEFAULT_TEXT_CLEANER = TextCleaner()
+
+
+def clean_text(text) -> str:
+    return DEFAULT_TEXT_CLEANER.clean(text)
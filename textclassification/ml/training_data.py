@@ -0,0 +1,47 @@
+# tf.data input pipeline that feeds the encoded training set to model.fit in length buckets.
+import numpy as np
+import tensorflow as tf
+from textclassification.ml.encoded_dataset import EncodedSequences
+
+
+def bucketed_dataset(sequences: EncodedSequences, labels, batch_size: int, buckets, max_len: int,
+                     shuffle_buffer: int = 0, seed: int = None) -> tf.data.Dataset:
+    """
+    Batches of sequences of similar length, each zero-padded at the end only up to the longest
+    sequence of its batch. The model must mask zeros (Embedding(mask_zero=True)) so the padding
+    does not change the LSTM output.
+
+    :param sequences: encoded sequences, pre-truncated here to their last max_len tokens like pad_sequences
+    :param buckets: increasing bucket lengths, sequences are grouped by the first bucket they fit in
+    :param shuffle_buffer: elements shuffled before bucketing, 0 keeps the input order
+    """
+    # Offsets of a slice of the rows need not start at 0, row splits must
+    offsets = np.asarray(sequences.offsets, dtype=np.int64)
+    tokens = np.asarray(sequences.tokens[offsets[0]:offsets[-1]], dtype=np.int32)
+    ragged = tf.RaggedTensor.from_row_splits(tokens, offsets - offsets[0], validate=False)
+    dataset = tf.data.Dataset.from_tensor_slices((ragged, np.asarray(labels, dtype=np.float32)))
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    boundaries = [min(bucket, max_len) + 1 for bucket in sorted(buckets)[:-1]]
+    return (dataset
+            .map(lambda sequence, label: (sequence[-max_len:], label), num_parallel_calls=tf.data.AUTOTUNE)
+            .bucket_by_sequence_length(lambda sequence, label: tf.shape(sequence)[0],
+                                       bucket_boundaries=boundaries,
+                                       bucket_batch_sizes=[batch_size] * (len(boundaries) + 1))
+            .prefetch(tf.data.AUTOTUNE))
+
+
+def train_validation_datasets(sequences: EncodedSequences, labels, validation_split: float, batch_size: int,
+                              buckets, max_len: int, shuffle_buffer: int, seed: int = None):
+    """
+    Holds out the last validation_split of the rows for validation, the same rows
+    model.fit(validation_split=...) would use, and shuffles only the training part.
+
+    :return: (training dataset, validation dataset)
+    """
+    split = int(len(sequences) * (1 - validation_split))
+    train = EncodedSequences(sequences.tokens, sequences.offsets[:split + 1])
+    validation = EncodedSequences(sequences.tokens, sequences.offsets[split:])
+    return (bucketed_dataset(train, labels[:split], batch_size, buckets, max_len, shuffle_buffer, seed),
+            bucketed_dataset(validation, labels[split:], batch_size, buckets, max_len))
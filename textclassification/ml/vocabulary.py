@@ -0,0 +1,290 @@
+# Vocabulary of a fitted tokenizer in a compact file, used instead of the pickled Keras Tokenizer.
+# Only numpy and the standard library are needed, so serving and evaluation can encode without TensorFlow.
+import json
+import mmap
+import struct
+import hashlib
+from functools import partial
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+KERAS_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+def split_words(text: str, table: dict, lower: bool, split: str):
+    """
+    Same words as keras.preprocessing.text.text_to_word_sequence, given ``str.maketrans`` of the filters.
+    """
+    return [word for word in (text.lower() if lower else text).translate(table).split(split) if word]
+
+
+def count_words(texts, filters: str = KERAS_FILTERS, lower: bool = True, split: str = ' ') -> Counter:
+    """
+    :return: Counter of the words in texts, keyed in order of first appearance like Tokenizer.word_counts
+    """
+    table = str.maketrans({character: split for character in filters})
+    counts = Counter()
+    for text in texts:
+        counts.update(split_words(text, table, lower, split))
+    return counts
+
+
+def merge_word_counts(shard_counts) -> Counter:
+    """
+    :param shard_counts: counts of consecutive shards of the texts, in shard order
+    :return: counts of all texts, keyed in the order of first appearance across the shards
+    """
+    merged = Counter()
+    for counts in shard_counts:
+        # Counter.update keeps the keys already present in place and appends new ones at the end
+        merged.update(counts)
+    return merged
+
+
+def pad_flat_sequences(tokens, offsets, max_len: int):
+    """
+    Same result as keras pad_sequences(sequences, maxlen=max_len), i.e. zero padding and truncation
+    at the front, for sequences stored flat: sequence i is tokens[offsets[i]:offsets[i + 1]].
+
+    :return: int32 array of shape (len(offsets) - 1, max_len)
+    """
+    lengths = np.diff(offsets)
+    kept = np.minimum(lengths, max_len)
+    matrix = np.zeros((len(lengths), max_len), dtype=np.int32)
+    rows = np.repeat(np.arange(len(lengths)), kept)
+    position = np.arange(kept.sum()) - np.repeat(np.cumsum(kept) - kept, kept)
+    matrix[rows, max_len - kept[rows] + position] = tokens[np.repeat(offsets[1:] - kept, kept) + position]
+    return matrix
+
+
+def _shards(texts, chunk_size: int):
+    return [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+
+
+class Vocabulary:
+    """
+    The words a fitted tokenizer can emit, i.e. those with an index below num_words, and a batched
+    encoder producing the same sequences as ``keras.preprocessing.text.Tokenizer.texts_to_sequences``.
+
+    File layout, little endian::
+
+        8 bytes magic | uint32 header length | JSON header | zero padding to 8 bytes
+        uint32 offsets[size + 1] | utf-8 bytes of all words in index order
+
+    Loading maps the file and decodes the words straight from the mapping into the word -> index dict,
+    which is the only copy kept in memory.
+    """
+
+    MAGIC = b"TCVOCAB\x00"
+    FORMAT_VERSION = 1
+
+    def __init__(self, words, num_words: int = None, filters: str = KERAS_FILTERS, lower: bool = True,
+                 split: str = ' ', oov_token: str = None):
+        """
+        :param words: words in index order, words[0] has index 1
+        :param num_words: num_words of the tokenizer, the largest index emitted is num_words - 1
+        :param filters, lower, split, oov_token: same meaning as in the Keras Tokenizer
+        """
+        self.num_words = num_words
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.oov_token = oov_token
+        self.word_index = {word: index for index, word in enumerate(words, start=1)}
+        self._translate = str.maketrans({character: split for character in filters})
+        self._fingerprint = None
+
+
+    @classmethod
+    def from_counts(cls, word_counts, num_words: int = None, oov_token: str = None, **settings) -> "Vocabulary":
+        """
+        Builds the word index like Tokenizer.fit_on_texts: words sorted by descending count, ties kept in
+        order of first appearance, the oov token first when there is one.
+        """
+        ranked = sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
+        words = ([oov_token] if oov_token is not None else []) + [word for word, _ in ranked if word != oov_token]
+        if num_words:
+            words = words[:num_words - 1]
+        return cls(words, num_words=num_words, oov_token=oov_token, **settings)
+
+
+    @classmethod
+    def fit(cls, texts, num_words: int = None, n_jobs: int = 1, chunk_size: int = 20000,
+            filters: str = KERAS_FILTERS, lower: bool = True, split: str = ' ', oov_token: str = None) -> "Vocabulary":
+        """
+        Fits the same word index as ``Tokenizer(num_words, ...).fit_on_texts(texts)``. Consecutive shards
+        of chunk_size texts are counted on n_jobs processes and their counts merged in shard order.
+        """
+        texts = list(texts)
+        shards = _shards(texts, chunk_size)
+        count_shard = partial(count_words, filters=filters, lower=lower, split=split)
+        if n_jobs <= 1 or len(shards) <= 1:
+            word_counts = count_shard(texts)
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(shards))) as executor:
+                word_counts = merge_word_counts(executor.map(count_shard, shards))
+        return cls.from_counts(word_counts, num_words=num_words, oov_token=oov_token,
+                               filters=filters, lower=lower, split=split)
+
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer) -> "Vocabulary":
+        """
+        :param tokenizer: fitted keras Tokenizer
+        """
+        if tokenizer.char_level:
+            raise ValueError("char_level tokenizers are not supported")
+        size = len(tokenizer.index_word)
+        if tokenizer.num_words:
+            size = min(size, tokenizer.num_words - 1)
+        words = [tokenizer.index_word[index] for index in range(1, size + 1)]
+        return cls(words, num_words=tokenizer.num_words, filters=tokenizer.filters, lower=tokenizer.lower,
+                   split=tokenizer.split, oov_token=tokenizer.oov_token)
+
+
+    def __len__(self):
+        return len(self.word_index)
+
+
+    @property
+    def words(self):
+        # dicts keep insertion order, so the keys are the words in index order
+        return list(self.word_index)
+
+
+    def header(self) -> dict:
+        return {
+            "format_version": self.FORMAT_VERSION,
+            "size": len(self),
+            "num_words": self.num_words,
+            "filters": self.filters,
+            "lower": self.lower,
+            "split": self.split,
+            "oov_token": self.oov_token,
+        }
+
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Content hash of the words and encoder settings; two vocabularies with the same fingerprint
+        encode every text the same way.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256(json.dumps(self.header(), sort_keys=True).encode('utf-8'))
+            for word in self.words:
+                digest.update(word.encode('utf-8'))
+                digest.update(b'\x00')
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+
+    def texts_to_sequences(self, texts):
+        """
+        :param texts: iterable of strings
+        :return: list of lists of word indices, same as the Keras Tokenizer
+        """
+        table = self._translate
+        get = self.word_index.get
+        split = self.split
+        lower = self.lower
+        if self.oov_token is None:
+            return [[index for index in map(get, (text.lower() if lower else text).translate(table).split(split))
+                     if index is not None]
+                    for text in texts]
+
+        oov_index = self.word_index[self.oov_token]
+        return [[get(word, oov_index) for word in (text.lower() if lower else text).translate(table).split(split)
+                 if word]
+                for text in texts]
+
+
+    def encode_flat(self, texts):
+        """
+        :return: (int32 tokens, int64 offsets) with sequence i in tokens[offsets[i]:offsets[i + 1]],
+                 which is far cheaper to move between processes and to store than a list of lists
+        """
+        sequences = self.texts_to_sequences(texts)
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+        tokens = np.fromiter((index for sequence in sequences for index in sequence),
+                             dtype=np.int32, count=int(offsets[-1]))
+        return tokens, offsets
+
+
+    def encode_parallel(self, texts, n_jobs: int, chunk_size: int = 20000):
+        """
+        encode_flat on n_jobs processes, each encoding consecutive chunks of chunk_size texts.
+        """
+        shards = _shards(list(texts), chunk_size)
+        if n_jobs <= 1 or len(shards) <= 1:
+            return self.encode_flat([text for shard in shards for text in shard])
+
+        # Every worker receives the vocabulary once instead of with every shard
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(shards)),
+                                 initializer=_init_worker, initargs=(self,)) as executor:
+            encoded = list(executor.map(_encode_worker_shard, shards))
+        tokens = np.concatenate([shard_tokens for shard_tokens, _ in encoded])
+        lengths = np.concatenate([np.diff(shard_offsets) for _, shard_offsets in encoded])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return tokens, offsets
+
+
+    def save(self, file_path: str) -> None:
+        encoded = [word.encode('utf-8') for word in self.words]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+        np.cumsum([len(word) for word in encoded], out=offsets[1:])
+
+        header = dict(self.header(), fingerprint=self.fingerprint)
+        header_bytes = json.dumps(header).encode('utf-8')
+        prefix_length = len(self.MAGIC) + 4 + len(header_bytes)
+        padding = b'\x00' * (-prefix_length % 8)
+        with open(file_path, 'wb') as handle:
+            handle.write(self.MAGIC)
+            handle.write(struct.pack('<I', len(header_bytes)))
+            handle.write(header_bytes)
+            handle.write(padding)
+            handle.write(offsets.tobytes())
+            handle.write(b''.join(encoded))
+
+
+    @classmethod
+    def load(cls, file_path: str) -> "Vocabulary":
+        with open(file_path, 'rb') as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError(f"{file_path} is not a vocabulary file")
+        (header_length,) = struct.unpack_from('<I', buffer, len(cls.MAGIC))
+        header_start = len(cls.MAGIC) + 4
+        header = json.loads(buffer[header_start:header_start + header_length])
+        if header["format_version"] != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported vocabulary format version {header['format_version']}")
+
+        offsets_start = header_start + header_length
+        offsets_start += -offsets_start % 8
+        size = header["size"]
+        offsets = np.frombuffer(buffer, dtype='<u4', count=size + 1, offset=offsets_start).tolist()
+        blob = memoryview(buffer)[offsets_start + 4 * (size + 1):]
+        words = [str(blob[start:end], 'utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+        blob.release()
+        buffer.close()
+
+        vocabulary = cls(words, num_words=header["num_words"], filters=header["filters"], lower=header["lower"],
+                         split=header["split"], oov_token=header["oov_token"])
+        vocabulary._fingerprint = header["fingerprint"]
+        return vocabulary
+
+
+_WORKER_VOCABULARY = None
+
+
+def _init_worker(vocabulary: Vocabulary) -> None:
+    global _WORKER_VOCABULARY
+    _WORKER_VOCABULARY = vocabulary
+
+
+def _encode_worker_shard(texts):
+    return _WORKER_VOCABULARY.encode_flat(texts)
@@ -1,73 +1,143 @@
-import os
-import io
 import sys
-import keras
-import pickle
-from PIL import Image
+import numpy as np
 from textclassification.logger import logging
 from textclassification.constants import *
 from textclassification.exception import CustomException
-from keras.utils import pad_sequences
-from textclassification.configuration.gcloud_syncer import GCloudSync
-from textclassification.components.data_transformation import DataTransformation
-from textclassification.entity.config_entity import DataTransformationConfig
-from textclassification.entity.artifact_entity import DataIngestionArtifacts
+from textclassification.entity.config_entity import PredictionPipelineConfig
+from textclassification.ml.text_cleaner import DEFAULT_TEXT_CLEANER
+from textclassification.serving.model_holder import ModelHolder
+from textclassification.serving.cache import PredictionCache
+from textclassification.serving.metrics import PREDICTION_STAGE_LATENCY, MODEL_BATCH_SIZE, CASCADE_INPUTS
 
 
 class PredictionPipeline:
-    def __init__(self):
-        self.bucket_name = BUCKET_NAME
-        self.model_name = MODEL_NAME
-        self.model_path = os.path.join("artifacts", "PredictModel")
-        self.gcloud = GCloudSync()
-        self.data_transformation = DataTransformation(data_transformation_config= DataTransformationConfig,data_ingestion_artifacts=DataIngestionArtifacts)
+    def __init__(self, model_holder: ModelHolder = None):
+        """
+        :param model_holder: Long-lived holder of the serving model, shared across requests
+        """
+        self.prediction_pipeline_config = PredictionPipelineConfig()
+        self.model_holder = model_holder or ModelHolder(self.prediction_pipeline_config)
+        self.prediction_cache = PredictionCache(max_size=self.prediction_pipeline_config.PREDICTION_CACHE_SIZE,
+                                                ttl_seconds=self.prediction_pipeline_config.PREDICTION_CACHE_TTL)
 
 
     
-    def get_model_from_gcloud(self) -> str:
+    def clean_texts(self, texts):
+        """
+        :return: cleaned texts with whitespace collapsed, which is also the form used as cache key
         """
-        Method Name :   get_model_from_gcloud
-        Description :   This method to get best model from google cloud storage
-        Output      :   best_model_path
+        with PREDICTION_STAGE_LATENCY.labels("cleaning").time():
+            return [" ".join(cleaned.split()) for cleaned in DEFAULT_TEXT_CLEANER.clean_batch(texts)]
+
+
+    def cache_key(self, cleaned_text, bundle=None):
+        bundle = bundle or self.model_holder.get_model()
+        return (bundle.version, cleaned_text)
+
+
+    @staticmethod
+    def score_sequences(cleaned_texts, bundle):
+        with PREDICTION_STAGE_LATENCY.labels("tokenization").time():
+            seq = bundle.vocabulary.texts_to_sequences(cleaned_texts)
+        with PREDICTION_STAGE_LATENCY.labels("forward").time():
+            return bundle.model.predict_sequences(seq)
+
+
+    @staticmethod
+    def score_cascade(cleaned_texts, bundle):
+        """
+        Scores every text with the cascade first stage and only the texts inside its band with the LSTM.
+        """
+        with PREDICTION_STAGE_LATENCY.labels("cascade").time():
+            with PREDICTION_STAGE_LATENCY.labels("first_stage").time():
+                scores = np.asarray(bundle.cascade.first_stage.predict_texts(cleaned_texts), dtype=np.float32)
+            escalated = np.flatnonzero(bundle.cascade.escalate(scores))
+            CASCADE_INPUTS.labels("first_stage").inc(len(cleaned_texts))
+            CASCADE_INPUTS.labels("escalated").inc(len(escalated))
+            if len(escalated):
+                scores[escalated] = PredictionPipeline.score_sequences([cleaned_texts[i] for i in escalated], bundle)
+            return scores
+
+
+    def score_cleaned(self, cleaned_texts, bundle=None):
+        """
+        :param cleaned_texts: texts already passed through clean_texts
+        :param bundle: model bundle to score with, the currently served one by default
+        :return: array with the abusive probability of every text, in input order
         """
-        logging.info("Entered the get_model_from_gcloud method of PredictionPipeline class")
         try:
-            # Loading the best model from s3 bucket
-            os.makedirs(self.model_path, exist_ok=True)
-            self.gcloud.sync_folder_from_gcloud(self.bucket_name, self.model_name, self.model_path)
-            best_model_path = os.path.join(self.model_path, self.model_name)
-            logging.info("Exited the get_model_from_gcloud method of PredictionPipeline class")
-            return best_model_path
+            bundle = bundle or self.model_holder.get_model()
+            MODEL_BATCH_SIZE.observe(len(cleaned_texts))
+            if bundle.vocabulary is None:
+                with PREDICTION_STAGE_LATENCY.labels("forward").time():
+                    return bundle.model.predict_texts(cleaned_texts)
+            if bundle.cascade is not None:
+                return self.score_cascade(cleaned_texts, bundle)
+            return self.score_sequences(cleaned_texts, bundle)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
 
+    def score_pinned(self, items):
+        """
+        :param items: (bundle, cleaned text) pairs, e.g. collected by the micro-batcher across a model reload
+        :return: array with the score of every text by its own bundle, in input order
+        """
+        scores = np.zeros(len(items), dtype=np.float32)
+        positions_by_version = {}
+        for position, (bundle, _) in enumerate(items):
+            positions_by_version.setdefault(bundle.version, []).append(position)
+        for positions in positions_by_version.values():
+            bundle = items[positions[0]][0]
+            scores[positions] = self.score_cleaned([items[position][1] for position in positions], bundle)
+        return scores
+
+
+    def predict_batch(self, texts):
+        """
+        :param texts: list of raw tweets
+        :return: list with the abusive probability of every text, in input order
+        """
+        logging.info(f"Running the predict_batch function on {len(texts)} texts")
+        try:
+            # Hold on to one bundle for the whole batch so a reload cannot mix model and vocabulary versions
+            bundle = self.model_holder.get_model()
+            keys = [self.cache_key(cleaned, bundle) for cleaned in self.clean_texts(texts)]
+
+            scores = {}
+            for key in dict.fromkeys(keys):
+                score = self.prediction_cache.get(key)
+                if score is not None:
+                    scores[key] = score
+
+            missing = [key for key in dict.fromkeys(keys) if key not in scores]
+            if missing:
+                predictions = self.score_cleaned([cleaned for _, cleaned in missing], bundle)
+                for key, score in zip(missing, predictions):
+                    scores[key] = float(score)
+                    self.prediction_cache.put(key, float(score))
+
+            return [scores[key] for key in keys]
         except Exception as e:
             raise CustomException(e, sys) from e
-        
+
+
+    def get_label(self, score):
+        if score > self.prediction_pipeline_config.PREDICTION_THRESHOLD:
+            return "textclassification and abusive"
+        else:
+            return "no textclassification"
 
     
-    def predict(self,best_model_path,text):
-        """load image, returns cuda tensor"""
+    def predict(self,text):
+        """
+        :param text: raw tweet
+        :return: predicted class label of the text
+        """
         logging.info("Running the predict function")
         try:
-            load_model=keras.models.load_model(best_model_path)
-            with open('tokenizer.pickle', 'rb') as handle:
-                load_tokenizer = pickle.load(handle)
-            
-            text=self.data_transformation.concat_data_cleaning(text)
-            text = [text]            
-            print(text)
-            seq = load_tokenizer.texts_to_sequences(text)
-            padded = pad_sequences(seq, maxlen=300)
-            print(seq)
-            pred = load_model.predict(padded)
-            pred
-            print("pred", pred)
-            if pred>0.5:
-
-                print("textclassification and abusive")
-                return "textclassification and abusive"
-            else:
-                print("no textclassification")
-                return "no textclassification"
+            score = self.predict_batch([text])[0]
+            return self.get_label(score)
         except Exception as e:
             raise CustomException(e, sys) from e
 
@@ -75,10 +145,8 @@ class PredictionPipeline:
     def run_pipeline(self,text):
         logging.info("Entered the run_pipeline method of PredictionPipeline class")
         try:
-
-            best_model_path: str = self.get_model_from_gcloud() 
-            predicted_text = self.predict(best_model_path,text)
+            predicted_text = self.predict(text)
             logging.info("Exited the run_pipeline method of PredictionPipeline class")
             return predicted_text
         except Exception as e:
-            raise CustomException(e, sys) from e
\ No newline at end of file
+            raise CustomException(e, sys) from e
@@ -0,0 +1,51 @@
+import os
+import time
+import resource
+import threading
+
+
+def current_rss_bytes() -> int:
+    """
+    :return: resident memory of this process, or its peak so far where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+class StageProfiler:
+    """
+    Context manager measuring wall time and peak resident memory of the block it wraps.
+
+    Memory is sampled on a background thread, so allocations made and released between two
+    samples can be missed; the interval keeps that window small compared to a pipeline stage.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.duration_seconds = None
+        self.peak_memory_bytes = None
+        self._stop_event = threading.Event()
+        self._sampler = None
+
+    def _sample(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak_memory_bytes = max(self.peak_memory_bytes, current_rss_bytes())
+
+    def __enter__(self):
+        self.peak_memory_bytes = current_rss_bytes()
+        self._start = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name="stage-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration_seconds = time.perf_counter() - self._start
+        self._stop_event.set()
+        self._sampler.join()
+        self.peak_memory_bytes = max(self.peak_memory_bytes, current_rss_bytes())
+        return False
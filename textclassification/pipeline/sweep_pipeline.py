@@ -0,0 +1,277 @@
+import os
+import sys
+import glob
+import time
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import yaml
+import numpy as np
+import pandas as pd
+from textclassification.logger import logging
+from textclassification.exception import CustomException
+from textclassification.constants import *
+from textclassification.entity.config_entity import SweepConfig, ModelTrainerConfig
+from textclassification.entity.artifact_entity import SweepArtifacts, DataTransformationArtifacts
+from textclassification.ml.encoded_dataset import EncodedDataset
+
+# Hyperparameters a sweep spec may set, and the ModelTrainerConfig attribute each one overrides
+SWEEP_PARAMETERS = {
+    "epochs": "EPOCH",
+    "batch_size": "BATCH_SIZE",
+    "max_words": "MAX_WORDS",
+    "max_len": "MAX_LEN",
+    "embedding_dim": "EMBEDDING_DIM",
+    "lstm_units": "LSTM_UNITS",
+    "dropout": "DROPOUT",
+    "learning_rate": "LEARNING_RATE",
+}
+
+
+def grid_candidates(parameters: dict):
+    """
+    :param parameters: name -> list of values
+    :return: one dict per combination of the values
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*(parameters[name] for name in names))]
+
+
+def sample_value(space, rng: random.Random):
+    """
+    :param space: list of values to pick from, or {min, max, log} for a uniform (log-uniform) range,
+                  sampled as integers when both bounds are integers
+    """
+    if isinstance(space, list):
+        return rng.choice(space)
+    low, high = space["min"], space["max"]
+    if isinstance(low, int) and isinstance(high, int):
+        if space.get("log"):
+            return int(round(np.exp(rng.uniform(np.log(low), np.log(high)))))
+        return rng.randint(low, high)
+    if space.get("log"):
+        return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    return rng.uniform(low, high)
+
+
+def random_candidates(parameters: dict, trials: int, seed: int = None):
+    rng = random.Random(seed)
+    return [{name: sample_value(space, rng) for name, space in parameters.items()} for _ in range(trials)]
+
+
+class SweepPipeline:
+    """
+    Trains one candidate model per point of a grid or random search and ranks them in a leaderboard.
+
+    The transformed data is split, tokenized and encoded once, with the largest max_words of the
+    spec, and saved as memory-mapped arrays that every trial process shares. Trials run in a process
+    pool with the CPU threads split among them. Inference latency is timed afterwards, one trial at
+    a time, so trials still training do not skew it.
+    """
+
+    def __init__(self, sweep_config: SweepConfig, data_path: str = None):
+        """
+        :param data_path: transformed final.csv to train on, the one of the latest run when None
+        """
+        self.sweep_config = sweep_config
+        self.data_path = data_path
+
+
+    def load_spec(self) -> dict:
+        """
+        Method Name :   load_spec
+        Description :   Reads the sweep spec, e.g.
+
+                            search: random      # grid or random
+                            trials: 8           # random search only
+                            seed: 42
+                            parameters:
+                              lstm_units: [64, 100, 128]
+                              learning_rate: {min: 0.0003, max: 0.003, log: true}
+
+        Output      :   Returns the spec with a candidate list of parameter dicts
+        """
+        try:
+            with open(self.sweep_config.SPEC_PATH) as handle:
+                spec = yaml.safe_load(handle)
+            parameters = spec["parameters"]
+            unknown = set(parameters) - set(SWEEP_PARAMETERS)
+            if unknown:
+                raise ValueError(f"Unknown sweep parameters {sorted(unknown)}, expected some of {list(SWEEP_PARAMETERS)}")
+            if spec.get("search", "grid") == "grid":
+                spec["candidates"] = grid_candidates(parameters)
+            elif spec["search"] == "random":
+                spec["candidates"] = random_candidates(parameters, spec["trials"], spec.get("seed"))
+            else:
+                raise ValueError(f"Unknown search {spec['search']}, expected grid or random")
+            logging.info(f"Loaded {len(spec['candidates'])} sweep candidates from {self.sweep_config.SPEC_PATH}")
+            return spec
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def find_data(self) -> str:
+        if self.data_path:
+            return self.data_path
+        found = sorted(glob.glob(self.sweep_config.DATA_SEARCH_PATTERN), key=os.path.getmtime)
+        if not found:
+            raise FileNotFoundError(f"No transformed data matches {self.sweep_config.DATA_SEARCH_PATTERN}, "
+                                    f"run the training pipeline once or pass the path of final.csv")
+        return found[-1]
+
+
+    def prepare_data(self, candidates) -> None:
+        """
+        Method Name :   prepare_data
+        Description :   Splits and encodes the transformed data the way ModelTrainer does, once for all trials
+
+        Output      :   Encoded train and test sets in the sweep artifacts directory
+        """
+        try:
+            logging.info("Entered the prepare_data method of SweepPipeline class")
+            from textclassification.components.model_trainer import ModelTrainer
+
+            data_path = self.find_data()
+            logging.info(f"Preparing the sweep data from {data_path}")
+            trainer_config = ModelTrainerConfig()
+            # Fitted once with the largest vocabulary, smaller ones are cut from it in every trial
+            trainer_config.MAX_WORDS = max(candidate.get("max_words", MAX_WORDS) for candidate in candidates)
+            trainer = ModelTrainer(DataTransformationArtifacts(transformed_data_path=data_path, stem_cache_path=None),
+                                   trainer_config)
+            x_train,x_test,y_train,y_test = trainer.spliting_data(csv_path=data_path)
+            train_dataset,vocabulary = trainer.tokenizing(x_train, y_train)
+            train_dataset.save(self.sweep_config.ENCODED_TRAIN_DIR)
+            trainer.encode(vocabulary, x_test, y_test).save(self.sweep_config.ENCODED_TEST_DIR)
+            logging.info("Exited the prepare_data method of SweepPipeline class")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def run_trials(self, candidates):
+        """
+        :return: one result dict per candidate, in order of completion
+        """
+        try:
+            logging.info("Entered the run_trials method of SweepPipeline class")
+            n_parallel = max(1, min(self.sweep_config.N_PARALLEL, len(candidates)))
+            threads = max(1, self.sweep_config.CPU_THREADS // n_parallel)
+            logging.info(f"Training {len(candidates)} candidates, {n_parallel} at a time with {threads} threads each")
+            results = []
+            # TensorFlow is not fork safe and its thread pools are sized once per process
+            with ProcessPoolExecutor(max_workers=n_parallel, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(threads,)) as executor:
+                futures = [executor.submit(_run_trial, trial, candidate, self.sweep_config)
+                           for trial, candidate in enumerate(candidates)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    logging.info(f"Trial {result['trial']} finished: {result}")
+                    self.write_leaderboard(results)
+            logging.info("Exited the run_trials method of SweepPipeline class")
+            return results
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def measure_latency(self, results) -> None:
+        """
+        Times NumpyLSTMClassifier, the TensorFlow-free serving model, on a MAX_BATCH_SIZE batch of
+        test tweets and stores the median in every successful result.
+        """
+        from textclassification.ml.numpy_model import NumpyLSTMClassifier
+
+        test_sequences = EncodedDataset.load(self.sweep_config.ENCODED_TEST_DIR).sequences
+        for result in results:
+            if result["status"] != "succeeded":
+                continue
+            model = NumpyLSTMClassifier.load(result.pop("numpy_model_path"))
+            batch = test_sequences.limit_vocabulary(result["max_words"])[:self.sweep_config.LATENCY_BATCH_SIZE]
+            timings = []
+            for _ in range(self.sweep_config.LATENCY_REPEAT):
+                start = time.perf_counter()
+                model.predict_sequences(batch)
+                timings.append(time.perf_counter() - start)
+            result["latency_ms"] = round(float(np.median(timings)) * 1000, 3)
+
+
+    def write_leaderboard(self, results) -> pd.DataFrame:
+        leaderboard = pd.DataFrame([{name: value for name, value in result.items() if name != "numpy_model_path"}
+                                    for result in results])
+        leaderboard = leaderboard.sort_values(["accuracy", "train_seconds"], ascending=[False, True],
+                                              na_position="last")
+        leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+        os.makedirs(self.sweep_config.SWEEP_ARTIFACTS_DIR, exist_ok=True)
+        leaderboard.to_csv(self.sweep_config.LEADERBOARD_PATH, index=False)
+        return leaderboard
+
+
+    def run_pipeline(self) -> SweepArtifacts:
+        logging.info("Entered the run_pipeline method of SweepPipeline class")
+        try:
+            spec = self.load_spec()
+            self.prepare_data(spec["candidates"])
+            results = self.run_trials(spec["candidates"])
+            if not any(result["status"] == "succeeded" for result in results):
+                raise ValueError(f"Every sweep trial failed, see {self.sweep_config.LEADERBOARD_PATH}")
+            self.measure_latency(results)
+            leaderboard = self.write_leaderboard(results)
+            logging.info(f"Sweep leaderboard:\n{leaderboard.to_string(index=False)}")
+            logging.info("Exited the run_pipeline method of SweepPipeline class")
+            return SweepArtifacts(leaderboard_path=self.sweep_config.LEADERBOARD_PATH,
+                                  best_parameters=leaderboard.iloc[0][list(SWEEP_PARAMETERS)].to_dict())
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def _init_worker(threads: int) -> None:
+    # Must run before TensorFlow creates its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 2))
+
+
+def _run_trial(trial: int, candidate: dict, sweep_config: SweepConfig) -> dict:
+    """
+    Trains one candidate on the shared encoded data with ModelTrainer's bucketed input.
+
+    :return: the candidate's parameters with its test loss, accuracy and training time
+    """
+    from textclassification.components.model_trainer import ModelTrainer
+    from textclassification.components.model_evaluation import ModelEvaluation
+    from textclassification.ml.model import ModelArchitecture
+    from textclassification.ml.numpy_model import NumpyLSTMClassifier
+
+    trainer_config = ModelTrainerConfig()
+    for name, value in candidate.items():
+        setattr(trainer_config, SWEEP_PARAMETERS[name], value)
+    parameters = {name: getattr(trainer_config, attribute) for name, attribute in SWEEP_PARAMETERS.items()}
+    result = {"trial": trial, **parameters}
+    try:
+        train_dataset = EncodedDataset.load(sweep_config.ENCODED_TRAIN_DIR)
+        test_dataset = EncodedDataset.load(sweep_config.ENCODED_TEST_DIR)
+        train_dataset.sequences = train_dataset.sequences.limit_vocabulary(trainer_config.MAX_WORDS)
+
+        model = ModelArchitecture().get_model(mask_zero=True, max_words=trainer_config.MAX_WORDS,
+                                              max_len=trainer_config.MAX_LEN,
+                                              embedding_dim=trainer_config.EMBEDDING_DIM,
+                                              lstm_units=trainer_config.LSTM_UNITS, dropout=trainer_config.DROPOUT,
+                                              learning_rate=trainer_config.LEARNING_RATE)
+        start = time.perf_counter()
+        ModelTrainer(None, trainer_config).fit_bucketed(model, train_dataset)
+        train_seconds = time.perf_counter() - start
+
+        numpy_model = NumpyLSTMClassifier.from_keras(model, max_len=trainer_config.MAX_LEN)
+        scores = numpy_model.predict_sequences(test_dataset.sequences.limit_vocabulary(trainer_config.MAX_WORDS))
+        loss, accuracy = ModelEvaluation.loss_and_accuracy(np.asarray(test_dataset.labels), scores)
+        trial_dir = os.path.join(sweep_config.SWEEP_ARTIFACTS_DIR, f"trial_{trial:03d}")
+        os.makedirs(trial_dir, exist_ok=True)
+        numpy_model_path = os.path.join(trial_dir, NUMPY_MODEL_NAME)
+        numpy_model.save(numpy_model_path)
+        return {**result, "status": "succeeded", "accuracy": round(accuracy, 5), "loss": round(loss, 5),
+                "train_seconds": round(train_seconds, 2), "numpy_model_path": numpy_model_path}
+    except Exception as e:
+        logging.info(f"Trial {trial} failed: {e}")
+        return {**result, "status": "failed", "error": str(e)}
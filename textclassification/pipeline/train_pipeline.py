@@ -1,23 +1,35 @@
 import sys
+from typing import Callable
 from textclassification.logger import logging
 from textclassification.exception import CustomException
 from textclassification.components.data_ingestion import DataIngestion
 from textclassification.components.data_validation import DataValidation
 from textclassification.components.data_transformation import DataTransformation
 from textclassification.components.model_trainer import ModelTrainer
+from textclassification.components.model_quantization import ModelQuantization
+from textclassification.components.model_cascade import ModelCascade
 from textclassification.components.model_evaluation import ModelEvaluation
 from textclassification.components.model_pusher import ModelPusher
-from textclassification.entity.config_entity import DataIngestionConfig,DataValidationConfig,DataTransformationConfig,ModelTrainerConfig,ModelEvaluationConfig,ModelPusherConfig
+from textclassification.entity.config_entity import DataIngestionConfig,DataValidationConfig,DataTransformationConfig,ModelTrainerConfig,ModelQuantizationConfig,ModelCascadeConfig,ModelEvaluationConfig,ModelPusherConfig
 
-from textclassification.entity.artifact_entity import DataIngestionArtifacts,DataValidationArtifacts,DataTransformationArtifacts,ModelTrainerArtifacts,ModelEvaluationArtifacts,ModelPusherArtifacts
+from textclassification.pipeline.training_job import RUNNING, SUCCEEDED, FAILED
+from textclassification.pipeline.stage_profiler import StageProfiler
+from textclassification.entity.artifact_entity import DataIngestionArtifacts,DataValidationArtifacts,DataTransformationArtifacts,ModelTrainerArtifacts,ModelQuantizationArtifacts,ModelCascadeArtifacts,ModelEvaluationArtifacts,ModelPusherArtifacts
 
 
 class TrainPipeline:
-    def __init__(self):
+    def __init__(self, stage_callback: Callable = None):
+        """
+        :param stage_callback: called as stage_callback(stage, status, **details) when a stage starts and ends
+        """
+        self.stage_callback = stage_callback
+        self.stage_metrics = {}
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
         self.model_trainer_config = ModelTrainerConfig()
+        self.model_quantization_config = ModelQuantizationConfig()
+        self.model_cascade_config = ModelCascadeConfig()
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
 
@@ -89,6 +101,34 @@ class TrainPipeline:
         except Exception as e:
             raise CustomException(e, sys) 
         
+    def start_model_quantization(self, model_trainer_artifacts: ModelTrainerArtifacts) -> ModelQuantizationArtifacts:
+        logging.info("Entered the start_model_quantization method of TrainPipeline class")
+        try:
+            model_quantization = ModelQuantization(model_quantization_config=self.model_quantization_config,
+                                                   model_trainer_artifacts=model_trainer_artifacts)
+
+            model_quantization_artifacts = model_quantization.initiate_model_quantization()
+            logging.info("Exited the start_model_quantization method of TrainPipeline class")
+            return model_quantization_artifacts
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start_model_cascade(self, model_trainer_artifacts: ModelTrainerArtifacts,
+                            model_quantization_artifacts: ModelQuantizationArtifacts = None) -> ModelCascadeArtifacts:
+        logging.info("Entered the start_model_cascade method of TrainPipeline class")
+        try:
+            model_cascade = ModelCascade(model_cascade_config=self.model_cascade_config,
+                                         model_trainer_artifacts=model_trainer_artifacts,
+                                         model_quantization_artifacts=model_quantization_artifacts)
+
+            model_cascade_artifacts = model_cascade.initiate_model_cascade()
+            logging.info("Exited the start_model_cascade method of TrainPipeline class")
+            return model_cascade_artifacts
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def start_model_evaluation(self, model_trainer_artifacts: ModelTrainerArtifacts) -> ModelEvaluationArtifacts:
         logging.info("Entered the start_model_evaluation method of TrainPipeline class")
         try:
@@ -104,11 +144,14 @@ class TrainPipeline:
         
     
 
-    def start_model_pusher(self,) -> ModelPusherArtifacts:
+    def start_model_pusher(self, model_quantization_artifacts: ModelQuantizationArtifacts = None,
+                           model_cascade_artifacts: ModelCascadeArtifacts = None) -> ModelPusherArtifacts:
         logging.info("Entered the start_model_pusher method of TrainPipeline class")
         try:
             model_pusher = ModelPusher(
                 model_pusher_config=self.model_pusher_config,
+                model_quantization_artifacts=model_quantization_artifacts,
+                model_cascade_artifacts=model_cascade_artifacts,
             )
             model_pusher_artifact = model_pusher.initiate_model_pusher()
             logging.info("Initiated the model pusher")
@@ -118,20 +161,53 @@ class TrainPipeline:
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def run_stage(self, stage: str, stage_function: Callable, **kwargs):
+        """
+        Runs one start_* method, records its duration and peak memory and reports its progress
+        to the stage callback.
+        """
+        self.report_stage(stage, RUNNING)
+        profiler = StageProfiler()
+        try:
+            with profiler:
+                artifacts = stage_function(**kwargs)
+        except Exception as e:
+            self.record_stage(stage, FAILED, profiler, error=str(e))
+            raise
+        self.record_stage(stage, SUCCEEDED, profiler)
+        return artifacts
+
+    def record_stage(self, stage: str, status: str, profiler: StageProfiler, **details) -> None:
+        self.stage_metrics[stage] = {
+            "duration_seconds": profiler.duration_seconds,
+            "peak_memory_bytes": profiler.peak_memory_bytes,
+        }
+        logging.info(f"Stage {stage} {status} in {profiler.duration_seconds:.1f}s, "
+                     f"peak memory {profiler.peak_memory_bytes / 2**20:.0f} MiB")
+        self.report_stage(stage, status, **self.stage_metrics[stage], **details)
+
+    def report_stage(self, stage: str, status: str, **details) -> None:
+        if self.stage_callback is not None:
+            self.stage_callback(stage, status, **details)
+
     def run_pipeline(self):
         logging.info("Entered the run_pipeline method of TrainPipeline class")
         try:
-            data_ingestion_artifacts = self.start_data_ingestion()
-            data_validation_artifacts = self.start_data_validation(data_ingestion_artifacts = data_ingestion_artifacts)
-            data_transformation_artifacts = self.start_data_transformation(data_validation_artifacts = data_validation_artifacts)
-            model_trainer_artifacts = self.start_model_trainer(data_transformation_artifacts = data_transformation_artifacts)
+            data_ingestion_artifacts = self.run_stage("data_ingestion", self.start_data_ingestion)
+            data_validation_artifacts = self.run_stage("data_validation", self.start_data_validation, data_ingestion_artifacts = data_ingestion_artifacts)
+            data_transformation_artifacts = self.run_stage("data_transformation", self.start_data_transformation, data_validation_artifacts = data_validation_artifacts)
+            model_trainer_artifacts = self.run_stage("model_trainer", self.start_model_trainer, data_transformation_artifacts = data_transformation_artifacts)
+            model_quantization_artifacts = self.run_stage("model_quantization", self.start_model_quantization, model_trainer_artifacts = model_trainer_artifacts)
+            model_cascade_artifacts = None
+            if model_trainer_artifacts.linear_model_path is not None and model_trainer_artifacts.model_family == 'lstm':
+                model_cascade_artifacts = self.run_stage("model_cascade", self.start_model_cascade, model_trainer_artifacts = model_trainer_artifacts, model_quantization_artifacts = model_quantization_artifacts)
 
-            model_evaluation_artifacts = self.start_model_evaluation(model_trainer_artifacts=model_trainer_artifacts) 
+            model_evaluation_artifacts = self.run_stage("model_evaluation", self.start_model_evaluation, model_trainer_artifacts=model_trainer_artifacts) 
 
             if not model_evaluation_artifacts.is_model_accepted:
                 raise Exception("Trained model is not better than the best model")
             
-            model_pusher_artifacts = self.start_model_pusher()
+            model_pusher_artifacts = self.run_stage("model_pusher", self.start_model_pusher, model_quantization_artifacts = model_quantization_artifacts, model_cascade_artifacts = model_cascade_artifacts)
 
 
 
@@ -0,0 +1,231 @@
+import os
+import copy
+import time
+import uuid
+import queue
+import signal
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+from textclassification.logger import logging
+from textclassification.constants import *
+from textclassification.serving.metrics import TRAINING_STAGE_DURATION, TRAINING_STAGE_PEAK_MEMORY
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class TrainingJobRunning(Exception):
+    def __init__(self, job_id: str):
+        super().__init__(f"Training job {job_id} is still running")
+        self.job_id = job_id
+
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    current_stage: Optional[str] = None
+    stages: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def run_training_job(job_id: str, events, stop) -> None:
+    """
+    Entry point of the training process. Reports progress to the parent through the events queue
+    and stops with a CANCELLED event once the parent sets stop.
+    """
+    # Own process group, so worker pools and gsutil calls can be killed along with the job
+    os.setpgrp()
+    # Leave the CPU to the serving process first
+    os.nice(TRAINING_JOB_NICENESS)
+    # A real SIGINT, unlike an exception set from another thread, also interrupts blocking calls
+    threading.Thread(target=lambda: stop.wait() and os.kill(os.getpid(), signal.SIGINT),
+                     name="training-stop", daemon=True).start()
+    try:
+        from textclassification.pipeline.train_pipeline import TrainPipeline
+
+        def report_stage(stage: str, status: str, **details) -> None:
+            events.put({"job_id": job_id, "stage": stage, "status": status, "time": time.time(), **details})
+
+        events.put({"job_id": job_id, "status": RUNNING, "time": time.time()})
+        TrainPipeline(stage_callback=report_stage).run_pipeline()
+        events.put({"job_id": job_id, "status": SUCCEEDED, "time": time.time()})
+    except KeyboardInterrupt:
+        events.put({"job_id": job_id, "status": CANCELLED, "time": time.time()})
+    except Exception as e:
+        events.put({"job_id": job_id, "status": FAILED, "time": time.time(), "error": str(e),
+                    "traceback": traceback.format_exc()})
+
+
+class TrainingJobRunner:
+    """
+    Runs TrainPipeline in a separate process, one job at a time, and keeps track of its progress.
+    """
+
+    def __init__(self, max_history: int = TRAINING_JOB_HISTORY, cancel_timeout: float = TRAINING_JOB_CANCEL_TIMEOUT):
+        """
+        :param max_history: number of finished jobs kept for status queries
+        :param cancel_timeout: seconds a cancelled job gets to stop on its own before it is killed
+        """
+        self.max_history = max_history
+        self.cancel_timeout = cancel_timeout
+        # spawn gives every job fresh module state, including a new ARTIFACTS_DIR timestamp
+        self._context = multiprocessing.get_context("spawn")
+        # Both are created per job: a killed job may leave its queue corrupted or its lock held
+        self._events = None
+        self._stop_job = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._process = None
+        self._running_job_id = None
+        self._monitor = None
+        self._stop_event = threading.Event()
+
+
+    def submit(self) -> TrainingJob:
+        """
+        :return: the new job, raises TrainingJobRunning while another job has not finished
+        """
+        with self._lock:
+            if self._running_job_id is not None:
+                raise TrainingJobRunning(self._running_job_id)
+
+            job = TrainingJob(job_id=uuid.uuid4().hex)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+            self._events = self._context.Queue()
+            self._stop_job = self._context.Event()
+            self._process = self._context.Process(target=run_training_job,
+                                                  args=(job.job_id, self._events, self._stop_job),
+                                                  name=f"training-{job.job_id}", daemon=True)
+            self._process.start()
+            self._running_job_id = job.job_id
+            logging.info(f"Started training job {job.job_id} in process {self._process.pid}")
+            snapshot = copy.deepcopy(job)
+
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._watch, name="training-monitor", daemon=True)
+            self._monitor.start()
+        return snapshot
+
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        """
+        :return: a snapshot of the job, safe to read while the monitor keeps updating the original
+        """
+        with self._lock:
+            return copy.deepcopy(self._jobs.get(job_id))
+
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES or job_id != self._running_job_id:
+                return copy.deepcopy(job)
+            process = self._process
+            self._stop_job.set()
+
+        # Joined outside the lock, so status queries and the monitor carry on while the job stops
+        process.join(self.cancel_timeout)
+        if process.is_alive():
+            logging.info(f"Training job {job_id} did not stop within {self.cancel_timeout}s, killing it")
+        # Also kills what the job left behind, e.g. pool workers and gsutil calls
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.join()
+
+        with self._lock:
+            if job.status not in FINISHED_STATUSES:
+                self._finish(job, CANCELLED)
+            logging.info(f"Cancelled training job {job_id}")
+            return copy.deepcopy(job)
+
+
+    def shutdown(self) -> None:
+        if self._running_job_id is not None:
+            self.cancel(self._running_job_id)
+        self._stop_event.set()
+
+
+    def _finish(self, job: TrainingJob, status: str, error: str = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        if job.current_stage is not None and job.stages.get(job.current_stage, {}).get("status") == RUNNING:
+            job.stages[job.current_stage]["status"] = status
+        if self._running_job_id == job.job_id:
+            self._running_job_id = None
+            self._process = None
+
+
+    def _apply(self, event: dict) -> None:
+        job = self._jobs.get(event["job_id"])
+        if job is None or job.status in FINISHED_STATUSES:
+            return
+
+        if "stage" in event:
+            stage = job.stages.setdefault(event["stage"], {})
+            stage.update({key: value for key, value in event.items() if key not in ("job_id", "stage", "time")})
+            stage["started_at" if event["status"] == RUNNING else "finished_at"] = event["time"]
+            job.current_stage = event["stage"]
+            if event.get("duration_seconds") is not None:
+                TRAINING_STAGE_DURATION.labels(event["stage"], event["status"]).observe(event["duration_seconds"])
+                TRAINING_STAGE_PEAK_MEMORY.labels(event["stage"]).set(event["peak_memory_bytes"])
+        elif event["status"] == RUNNING:
+            job.status = RUNNING
+            job.started_at = event["time"]
+        else:
+            if event.get("traceback"):
+                logging.info(f"Training job {job.job_id} failed: {event['traceback']}")
+            self._finish(job, event["status"], event.get("error"))
+
+
+    def _watch(self) -> None:
+        while not self._stop_event.is_set():
+            with self._lock:
+                events, process = self._events, self._process
+            try:
+                event = events.get(timeout=1)
+            except queue.Empty:
+                event = None
+            # Checked once: a process that exited has flushed every event it put, however late
+            exited = event is None and process is not None and not process.is_alive()
+            if exited:
+                # The last event may have been put just after the timeout, drain before concluding there is none
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    pass
+
+            with self._lock:
+                if event is not None:
+                    self._apply(event)
+                elif exited and process is self._process:
+                    # The process died without reporting, e.g. killed by the OOM killer
+                    job = self._jobs[self._running_job_id]
+                    if self._stop_job.is_set():
+                        self._finish(job, CANCELLED)
+                    else:
+                        self._finish(job, FAILED, f"Training process exited with code {process.exitcode}")
+                finished = process is not None and self._process is not process
+            if finished:
+                # The job has reported its end, reap its process without holding the lock
+                process.join()
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Sequence
+from textclassification.logger import logging
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive close together into one batched model call.
+
+    A batch is dispatched as soon as it holds ``max_batch_size`` texts or the oldest
+    text has waited ``max_wait_ms``. Batches run one at a time on a dedicated thread,
+    so requests arriving while the model is busy queue up and form the next batch.
+    """
+
+    def __init__(self, predict_batch: Callable[[List], Sequence[float]],
+                 max_batch_size: int, max_wait_ms: float):
+        """
+        :param predict_batch: function scoring a list of texts, or of items such as (bundle, text) pairs,
+                              returning one score per item
+        :param max_batch_size: largest number of texts sent to the model in one call
+        :param max_wait_ms: longest time the first text of a batch waits for company
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self._executor = None
+
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+            self._worker = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._executor.shutdown(wait=False)
+
+
+    async def submit(self, text) -> float:
+        """
+        :param text: a text, or any item predict_batch accepts
+        :return: score of the text, resolved once the batch it joined has run
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (client disconnect) do not need a forward pass
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                scores = await loop.run_in_executor(self._executor, self.predict_batch, texts)
+            except Exception as e:
+                logging.info(f"Batch of {len(texts)} texts failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(float(score))
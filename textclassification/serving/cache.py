@@ -0,0 +1,109 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+# Result handed to coalesced waiters when the caller computing their value was cancelled
+_LEADER_CANCELLED = object()
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction scores with a time-to-live per entry.
+
+    Keys carry the model version, so entries written by a previous model are never
+    returned after a swap and simply age out of the LRU order.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """
+        :param max_size: largest number of scores kept, least recently used are evicted first
+        :param ttl_seconds: age after which an entry is treated as a miss
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable]):
+        """
+        Returns the cached value for key, or awaits compute() for it. Concurrent callers
+        asking for the same missing key share one computation instead of starting their own.
+        When the caller computing it is cancelled, the others start over and one of them computes it.
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            value = await asyncio.shield(inflight)
+            if value is not _LEADER_CANCELLED:
+                return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            # Only the leader's request is gone, the waiters are still live and retry on their own
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        self.put(key, value)
+        return value
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,90 @@
+# Prometheus metrics of the serving app and of the training jobs it runs.
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+TRAINING_STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+REQUEST_LATENCY = Histogram("textclassification_request_latency_seconds",
+                            "Total latency of HTTP requests", ["method", "path"],
+                            buckets=LATENCY_BUCKETS, registry=REGISTRY)
+PREDICTION_STAGE_LATENCY = Histogram("textclassification_prediction_stage_latency_seconds",
+                                     "Latency of one prediction stage (cleaning, tokenization, forward) per call",
+                                     ["stage"], buckets=LATENCY_BUCKETS, registry=REGISTRY)
+MODEL_BATCH_SIZE = Histogram("textclassification_model_batch_size",
+                             "Number of texts per model forward pass",
+                             buckets=BATCH_SIZE_BUCKETS, registry=REGISTRY)
+CASCADE_INPUTS = Counter("textclassification_cascade_inputs",
+                         "Texts scored by the cascade first stage and texts escalated from it to the LSTM",
+                         ["stage"], registry=REGISTRY)
+TRAINING_STAGE_DURATION = Histogram("textclassification_training_stage_duration_seconds",
+                                    "Wall time of TrainPipeline stages", ["stage", "status"],
+                                    buckets=TRAINING_STAGE_BUCKETS, registry=REGISTRY)
+TRAINING_STAGE_PEAK_MEMORY = Gauge("textclassification_training_stage_peak_memory_bytes",
+                                   "Peak resident memory of the training process during the last run of a stage",
+                                   ["stage"], registry=REGISTRY)
+
+
+class ServingStateCollector:
+    """
+    Reads the cache counters, queue depth and model version at scrape time.
+    """
+
+    def __init__(self, prediction_pipeline, batcher, model_holder, stem_cache=None):
+        self.prediction_pipeline = prediction_pipeline
+        self.batcher = batcher
+        self.model_holder = model_holder
+        self.stem_cache = stem_cache
+
+    def collect(self):
+        stats = self.prediction_pipeline.prediction_cache.stats()
+        lookups = CounterMetricFamily("textclassification_prediction_cache_lookups",
+                                      "Prediction cache lookups by result", labels=["result"])
+        lookups.add_metric(["hit"], stats["hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        lookups.add_metric(["coalesced"], stats["coalesced"])
+        yield lookups
+        yield GaugeMetricFamily("textclassification_prediction_cache_hit_ratio",
+                                "Share of prediction cache lookups that were hits", value=stats["hit_rate"])
+        yield GaugeMetricFamily("textclassification_prediction_cache_size",
+                                "Entries in the prediction cache", value=stats["size"])
+        yield GaugeMetricFamily("textclassification_batch_queue_depth",
+                                "Texts waiting for the micro-batcher", value=self.batcher.queue_depth)
+
+        if self.stem_cache is not None:
+            stem_stats = self.stem_cache.stats()
+            stem_lookups = CounterMetricFamily("textclassification_stem_cache_lookups",
+                                               "Stem cache lookups by result", labels=["result"])
+            stem_lookups.add_metric(["hit"], stem_stats["hits"])
+            stem_lookups.add_metric(["miss"], stem_stats["misses"])
+            yield stem_lookups
+            yield GaugeMetricFamily("textclassification_stem_cache_hit_ratio",
+                                    "Share of stem cache lookups that were hits", value=stem_stats["hit_rate"])
+            yield GaugeMetricFamily("textclassification_stem_cache_size",
+                                    "Words in the stem cache", value=stem_stats["size"])
+            yield GaugeMetricFamily("textclassification_stem_cache_memory_bytes",
+                                    "Approximate memory held by the stem cache", value=stem_stats["memory_bytes"])
+
+        bundle = self.model_holder.current
+        model_info = GaugeMetricFamily("textclassification_model_info",
+                                       "Version of the model being served", labels=["version"])
+        if bundle is not None:
+            model_info.add_metric([bundle.version], 1)
+        yield model_info
+
+        if bundle is not None and bundle.cascade is not None:
+            band = GaugeMetricFamily("textclassification_cascade_band",
+                                     "Bounds of the first-stage scores escalated to the LSTM", labels=["bound"])
+            band.add_metric(["low"], bundle.cascade.low)
+            band.add_metric(["high"], bundle.cascade.high)
+            yield band
+
+
+def render_metrics():
+    """
+    :return: (body, content type) of the Prometheus text exposition
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
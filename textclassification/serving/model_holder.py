@@ -0,0 +1,297 @@
+import os
+import sys
+import shutil
+import pickle
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any
+import numpy as np
+from textclassification.logger import logging
+from textclassification.exception import CustomException
+from textclassification.configuration.gcloud_syncer import GCloudSync
+from textclassification.entity.config_entity import PredictionPipelineConfig
+from textclassification.ml.numpy_model import NumpyLSTMClassifier
+from textclassification.ml.quantization import QuantizedLSTMClassifier
+from textclassification.ml.cascade import Cascade
+from textclassification.ml.text_cleaner import DEFAULT_TEXT_CLEANER
+from textclassification.ml.vocabulary import Vocabulary
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    version: str
+    model: Any
+    vocabulary: Any
+    # First stage and band of the linear-then-LSTM cascade, None when every text goes to model
+    cascade: Any = None
+
+
+class ModelHolder:
+    """
+    Keeps the serving model and vocabulary in memory for the lifetime of the process.
+
+    Requests read ``holder.get_model()`` once and use that bundle until they finish, so a
+    background reload only replaces the reference and never touches a bundle in use.
+    """
+
+    def __init__(self, prediction_pipeline_config: PredictionPipelineConfig):
+        """
+        :param prediction_pipeline_config: Configuration for the prediction pipeline
+        """
+        self.prediction_pipeline_config = prediction_pipeline_config
+        self.gcloud = GCloudSync()
+        self._bundle = None
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+
+    @staticmethod
+    def file_md5(file_path: str) -> str:
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                md5.update(block)
+        return md5.hexdigest()
+
+
+    def download_model(self, model_name: str, version: str = None) -> str:
+        """
+        Method Name :   download_model
+        Description :   Downloads the best model from gcloud storage, with its vocabulary, stem cache and
+                        cascade files, into its own version directory, so a file that is being loaded is never overwritten
+                        by the next download
+        Output      :   path of the downloaded model
+        """
+        logging.info("Entered the download_model method of ModelHolder class")
+        try:
+            staging_dir = os.path.join(self.prediction_pipeline_config.MODEL_DIR, version or "staging")
+            os.makedirs(staging_dir, exist_ok=True)
+            self.gcloud.sync_folder_from_gcloud(self.prediction_pipeline_config.BUCKET_NAME,
+                                                model_name,
+                                                staging_dir)
+            model_path = os.path.join(staging_dir, model_name)
+            if os.path.isfile(model_path):
+                file_names = [self.prediction_pipeline_config.VOCABULARY_NAME,
+                              self.prediction_pipeline_config.STEM_CACHE_NAME]
+                if self.prediction_pipeline_config.CASCADE:
+                    file_names += [self.prediction_pipeline_config.CASCADE_LINEAR_MODEL_NAME,
+                                   self.prediction_pipeline_config.CASCADE_FILE_NAME]
+                for file_name in file_names:
+                    self.gcloud.sync_folder_from_gcloud(self.prediction_pipeline_config.BUCKET_NAME,
+                                                        file_name,
+                                                        staging_dir)
+            logging.info("Exited the download_model method of ModelHolder class")
+            return model_path
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    @staticmethod
+    def load_model_file(model_path: str):
+        if model_path.endswith('.npz'):
+            with np.load(model_path) as data:
+                quantized = 'embedding_q' in data.files
+                linear = 'coef' in data.files
+            if linear:
+                # Imported here so only servers of the linear family load sklearn
+                from textclassification.ml.linear_model import LinearTextClassifier
+                return LinearTextClassifier.load(model_path)
+            return QuantizedLSTMClassifier.load(model_path) if quantized else NumpyLSTMClassifier.load(model_path)
+
+        # Only the keras format needs TensorFlow, so it is imported on demand
+        import keras
+        from textclassification.ml.bucketing import LengthBucketedModel
+        return LengthBucketedModel(keras.models.load_model(model_path))
+
+
+    def load_vocabulary(self, model_dir: str):
+        vocabulary_path = os.path.join(model_dir, self.prediction_pipeline_config.VOCABULARY_NAME)
+        if os.path.isfile(vocabulary_path):
+            return Vocabulary.load(vocabulary_path)
+
+        # Models pushed before vocab.bin existed were served with the tokenizer pickled in cwd
+        logging.info(f"{vocabulary_path} not found, falling back to {self.prediction_pipeline_config.TOKENIZER_PATH}")
+        with open(self.prediction_pipeline_config.TOKENIZER_PATH, 'rb') as handle:
+            return Vocabulary.from_tokenizer(pickle.load(handle))
+
+
+    def load_cascade(self, model_dir: str, model_name: str = None):
+        """
+        :param model_name: file name of the served LSTM, compared with the one the band was calibrated for
+        :return: the cascade pushed with the LSTM, None when it is disabled or its files are missing
+        """
+        linear_model_path = os.path.join(model_dir, self.prediction_pipeline_config.CASCADE_LINEAR_MODEL_NAME)
+        cascade_path = os.path.join(model_dir, self.prediction_pipeline_config.CASCADE_FILE_NAME)
+        if not self.prediction_pipeline_config.CASCADE:
+            return None
+        if not (os.path.isfile(linear_model_path) and os.path.isfile(cascade_path)):
+            logging.info(f"No cascade found in {model_dir}, every text goes to the LSTM")
+            return None
+        from textclassification.ml.linear_model import LinearTextClassifier
+        cascade = Cascade.load(LinearTextClassifier.load(linear_model_path), cascade_path)
+        logging.info(f"Escalating first-stage scores from {cascade.low:.4f} to {cascade.high:.4f} to the LSTM")
+        if cascade.second_stage_model is not None and cascade.second_stage_model != model_name:
+            logging.info(f"The cascade band was calibrated for {cascade.second_stage_model} but {model_name} is "
+                         f"served, its agreement with the LSTM may differ from the calibrated one")
+        return cascade
+
+
+    def load_bundle(self, model_path: str) -> ModelBundle:
+        logging.info(f"Loading model bundle from {model_path}")
+        try:
+            version = self.file_md5(model_path)
+            model = self.load_model_file(model_path)
+            # The linear family scores texts, hashing the words itself, and has no vocabulary
+            vocabulary = self.load_vocabulary(os.path.dirname(model_path)) if hasattr(model, 'predict_sequences') else None
+            cascade = None
+            if vocabulary is not None:
+                cascade = self.load_cascade(os.path.dirname(model_path), os.path.basename(model_path))
+            self.warm_stem_cache(os.path.join(os.path.dirname(model_path),
+                                              self.prediction_pipeline_config.STEM_CACHE_NAME))
+
+            # Rename the staging directory after the content hash so the next download gets a fresh one
+            version_dir = os.path.join(self.prediction_pipeline_config.MODEL_DIR, version)
+            staging_dir = os.path.dirname(model_path)
+            if staging_dir != version_dir:
+                shutil.rmtree(version_dir, ignore_errors=True)
+                os.replace(staging_dir, version_dir)
+            return ModelBundle(version=version, model=model, vocabulary=vocabulary, cascade=cascade)
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    @staticmethod
+    def warm_stem_cache(stem_cache_path: str) -> int:
+        """
+        Adds the stems saved by training, next to the vocabulary, to the serving text cleaner.
+
+        :return: number of stems added, 0 when the file is missing
+        """
+        if not os.path.isfile(stem_cache_path):
+            return 0
+        added = DEFAULT_TEXT_CLEANER.stem_cache.load(stem_cache_path)
+        logging.info(f"Added {added} stems from {stem_cache_path} to the stem cache")
+        return added
+
+
+    def swap(self, bundle: ModelBundle) -> None:
+        previous = self._bundle
+        self._bundle = bundle
+        logging.info(f"Serving model version {bundle.version}")
+
+        # Requests still holding the previous bundle keep it alive in memory; only its files go
+        if previous is not None and previous.version != bundle.version:
+            shutil.rmtree(os.path.join(self.prediction_pipeline_config.MODEL_DIR, previous.version),
+                          ignore_errors=True)
+
+
+    def remote_model(self):
+        """
+        :return: (model name, version) of the most preferred model file present in gcloud storage,
+                 or (None, None) when none can be found
+        """
+        for model_name in self.prediction_pipeline_config.MODEL_NAMES:
+            version = self.gcloud.get_file_version(self.prediction_pipeline_config.BUCKET_NAME, model_name)
+            if version is not None:
+                return model_name, version
+        return None, None
+
+
+    def _load(self) -> ModelBundle:
+        # Fall back along MODEL_NAMES, e.g. when the int8 model was refused or the bucket predates it
+        for model_name in self.prediction_pipeline_config.MODEL_NAMES:
+            model_path = self.download_model(model_name)
+            if os.path.isfile(model_path):
+                break
+            logging.info(f"{model_name} not found in gcloud storage")
+        else:
+            raise FileNotFoundError(f"None of {self.prediction_pipeline_config.MODEL_NAMES} found in gcloud storage")
+        bundle = self.load_bundle(model_path)
+        self.swap(bundle)
+        return bundle
+
+
+    def load(self) -> ModelBundle:
+        logging.info("Entered the load method of ModelHolder class")
+        try:
+            with self._reload_lock:
+                bundle = self._load()
+            logging.info("Exited the load method of ModelHolder class")
+            return bundle
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def reload_if_changed(self) -> bool:
+        """
+        :return: True when a newer model was found in gcloud storage and swapped in
+        """
+        try:
+            if self._bundle is None:
+                self.load()
+                return True
+
+            model_name, remote_version = self.remote_model()
+            if remote_version is None or remote_version == self._bundle.version:
+                return False
+
+            logging.info(f"New model version {remote_version} of {model_name} found in gcloud storage")
+            with self._reload_lock:
+                bundle = self.load_bundle(self.download_model(model_name, remote_version))
+                self.swap(bundle)
+            return True
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    @property
+    def current(self):
+        """
+        :return: the bundle being served, or None before the first successful load
+        """
+        return self._bundle
+
+
+    def get_model(self) -> ModelBundle:
+        bundle = self._bundle
+        if bundle is None:
+            with self._reload_lock:
+                bundle = self._bundle or self._load()
+        return bundle
+
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.prediction_pipeline_config.MODEL_RELOAD_INTERVAL):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logging.info(f"Model reload failed, keeping the current model: {e}")
+
+
+    def start(self) -> None:
+        """
+        Loads the model once and starts the background thread that watches gcloud storage for a newer one.
+        """
+        logging.info("Entered the start method of ModelHolder class")
+        try:
+            self.load()
+        except Exception as e:
+            logging.info(f"Initial model load failed, the watcher will retry: {e}")
+
+        if self._watcher is None:
+            self._stop_event.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
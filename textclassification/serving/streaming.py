@@ -0,0 +1,117 @@
+import io
+import csv
+import json
+from typing import AsyncIterator, Callable, List, Sequence
+from starlette.concurrency import run_in_threadpool
+
+TEXT_FIELDS = ("tweet", "text")
+
+
+async def iter_lines(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits an async stream of byte chunks into decoded lines, keeping the line terminator.
+    """
+    buffer = b""
+    async for chunk in byte_stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8") + "\n"
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[List[str]]:
+    # A record is complete once its quotes are balanced; quoted fields may span lines
+    record = ""
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+        if record.strip():
+            yield next(csv.reader(io.StringIO(record)))
+        record = ""
+    if record.strip():
+        yield next(csv.reader(io.StringIO(record)))
+
+
+def _text_from_json(value) -> str:
+    if isinstance(value, dict):
+        for field in TEXT_FIELDS:
+            if field in value:
+                return str(value[field])
+        raise ValueError(f"NDJSON object has none of the fields {TEXT_FIELDS}")
+    return str(value)
+
+
+async def iter_texts(byte_stream: AsyncIterator[bytes], content_type: str) -> AsyncIterator[str]:
+    """
+    :param content_type: ``text/csv`` for CSV with a tweet or text column, anything else is read as NDJSON
+    :return: async iterator over the texts of the upload, in order
+    """
+    lines = iter_lines(byte_stream)
+    if content_type.split(";")[0].strip() == "text/csv":
+        rows = iter_csv_rows(lines)
+        try:
+            header = await rows.__anext__()
+        except StopAsyncIteration:
+            # An empty upload has no rows to score; raising StopAsyncIteration here would become RuntimeError
+            return
+        columns = [column for column in TEXT_FIELDS if column in header]
+        if not columns:
+            raise ValueError(f"CSV header has none of the columns {TEXT_FIELDS}")
+        index = header.index(columns[0])
+        async for row in rows:
+            yield row[index]
+    else:
+        async for line in lines:
+            if line.strip():
+                yield _text_from_json(json.loads(line))
+
+
+async def iter_chunks(texts, chunk_size: int) -> AsyncIterator[List[str]]:
+    """
+    Groups an iterable or async iterable of texts into lists of at most chunk_size texts.
+    """
+    chunk = []
+    if hasattr(texts, "__aiter__"):
+        async for text in texts:
+            chunk.append(text)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    else:
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def iter_predictions(texts, predict_batch: Callable[[List[str]], Sequence[float]],
+                           get_label: Callable[[float], str], chunk_size: int) -> AsyncIterator[dict]:
+    """
+    Scores texts one chunk at a time on a worker thread, so only a single chunk of inputs
+    and results is held in memory however long the input is.
+    """
+    index = 0
+    async for chunk in iter_chunks(texts, chunk_size):
+        scores = await run_in_threadpool(predict_batch, chunk)
+        for score in scores:
+            yield {"index": index, "score": float(score), "label": get_label(score)}
+            index += 1
+
+
+async def ndjson_lines(predictions: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for prediction in predictions:
+        yield json.dumps(prediction) + "\n"
+
+
+async def json_array(predictions: AsyncIterator[dict]) -> AsyncIterator[str]:
+    separator = "["
+    async for prediction in predictions:
+        yield separator + json.dumps(prediction)
+        separator = ","
+    yield "[]" if separator == "[" else "]"